@@ -1,4 +1,19 @@
-import heapq
+import math
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import tempfile
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from itertools import compress
+from multiprocessing import shared_memory
+
+MAX_EDITS = 4096  # Most edits a grid keeps in its log (Past that the older half is dropped, see Grid.record_edit)
+
 
 class Grid:
     def __init__(self, w, h, walls):
@@ -7,6 +22,29 @@ class Grid:
         self.walls = {}  # Hash table
         for x, y in walls:
             self.walls[(x, y)] = True
+        self.edits = []  # (pos, old cost, new cost) of every edit made through set_wall/set_weight, oldest first
+        self.version = 0  # Number of edits so far (Anything computed at an older version may be out of date)
+        self.edits_start = 0  # Version the grid was at before edits[0] (The edits before that were dropped)
+        self.components = None  # Components kept for this grid, if any (Searches ask it first whether end can be reached at all)
+
+    def step_cost(self, pos):  # Cost of moving into pos (Infinite for walls)
+        return math.inf if pos in self.walls else 1
+
+    def set_wall(self, pos, wall=True):  # Adds or removes a wall, and records the edit so caches can tell what changed
+        old_cost = self.step_cost(pos)
+        if wall:
+            self.walls[pos] = True
+        else:
+            self.walls.pop(pos, None)
+        self.record_edit(pos, old_cost)
+
+    def record_edit(self, pos, old_cost):
+        self.edits.append((pos, old_cost, self.step_cost(pos)))
+        self.version += 1
+        if len(self.edits) > MAX_EDITS:  # Keeps the log bounded. A cache further behind than what is left starts over
+            dropped = len(self.edits) // 2
+            del self.edits[:dropped]
+            self.edits_start += dropped
 
     def in_bounds(self, pos):  # Check to see if the position is within the outer-most boundaries of the Grid
         x, y = pos
@@ -51,26 +89,549 @@ class Weighted_grid(Grid):
     def __init__(self, w, h, walls):
         super().__init__(w, h, walls)
         self.weights = {}
+        self.weight_range = None  # (weights dict, min, max, integral) as of the last weight_stats, kept up to date by set_weight
 
     def cur_to_next(self, to_node):
         # Finds the cost to move into a given node (If there is no specified weight, we default to 1)
         # The default to 1 is very useful when
         return self.weights.get(to_node, 1)
 
+    def step_cost(self, pos):
+        return math.inf if pos in self.walls else self.cur_to_next(pos)
+
+    def set_weight(self, pos, weight):
+        old_cost = self.step_cost(pos)
+        old_weight = self.weights.get(pos)
+        self.weights[pos] = weight
+        if self.weight_range is not None and self.weight_range[0] is self.weights:
+            weights, low, high, integral = self.weight_range
+            if old_weight is not None and old_weight != 1 and (old_weight in (low, high) or not float(old_weight).is_integer()):
+                self.weight_range = None  # The old weight may have been the only one at a bound, weight_stats scans again
+            else:  # (Cells without a weight keep 1 in the range whatever happens to this one)
+                self.weight_range = (weights, min(low, weight), max(high, weight), integral and float(weight).is_integer())
+        self.record_edit(pos, old_cost)
+
+    def weight_stats(self):
+        # (min, max, integral) of the step costs (Cells without a weight cost 1), for choose_queue
+        # Scanned once per weights dict, then kept up to date by set_weight. Assigning a new dict (grid.weights = ...) is
+        # noticed, but weights changed in place (grid.weights[pos] = ...) aren't, so edit through set_weight
+        if self.weight_range is None or self.weight_range[0] is not self.weights:
+            weights = list(self.weights.values()) + [1]
+            self.weight_range = (self.weights, min(weights), max(weights), all(float(weight).is_integer() for weight in weights))
+        return self.weight_range[1:]
+
+
+class Compact_grid:
+    # Same map as Weighted_grid, but stored in flat typed arrays instead of hash tables keyed by (x, y) tuples
+    # Every cell is a plain int index. The map is padded with a 1 cell border of walls so neighbors never need a bounds check
+    # Cells are numbered column by column so comparing two indices gives the same order as comparing their (x, y) tuples
+    # (This keeps ties in the priority queue breaking the same way they do on Grid, so both grids give the same paths)
+    def __init__(self, w, h, walls, weights=None):
+        self.w = w
+        self.h = h
+        self.stride = h + 2  # Distance between (x, y) and (x + 1, y)
+        self.size = (w + 2) * self.stride
+        self.open = bytearray(self.size)  # Passability bitmap (1 = passable, walls and the border are 0)
+        for x in range(w):
+            column = self.index((x, 0))
+            self.open[column:column + h] = b'\x01' * h
+        for pos in walls:
+            self.open[self.index(pos)] = 0
+
+        weights = weights or {}
+        typecode = 'i' if all(float(weight).is_integer() for weight in weights.values()) else 'd'
+        self.weights = array(typecode, [1]) * self.size
+        convert = int if typecode == 'i' else float  # Whole weights can come as floats (5.0), which an 'i' array won't take
+        for pos, weight in weights.items():
+            self.weights[self.index(pos)] = convert(weight)
+        self.integral = typecode == 'i'
+        self.min_weight = convert(min(list(weights.values()) + [1]))  # Cells without a weight cost 1
+        self.max_weight = convert(max(list(weights.values()) + [1]))
+
+        # Neighbor offsets in the same order as Grid.return_neighbors (down, up, right, left)
+        self.offsets = (1, -1, self.stride, -self.stride)
+        self.edits = []  # Never edited, but searches and caches look at these like on Grid
+        self.version = 0
+        self.edits_start = 0
+        self.components = None  # Components(compact_grid), if kept (Asked with (x, y) positions, like on Grid)
+
+    @classmethod
+    def from_grid(cls, grid):  # Build from an existing Grid/Weighted_grid
+        return cls(grid.w, grid.h, grid.walls, getattr(grid, 'weights', None))
+
+    @classmethod
+    def from_buffers(cls, w, h, open_cells, weights, min_weight, max_weight):
+        # Wraps arrays (or memoryviews) laid out like another Compact_grid's open and weights, without copying them
+        grid = cls.__new__(cls)
+        grid.w, grid.h = w, h
+        grid.stride = h + 2
+        grid.size = (w + 2) * grid.stride
+        grid.open = open_cells
+        grid.weights = weights
+        grid.integral = memoryview(weights).format == 'i'
+        grid.min_weight, grid.max_weight = min_weight, max_weight
+        grid.offsets = (1, -1, grid.stride, -grid.stride)
+        grid.edits, grid.version, grid.edits_start, grid.components = [], 0, 0, None
+        return grid
 
-class Priority_queue:
+    def index(self, pos):  # (x, y) -> cell index
+        x, y = pos
+        return (x + 1) * self.stride + y + 1
+
+    def position(self, cell):  # Cell index -> (x, y)
+        x, y = divmod(cell, self.stride)
+        return x - 1, y - 1
+
+    def in_bounds(self, pos):
+        x, y = pos
+        return 0 <= x <= self.w - 1 and 0 <= y <= self.h - 1
+
+    def passable(self, pos):
+        return self.in_bounds(pos) and self.open[self.index(pos)] == 1
+
+    def return_neighbors(self, cell):  # Takes and returns cell indices, not (x, y) tuples
+        return [cell + offset for offset in self.offsets if self.open[cell + offset]]
+
+    def cur_to_next(self, to_cell):
+        return self.weights[to_cell]
+
+    def draw(self, came_from, start, end):
+        for y in range(self.h):
+            for x in range(self.w):
+                if (x, y) == end:
+                    print("E", end = ' ')
+                elif (x, y) == start:
+                    print("S", end=' ')
+                elif (x, y) in came_from:
+                    new_x, new_y = came_from[(x, y)]
+                    dx, dy = new_x - x, new_y - y
+                    if [dx, dy] == [1,0]:
+                        print(">", end = ' ')
+                    elif [dx, dy] == [-1, 0]:
+                        print("<", end = ' ')
+                    elif [dx, dy] == [0, 1]:
+                        print("v", end = ' ')
+                    elif [dx, dy] == [0, -1]:
+                        print("^", end = ' ')
+                elif not self.passable((x, y)):
+                    print("#", end = ' ')
+                else:
+                    print(".", end = ' ')
+            print()
+
+
+START = 4  # Search_workspace direction code of the start cell (Codes 0 to 3 are steps along grid.offsets)
+
+
+class Search_workspace:
+    # Bookkeeping for searches on one Compact_grid, allocated once and reused by every query instead of fresh arrays each time
+    #   cost: min cost found so far at each cell
+    #   direction: index into grid.offsets of the step that reached each cell (Its parent is cell - grid.offsets[code]), START for the start
+    #   stamp: the generation a cell was last touched in. A query gets two stamps of its own: generation (Reached) and generation + 1 (Expanded)
+    # Anything stamped before the current generation is left over from an earlier query and counts as untouched,
+    # so reset is O(1) instead of clearing the arrays (They are only cleared when the 32 bit stamps run out)
+    # Results (Cell_map views, path_to's path) read straight out of the workspace, so they are only good until the next reset
+    def __init__(self, grid):
+        self.grid = grid
+        self.cost = array('q' if grid.integral else 'd', [0]) * grid.size
+        self.direction = bytearray(grid.size)
+        self.stamp = array('I', [0]) * grid.size
+        self.generation = 0
+        self.path = None  # path_to's buffer, made on first use (Filled from the back, a path can't visit more cells than there are)
+
+    def reset(self):  # Starts a new query
+        self.generation += 2
+        if self.generation + 1 > 0xFFFFFFFF:
+            self.stamp = array('I', [0]) * self.grid.size
+            self.generation = 2
+
+    def reached(self, cell):
+        return self.stamp[cell] >= self.generation
+
+    def parent(self, cell):  # None for the start
+        code = self.direction[cell]
+        return None if code == START else cell - self.grid.offsets[code]
+
+    def path_to(self, end):
+        # Cell indices from the start to end (Empty if end wasn't reached), as a memoryview over the reused path buffer
+        if self.path is None:
+            self.path = array('i', [0]) * self.grid.size
+        if not self.reached(end):
+            return memoryview(self.path)[:0]
+        direction, offsets, path = self.direction, self.grid.offsets, self.path
+        i = len(path)
+        cell = end
+        while True:
+            i -= 1
+            path[i] = cell
+            code = direction[cell]
+            if code == START:
+                return memoryview(path)[i:]
+            cell -= offsets[code]
+
+
+TILE_SIZE = 64  # Tiled_map tiles are TILE_SIZE x TILE_SIZE cells (A 512 byte bitmap and 4096 weights)
+MOVINGAI_TERRAIN = {'.': 1, 'G': 1, 'S': 1}  # Weights of the passable MovingAI .map characters
+
+
+class Tiled_map:
+    # Map file for worlds too big to build as Python objects. The cells are cut into TILE_SIZE x TILE_SIZE tiles and the file holds
+    # two layers, each tile by tile (Row of tiles by row of tiles): a passability bitmap (1 bit a cell) and the weights
+    # Tiled_map memory maps the file and reads cells straight out of it, so only the tiles a search touches are ever read from disk
+    # (Each tile asks the OS for its pages the first time it's touched, the rest of the map is left alone)
+    # Works with a_star_search like a Weighted_grid (Nodes are (x, y) tuples), but it's read only
+    header = struct.Struct('=4sc3xqqqdd')  # Magic, weight typecode, w, h, tile size, min and max weight of the passable cells
+    magic = b'TMP1'
+    page = 4096  # The header gets a page of its own, and each layer starts on a page boundary
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, typecode, self.w, self.h, self.tile, self.min_weight, self.max_weight = self.header.unpack_from(self.file)
+        if magic != self.magic:
+            self.file.close()
+            raise ValueError("{} is not a tiled map file".format(path))
+        typecode = typecode.decode()
+        self.integral = typecode != 'd'
+        if self.integral:
+            self.min_weight, self.max_weight = int(self.min_weight), int(self.max_weight)
+        self.across = -(-self.w // self.tile)  # Tiles in a row of tiles
+        self.tile_count = self.across * -(-self.h // self.tile)
+        self.cells_per_tile = self.tile * self.tile
+        self.tile_bytes = -(-self.cells_per_tile // 8)  # Bytes of a tile's bitmap (The last one padded when tile * tile isn't a multiple of 8)
+        self.open_start, self.weights_start, end = self.layout(self.tile_count, self.cells_per_tile, array(typecode).itemsize)
+        self.view = memoryview(self.file)
+        self.open = self.view[self.open_start:self.weights_start]
+        self.weights = self.view[self.weights_start:end].cast(typecode)
+        self.touched = bytearray(self.tile_count)  # 1 once a tile has been read
+        self.tiles_touched = 0
+        if hasattr(mmap, 'MADV_RANDOM'):  # No read ahead, neighbouring tiles in the file aren't neighbours on the map
+            self.file.madvise(mmap.MADV_RANDOM)
+        self.edits = []  # Never edited, but searches and caches look at these like on Grid
+        self.version = 0
+        self.edits_start = 0
+        self.components = None
+
+    @classmethod
+    def layout(cls, tile_count, cells_per_tile, itemsize):  # Where the open and the weights layers start and end
+        open_start = cls.page
+        weights_start = open_start + -(-tile_count * -(-cells_per_tile // 8) // cls.page) * cls.page
+        return open_start, weights_start, weights_start + tile_count * cells_per_tile * itemsize
+
+    def locate(self, pos):  # (x, y) -> (tile number, cell number inside the tile)
+        x, y = pos
+        tile = y // self.tile * self.across + x // self.tile
+        if not self.touched[tile]:
+            self.touch(tile)
+        return tile, y % self.tile * self.tile + x % self.tile
+
+    def touch(self, tile):
+        self.touched[tile] = 1
+        self.tiles_touched += 1
+        if hasattr(mmap, 'MADV_WILLNEED'):  # Ask for the tile's pages in both layers at once, instead of a fault at a time
+            itemsize = self.weights.itemsize
+            for start, length in ((self.open_start + tile * self.tile_bytes, self.tile_bytes),
+                                  (self.weights_start + tile * self.cells_per_tile * itemsize, self.cells_per_tile * itemsize)):
+                aligned = start - start % mmap.PAGESIZE
+                self.file.madvise(mmap.MADV_WILLNEED, aligned, length + start - aligned)
+
+    def in_bounds(self, pos):
+        x, y = pos
+        return 0 <= x <= self.w - 1 and 0 <= y <= self.h - 1
+
+    def passable(self, pos):
+        if not self.in_bounds(pos):
+            return False
+        tile, cell = self.locate(pos)
+        return self.open[tile * self.tile_bytes + (cell >> 3)] >> (cell & 7) & 1 == 1
+
+    def return_neighbors(self, pos):  # Same order as Grid.return_neighbors
+        x, y = pos
+        return [neighbor for neighbor in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)) if self.passable(neighbor)]
+
+    def cur_to_next(self, to_node):
+        tile, cell = self.locate(to_node)
+        return self.weights[tile * self.cells_per_tile + cell]
+
+    def step_cost(self, pos):
+        return self.cur_to_next(pos) if self.passable(pos) else math.inf
+
+    def close(self):
+        for view in (self.weights, self.open, self.view):
+            view.release()
+        self.file.close()
+
+    def draw(self, came_from, start, end):
+        for y in range(self.h):
+            for x in range(self.w):
+                if (x, y) == end:
+                    print("E", end = ' ')
+                elif (x, y) == start:
+                    print("S", end=' ')
+                elif (x, y) in came_from:
+                    new_x, new_y = came_from[(x, y)]
+                    dx, dy = new_x - x, new_y - y
+                    if [dx, dy] == [1,0]:
+                        print(">", end = ' ')
+                    elif [dx, dy] == [-1, 0]:
+                        print("<", end = ' ')
+                    elif [dx, dy] == [0, 1]:
+                        print("v", end = ' ')
+                    elif [dx, dy] == [0, -1]:
+                        print("^", end = ' ')
+                elif not self.passable((x, y)):
+                    print("#", end = ' ')
+                else:
+                    print(".", end = ' ')
+            print()
+
+    @classmethod
+    def write(cls, path, w, h, rows, typecode, tile=None):
+        # Streams a map into a file. rows yields one (open, weights) pair per row, top to bottom: open is w bytes (1 = passable)
+        # and weights an array of w weights in typecode ('B', 'H' or 'i' for whole numbers, 'd' otherwise)
+        # Only one row of tiles is held at a time. The two layers are written through two handles on the same file
+        tile = tile or TILE_SIZE
+        if tile < 1:
+            raise ValueError("tile has to be at least 1, not {}".format(tile))
+        across = -(-w // tile)
+        tile_count = across * -(-h // tile)
+        open_start, weights_start, end = cls.layout(tile_count, tile * tile, array(typecode).itemsize)
+        with open(path, 'wb') as file:
+            file.truncate(end)
+        to_bits = bytes.maketrans(b'\x00\x01', b'01')
+        padding = across * tile - w  # Cells past the right (And bottom) edge are walls
+        low, high = math.inf, -math.inf
+        with open(path, 'r+b') as open_file, open(path, 'r+b') as weights_file:
+            open_file.seek(open_start)
+            weights_file.seek(weights_start)
+            band = []
+            for y, (open_row, weight_row) in enumerate(rows):
+                passable_weights = list(compress(weight_row, open_row))
+                if passable_weights:
+                    low, high = min(low, min(passable_weights)), max(high, max(passable_weights))
+                band.append((bytes(open_row) + bytes(padding), array(typecode, weight_row) + array(typecode, [0]) * padding))
+                if len(band) == tile or y == h - 1:
+                    band += [(bytes(across * tile), array(typecode, [0]) * (across * tile))] * (tile - len(band))
+                    for x in range(0, across * tile, tile):
+                        cells = b''.join(open_row[x:x + tile] for open_row, weight_row in band)
+                        # Cell i of the tile becomes bit i: reversed, the cells read as a binary number with cell 0 last
+                        open_file.write(int(cells[::-1].translate(to_bits), 2).to_bytes(-(-len(cells) // 8), 'little'))
+                        for open_row, weight_row in band:
+                            weights_file.write(weight_row[x:x + tile])
+                    band = []
+        if low == math.inf:  # No passable cells
+            low = high = 1
+        with open(path, 'r+b') as file:
+            file.write(cls.header.pack(cls.magic, typecode.encode(), w, h, tile, low, high))
+        return cls(path)
+
+    @classmethod
+    def from_grid(cls, grid, path, tile=None):  # Writes a Grid/Weighted_grid to path and maps it
+        weights = getattr(grid, 'weights', {})
+        typecode = 'i' if all(float(weight).is_integer() for weight in weights.values()) else 'd'
+        convert = int if typecode == 'i' else float  # Whole weights can come as floats (5.0), which an 'i' array won't take
+        rows = ((bytes(0 if (x, y) in grid.walls else 1 for x in range(grid.w)),
+                 [convert(weights.get((x, y), 1)) for x in range(grid.w)]) for y in range(grid.h))
+        return cls.write(path, grid.w, grid.h, rows, typecode, tile)
+
+    @classmethod
+    def import_movingai(cls, map_path, path, terrain=None, tile=None):
+        # Converts a MovingAI benchmark .map (https://movingai.com/benchmarks/formats.html) to a tiled map at path and maps it
+        # terrain gives the weight of each passable character, anything else is a wall. The default has '.', 'G' and 'S' cost 1
+        # ('@', 'O' and trees are walls. So is water, it's only passable from other water, which a 4 way grid can't express)
+        terrain = terrain or MOVINGAI_TERRAIN
+        open_table = bytes(1 if chr(char) in terrain else 0 for char in range(256))  # For bytes.translate, character -> 0/1
+        whole = all(float(weight).is_integer() for weight in terrain.values())
+        typecode = 'B' if whole and min(terrain.values()) >= 0 and max(terrain.values()) <= 255 else 'i' if whole else 'd'
+        convert = float if typecode == 'd' else int
+        if typecode == 'B':  # Weights fit in a byte, so a second table translates a whole row of them at once
+            weight_table = bytes(int(terrain.get(chr(char), 0)) for char in range(256))
+        with open(map_path, 'rb') as file:
+            fields = {}
+            for line in file:  # "type octile", "height h", "width w", then "map" and the rows
+                if line.strip() == b'map':
+                    break
+                key, value = line.split()
+                fields[key.decode()] = value.decode()
+            w, h = int(fields['width']), int(fields['height'])
+
+            def rows():
+                for y in range(h):
+                    line = file.readline().rstrip(b'\r\n')
+                    if len(line) != w:
+                        raise ValueError("{}: row {} is {} cells wide, not {}".format(map_path, y, len(line), w))
+                    if typecode == 'B':
+                        yield line.translate(open_table), array('B', line.translate(weight_table))
+                    else:
+                        yield line.translate(open_table), [convert(terrain.get(chr(char), 0)) for char in line]
+            return cls.write(path, w, h, rows(), typecode, tile)
+
+
+class Cell_map(Mapping):
+    # Read-only dict-like view over a Search_workspace, keyed by (x, y) like the dicts the searches return
+    # A cell only counts as present once the search has reached it (Stamped in the workspace's current generation)
+    # values=None makes it the came_from view: parents come from the direction codes, and the start shows up as None
+    def __init__(self, workspace, values=None):
+        self.workspace = workspace
+        self.values = values
+        self.generation = workspace.generation
+
+    def __getitem__(self, pos):
+        workspace = self.workspace
+        if workspace.generation != self.generation:
+            raise RuntimeError("The search workspace has been reset for another query since")
+        if not workspace.grid.in_bounds(pos):
+            raise KeyError(pos)
+        cell = workspace.grid.index(pos)
+        if not workspace.reached(cell):
+            raise KeyError(pos)
+        if self.values is None:
+            parent = workspace.parent(cell)
+            return None if parent is None else workspace.grid.position(parent)
+        return self.values[cell]
+
+    def __iter__(self):
+        for cell, stamp in enumerate(self.workspace.stamp):
+            if stamp >= self.generation:
+                yield self.workspace.grid.position(cell)
+
+    def __len__(self):
+        return sum(1 for stamp in self.workspace.stamp if stamp >= self.generation)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Indexed_priority_queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
     def __init__(self):
-        # Note that the heap is a min heap and NOT max heap
         self.elements = []
+        self.position = {}  # item -> index of its pair in elements
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
 
     def empty(self):
         return len(self.elements) == 0
 
+    def __len__(self):
+        return len(self.elements)
+
+    def min_weight(self):  # Weight of the item get_min would return, without removing it
+        return self.elements[0][0]
+
     def get_min(self):
-        return heapq.heappop(self.elements)[1]
+        item = self.elements[0][1]
+        del self.position[item]
+        last = self.elements.pop()
+        if self.elements:
+            self.elements[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
 
     def push(self, item, weight):
-        heapq.heappush(self.elements, [weight, item])
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.elements[i][0]:  # Only ever lower an item's weight
+                return
+            self.elements[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.elements)
+            self.elements.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def sift_up(self, i):
+        entry = self.elements[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.elements[parent]:
+                break
+            self.elements[i] = self.elements[parent]
+            self.position[self.elements[i][1]] = i
+            i = parent
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.elements[i]
+        size = len(self.elements)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.elements[child + 1] < self.elements[child]:
+                child += 1
+            if not self.elements[child] < entry:
+                break
+            self.elements[i] = self.elements[child]
+            self.position[self.elements[i][1]] = i
+            i = child
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+
+class Bucket_queue:
+    # Dial's algorithm: one bucket per integer priority instead of a heap, so push and get_min are O(1) amortized
+    # Only works when every queued priority lies within span of the lowest one still queued, which holds when
+    # step costs are small integers (span = highest step cost, plus any change in the heuristic per step)
+    # The buckets are reused as a ring of span + 1 slots. Each bucket is a dict so decrease-key can remove items in O(1)
+    def __init__(self, span):
+        self.buckets = [{} for _ in range(span + 1)]
+        self.priority = {}  # item -> its priority while it is queued
+        self.current = 0  # No queued priority is lower than this
+        self.decreased = 0  # Pushes turned into decrease-keys (Same counter as Indexed_priority_queue)
+
+    def empty(self):
+        return len(self.priority) == 0
+
+    def __len__(self):
+        return len(self.priority)
+
+    def get_min(self):
+        while not self.buckets[self.current % len(self.buckets)]:
+            self.current += 1
+        bucket = self.buckets[self.current % len(self.buckets)]
+        item = next(iter(bucket))  # Oldest item first
+        del bucket[item]
+        del self.priority[item]
+        return item
+
+    def push(self, item, weight):
+        weight = int(weight)
+        if item in self.priority:
+            old_weight = self.priority[item]
+            if weight >= old_weight:  # Only ever lower an item's weight
+                return
+            del self.buckets[old_weight % len(self.buckets)][item]
+            self.decreased += 1
+        if not self.priority or weight < self.current:  # The queue can run empty while a node's neighbors are still being pushed
+            self.current = weight
+        self.priority[item] = weight
+        self.buckets[weight % len(self.buckets)][item] = True
+
+
+BUCKET_QUEUE_MAX_WEIGHT = 64  # Highest step cost that still gets a bucket queue (More would mean a long ring of mostly empty buckets)
+
+
+def choose_queue(grid, slack, bucket_queue=None):
+    # Picks Dial's bucket queue when every step cost is a small integer, otherwise the indexed heap
+    # slack is how much a priority can move on top of the step cost (1 for A*, since greedy_dist changes by 1 per step)
+    # Passing bucket_queue=True/False forces one or the other, but the bucket queue can't be forced on non-integer weights
+    if isinstance(grid, (Compact_grid, Tiled_map)):
+        low, high, integral = grid.min_weight, grid.max_weight, grid.integral
+    else:
+        low, high, integral = grid.weight_stats()
+    if bucket_queue is None:
+        # A priority can't drop below the one just popped as long as every step costs at least the slack
+        bucket_queue = integral and low >= slack and high <= BUCKET_QUEUE_MAX_WEIGHT
+    elif bucket_queue and not integral:  # Its buckets are whole numbers, fractional priorities would come out in the wrong order
+        raise ValueError("The bucket queue needs integer weights")
+    if bucket_queue:
+        return Bucket_queue(int(high) + slack)
+    return Indexed_priority_queue()
 
 
 def greedy_dist(a, b):  # Returns the manhattan distance from point a to b or b to a
@@ -79,24 +640,248 @@ def greedy_dist(a, b):  # Returns the manhattan distance from point a to b or b
     return abs(x1 - x2) + abs(y1 - y2)
 
 
+class Components:
+    # Connected component label of every cell, so a query between two components is turned down straight away
+    # instead of the search flooding everything reachable from start before giving up
+    # labels is a flat 'i' array with (x, y) at x * h + y, and -1 for walls. Set grid.components to one to have the searches use it
+    # Like Path_cache, it catches up on grid.edits (set_wall) before answering, and only walks the regions an edit touched:
+    #   a wall removed: the components around the cell are joined, relabelling all but the biggest one
+    #   a wall added: floods from the cell's open neighbors one step each in turn. Floods that run into each other are the same piece,
+    #   and a flood that runs out without meeting another one was cut off and gets a new label (So only the smaller pieces get walked)
+    # The labels are the passability it goes by, so edits are replayed in order even when later ones touched the same cells
+    def __init__(self, grid):
+        self.grid = grid
+        self.label_all()
+
+    def label_all(self):  # Labels the whole grid from scratch
+        grid = self.grid
+        self.labels = array('i', [-1]) * (grid.w * grid.h)
+        self.sizes = {}  # label -> number of cells with it
+        self.next_label = 0
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if grid.passable((x, y)):
+                    self.labels[self.cell((x, y))] = -2  # Open but not labelled yet
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if self.labels[self.cell((x, y))] == -2:
+                    self.fill((x, y), self.new_label())
+        self.version = grid.version
+
+    def cell(self, pos):
+        return pos[0] * self.grid.h + pos[1]
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label - 1
+
+    def open_neighbors(self, pos):
+        x, y = pos
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                if self.grid.in_bounds(neighbor) and self.labels[self.cell(neighbor)] != -1]
+
+    def fill(self, pos, label):  # Gives pos and every cell connected to it the label
+        old_label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = label
+        stack = [pos]
+        count = 0
+        while stack:
+            cur = stack.pop()
+            count += 1
+            for neighbor in self.open_neighbors(cur):
+                if self.labels[self.cell(neighbor)] != label:
+                    self.labels[self.cell(neighbor)] = label
+                    stack.append(neighbor)
+        self.move(old_label, label, count)
+
+    def move(self, old_label, label, count):  # Keeps sizes up to date when count cells go from old_label to label
+        if old_label >= 0:
+            self.sizes[old_label] -= count
+            if not self.sizes[old_label]:
+                del self.sizes[old_label]
+        if label >= 0:
+            self.sizes[label] = self.sizes.get(label, 0) + count
+
+    def catch_up(self):
+        if self.version < self.grid.edits_start:  # The edits it missed were dropped from the log, so it starts over
+            self.label_all()
+            return
+        for pos, old_cost, new_cost in self.grid.edits[self.version - self.grid.edits_start:]:
+            if not self.grid.in_bounds(pos):
+                continue
+            is_wall = self.labels[self.cell(pos)] == -1
+            if new_cost == math.inf and not is_wall:
+                self.add_wall(pos)
+            elif new_cost != math.inf and is_wall:
+                self.remove_wall(pos)
+        self.version = self.grid.version
+
+    def remove_wall(self, pos):
+        labels = {self.labels[self.cell(neighbor)]: neighbor for neighbor in self.open_neighbors(pos)}
+        if not labels:
+            label = self.new_label()
+        else:
+            label = max(labels, key=self.sizes.get)
+            for other_label, neighbor in labels.items():
+                if other_label != label:
+                    self.fill(neighbor, label)
+        self.labels[self.cell(pos)] = label
+        self.move(-1, label, 1)
+
+    def add_wall(self, pos):
+        label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = -1
+        self.move(label, -1, 1)
+        starts = self.open_neighbors(pos)
+        owner = {start: flood for flood, start in enumerate(starts)}  # cell -> the flood that reached it first
+        group = list(range(len(starts)))  # Floods that ran into each other point at the same one
+        frontiers = [[start] for start in starts]
+        reached = [[start] for start in starts]
+        split_off = set()
+
+        def find(flood):
+            while group[flood] != flood:
+                flood = group[flood]
+            return flood
+
+        while True:
+            groups = {}
+            for flood in range(len(starts)):
+                if find(flood) not in split_off:
+                    groups.setdefault(find(flood), []).append(flood)
+            if len(groups) <= 1:
+                break
+            running = [root for root, floods in groups.items() if any(frontiers[flood] for flood in floods)]
+            finished = [root for root in groups if root not in running]
+            if not running:  # Every piece was walked in full, one of them keeps the old label
+                finished = finished[1:]
+            for root in finished:  # Ran out without meeting anyone else, so it is cut off from the rest
+                new_label = self.new_label()
+                for flood in groups[root]:
+                    for cell in reached[flood]:
+                        self.labels[self.cell(cell)] = new_label
+                    self.move(label, new_label, len(reached[flood]))
+                split_off.add(root)
+            if len(running) <= 1:
+                break
+            for root in running:
+                for flood in groups[root]:
+                    if not frontiers[flood]:
+                        continue
+                    cur = frontiers[flood].pop()
+                    for neighbor in self.open_neighbors(cur):
+                        if neighbor not in owner:
+                            owner[neighbor] = flood
+                            frontiers[flood].append(neighbor)
+                            reached[flood].append(neighbor)
+                        elif find(owner[neighbor]) != find(flood):
+                            group[find(owner[neighbor])] = find(flood)
+
+    def connected(self, start, end):
+        self.catch_up()
+        if start == end:
+            return True
+        if not (self.grid.in_bounds(start) and self.grid.in_bounds(end)):
+            return False
+        label = self.labels[self.cell(start)]
+        return label != -1 and label == self.labels[self.cell(end)]
+
+
+def unreachable(grid, start, end):  # True when the grid keeps Components and they show there is no path
+    components = getattr(grid, 'components', None)
+    return components is not None and not components.connected(start, end)
+
+
+class Search_observer:
+    # Watches a search from the outside: counters, and optionally callbacks and sampled timing
+    # Searches take observer=None. Without one, all a search pays is an 'is not None' check per event
+    #   expansions: nodes taken off the queue and expanded
+    #   pushes: pushes onto the queue (Including ones that only lowered the priority of a queued node)
+    #   max_frontier: most nodes queued at once
+    # on_expand(node) and on_push(node, priority), when given, are called for every event as it happens
+    # sample_every=n appends (expansions, seconds since the search started) to samples every n expansions
+    # Counters keep adding up over several searches until reset is called. seconds is the time spent in them
+    def __init__(self, on_expand=None, on_push=None, sample_every=0):
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.expansions = 0
+        self.pushes = 0
+        self.max_frontier = 0
+        self.samples = []
+        self.seconds = 0
+        self.began = time.perf_counter()
+
+    def started(self):
+        self.began = time.perf_counter()
+
+    def expanded(self, node):
+        self.expansions += 1
+        if self.on_expand is not None:
+            self.on_expand(node)
+        if self.sample_every and self.expansions % self.sample_every == 0:
+            self.samples.append((self.expansions, time.perf_counter() - self.began))
+
+    def pushed(self, node, priority, frontier):  # frontier is how many nodes are queued after the push
+        self.pushes += 1
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.on_push is not None:
+            self.on_push(node, priority)
+
+    def finished(self):
+        self.seconds += time.perf_counter() - self.began
+
+
 # A* Is 90% the same code as dijkstras
 # The only difference is the introduction of a greedy implementation.
 # The priority of items depend not only on the cost to get to a given node but that and also the distance from that node to the goal/end.
 # This way, we provide the algorithm with a preference to go in low cost paths in combination with paths that lead towards the goal/end
 # NOTE THAT THE WEIGHTS WITHIN THE PRIORITY QUEUE NO LONGER REFERENCE THE LOWEST COST TO GET TO THOSE NODES (At that moment)
-def a_star_search(grid, start, end):
+def a_star_search(grid, start, end, stats=None, bucket_queue=None, heuristic=greedy_dist, observer=None, workspace=None):
     # The most important parts of dijkstras is the priority queue and the presence of weighted graphs (Usually)
     # The priority queue is used to choose paths with the least cost (No matter how far the path may have already gone)
+    # heuristic(end, node) estimates the cost left from node to end. It must never overestimate (greedy_dist, or Landmarks.heuristic)
+    # If a stats dict is passed in, it is filled with how much work the indexed queue and the closed set saved:
+    #   duplicate_pushes_avoided: improved costs that lowered a queued entry instead of pushing a second copy
+    #   re_expansions_avoided: cheaper costs found for already expanded nodes, which would have been queued and expanded again
+    #   expanded: nodes taken off the queue and expanded
+    # An observer (Search_observer) is told about every push and expansion as they happen
+    # choose_queue picks the queue (Dial's bucket queue when every weight is a small integer), bucket_queue=True/False forces it
+    # Its slack only holds for greedy_dist, so any other heuristic gets the indexed heap
+    # workspace (A Search_workspace, Compact_grid only) is reused for the bookkeeping, see compact_a_star_search
+    if isinstance(grid, Compact_grid):
+        return compact_a_star_search(grid, start, end, stats, bucket_queue, heuristic, observer, workspace)
+    if workspace is not None:  # A Search_workspace is laid out by cell index, only a Compact_grid has those
+        raise TypeError("workspace needs a Compact_grid, not a {}".format(type(grid).__name__))
+    if unreachable(grid, start, end):  # Different components, there is nothing to search
+        if stats is not None:
+            stats.update(duplicate_pushes_avoided=0, re_expansions_avoided=0, expanded=0)
+        return {start: None}, {start: 0}
 
-    priority_queue = Priority_queue()  # Priority queue is used to store priorities of items and return the lowest costing/priority item
+    if heuristic is greedy_dist:
+        priority_queue = choose_queue(grid, 1, bucket_queue)  # Priority queue is used to store priorities of items and return the lowest costing/priority item
+    else:
+        priority_queue = Indexed_priority_queue()
+    closed = set()  # Nodes that have already been expanded (Their cost can't get any lower)
+    re_expansions_avoided = 0
     cost_so_far = dict()  # Min cost at given nodes atm
     cost_so_far[start] = 0  # Lowest cost at any given node (At a given time)
-    priority_queue.push(start, 0)  # Cost of the initial node is 0
+    priority_queue.push(start, heuristic(end, start))  # Cost of the initial node is 0 (Its priority still counts the distance to the end)
     came_from = dict()  # Stores the parent node of a node (Used to traverse the path of the min cost)
     came_from[start] = None  # Make sure that the starting node doesn't have a parent (Since its the start)
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, heuristic(end, start), 1)
 
     while not priority_queue.empty():
         cur = priority_queue.get_min()
+        closed.add(cur)
+        if observer is not None:
+            observer.expanded(cur)
 
         if cur == end:  # Base case break (Arrived at destination)
             break
@@ -110,14 +895,695 @@ def a_star_search(grid, start, end):
         # The distance from the neighbor to obj node is needed since we want to add a bias for paths that come closer to the obj node
         for neighbor in grid.return_neighbors(cur):
             new_cost = cost_so_far[cur] + grid.cur_to_next(neighbor)
-            if new_cost < cost_so_far.get(neighbor, 10 ** 10):  # It is possible to revisit a node if a more cost effective solution is found
+            if neighbor in closed:  # Expanded nodes are final, they are never queued again
+                if new_cost < cost_so_far[neighbor]:
+                    re_expansions_avoided += 1
+                continue
+            if new_cost < cost_so_far.get(neighbor, 10 ** 10):  # A queued node has its priority lowered if a more cost effective solution is found
                 cost_so_far[neighbor] = new_cost
-                priority = new_cost + greedy_dist(end, neighbor)
+                priority = new_cost + heuristic(end, neighbor)
                 priority_queue.push(neighbor, priority)
                 came_from[neighbor] = cur
+                if observer is not None:
+                    observer.pushed(neighbor, priority, len(priority_queue))
+
+    if observer is not None:
+        observer.finished()
+    if stats is not None:
+        stats['duplicate_pushes_avoided'] = priority_queue.decreased
+        stats['re_expansions_avoided'] = re_expansions_avoided
+        stats['expanded'] = len(closed)
+
+    return came_from, cost_so_far
+
 
+def compact_a_star_search(grid, start, end, stats=None, bucket_queue=None, heuristic=greedy_dist, observer=None, workspace=None):
+    # The same search as a_star_search, but every node is a cell index and the bookkeeping lives in the flat arrays of a Search_workspace
+    # Passing the same workspace to every query on a grid saves allocating them per query (A new one is made when none is given)
+    # came_from and cost_so_far are handed back as Cell_map views over the workspace so reconstruct_path and draw work on them unchanged
+    # (They are only good until the workspace's next query. workspace.path_to gives the path without building any dicts or lists)
+    # greedy_dist is worked out inline. Any other heuristic is called with cell indices (Landmarks built on this grid)
+    # The observer sees cell indices too (grid.position turns them back into (x, y))
+    cut_off = unreachable(grid, start, end)  # Different components: only start is reached, nothing is searched
+    start, end = grid.index(start), grid.index(end)
+    stride = grid.stride
+    end_x, end_y = divmod(end, stride)
+    open_cells = grid.open
+    weights = grid.weights
+    offsets = grid.offsets
+
+    if workspace is None:
+        workspace = Search_workspace(grid)
+    workspace.reset()
+    cost_so_far = workspace.cost
+    direction = workspace.direction
+    stamp = workspace.stamp
+    reached = workspace.generation  # Stamp of cells reached by this query
+    closed = reached + 1  # Stamp of cells it expanded
+    expanded = 0
+    re_expansions_avoided = 0
+    manhattan = heuristic is greedy_dist
+    priority_queue = choose_queue(grid, 1, bucket_queue) if manhattan else Indexed_priority_queue()
+    cost_so_far[start] = 0
+    direction[start] = START
+    stamp[start] = reached
+    if cut_off:
+        if stats is not None:
+            stats.update(duplicate_pushes_avoided=0, re_expansions_avoided=0, expanded=0)
+        return Cell_map(workspace), Cell_map(workspace, cost_so_far)
+    start_x, start_y = divmod(start, stride)
+    priority = abs(end_x - start_x) + abs(end_y - start_y) if manhattan else heuristic(end, start)
+    priority_queue.push(start, priority)
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, priority, 1)
+
+    while not priority_queue.empty():
+        cur = priority_queue.get_min()
+        stamp[cur] = closed
+        expanded += 1
+        if observer is not None:
+            observer.expanded(cur)
+
+        if cur == end:
+            break
+
+        cur_cost = cost_so_far[cur]
+        for code, offset in enumerate(offsets):
+            neighbor = cur + offset
+            if not open_cells[neighbor]:
+                continue
+            new_cost = cur_cost + weights[neighbor]
+            if stamp[neighbor] == closed:
+                if new_cost < cost_so_far[neighbor]:
+                    re_expansions_avoided += 1
+                continue
+            if stamp[neighbor] != reached or new_cost < cost_so_far[neighbor]:  # A stale cost from an earlier query doesn't count
+                cost_so_far[neighbor] = new_cost
+                direction[neighbor] = code
+                stamp[neighbor] = reached
+                if manhattan:
+                    x, y = divmod(neighbor, stride)
+                    priority = new_cost + abs(end_x - x) + abs(end_y - y)  # greedy_dist (The border padding cancels out)
+                else:
+                    priority = new_cost + heuristic(end, neighbor)
+                priority_queue.push(neighbor, priority)
+                if observer is not None:
+                    observer.pushed(neighbor, priority, len(priority_queue))
+
+    if observer is not None:
+        observer.finished()
+    if stats is not None:
+        stats['duplicate_pushes_avoided'] = priority_queue.decreased
+        stats['re_expansions_avoided'] = re_expansions_avoided
+        stats['expanded'] = expanded
+
+    return Cell_map(workspace), Cell_map(workspace, cost_so_far)
+
+def bidirectional_a_star_search(grid, start, end, stats=None, observer=None):
+    # Runs one search forward from start and one backward from end, and stops once they have provably met on the cheapest path
+    # Forward steps pay for the node they move into, backward steps pay for the node they move out of (The same edge, walked the other way)
+    # Both sides steer with the averaged potential (greedy_dist to end - greedy_dist to start) / 2, the forward side adding it
+    # and the backward side subtracting it, which keeps both sides' priorities consistent with each other
+    # Priorities are doubled so the halves stay whole numbers
+    # Stopping rule: once the lowest priorities of the two queues add up to at least (twice) the cheapest meeting cost found, nothing cheaper is left
+    # Returns (came_from, cost_so_far) like a_star_search: the forward tree, with the backward half of the best path reversed into it
+    # If a stats dict is passed in, stats['expanded'] is set to the number of nodes both sides expanded together
+    # An observer (Search_observer) sees both sides' pushes and expansions, and the frontier of the two queues together
+    # (On a Compact_grid it sees cell indices, like compact_a_star_search)
+    if unreachable(grid, start, end):
+        if stats is not None:
+            stats['expanded'] = 0
+        return {start: None}, {start: 0}
+    if isinstance(grid, Compact_grid):  # Searches on cell indices, the result is keyed by (x, y) again at the end
+        node_of, position_of = grid.index, grid.position
+    else:
+        node_of = position_of = lambda pos: pos
+    start_pos, end_pos = start, end
+    start, end = node_of(start), node_of(end)
+
+    def potential(node):  # Twice the forward side's potential
+        pos = position_of(node)
+        return greedy_dist(end_pos, pos) - greedy_dist(start_pos, pos)
+
+    queues = [Indexed_priority_queue(), Indexed_priority_queue()]  # Index 0 is the forward side, 1 the backward side
+    costs = [{start: 0}, {end: 0}]
+    parents = [{start: None}, {end: None}]
+    closed = [set(), set()]
+    queues[0].push(start, potential(start))
+    if grid.passable(end_pos):  # A walled off end can't be reached, so the backward side never starts
+        queues[1].push(end, -potential(end))
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, potential(start), 1)
+        if not queues[1].empty():
+            observer.pushed(end, -potential(end), 2)
+    best_cost, meet = (0, start) if start == end else (10 ** 10, None)
+    expanded = 0
+
+    while not queues[0].empty() and not queues[1].empty():
+        if queues[0].min_weight() + queues[1].min_weight() >= 2 * best_cost:
+            break
+
+        side = 0 if len(queues[0].elements) <= len(queues[1].elements) else 1  # Grow the smaller frontier
+        other = 1 - side
+        cur = queues[side].get_min()
+        closed[side].add(cur)
+        expanded += 1
+        if observer is not None:
+            observer.expanded(cur)
+
+        for neighbor in grid.return_neighbors(cur):
+            if neighbor in closed[side]:
+                continue
+            new_cost = costs[side][cur] + grid.cur_to_next(neighbor if side == 0 else cur)
+            if new_cost < costs[side].get(neighbor, 10 ** 10):
+                costs[side][neighbor] = new_cost
+                parents[side][neighbor] = cur
+                priority = 2 * new_cost + (potential(neighbor) if side == 0 else -potential(neighbor))
+                queues[side].push(neighbor, priority)
+                if observer is not None:
+                    observer.pushed(neighbor, priority, len(queues[0]) + len(queues[1]))
+                if neighbor in costs[other] and new_cost + costs[other][neighbor] < best_cost:  # The two searches touch here
+                    best_cost, meet = new_cost + costs[other][neighbor], neighbor
+
+    if observer is not None:
+        observer.finished()
+    came_from, cost_so_far = parents[0], costs[0]
+    if meet is not None:
+        # Walk the backward tree from the meeting node to the end, pointing each node back along the path
+        cur = meet
+        while cur != end:
+            next_node = parents[1][cur]
+            came_from[next_node] = cur
+            cost_so_far[next_node] = cost_so_far[cur] + grid.cur_to_next(next_node)
+            cur = next_node
+
+    if stats is not None:
+        stats['expanded'] = expanded
+    if isinstance(grid, Compact_grid):
+        came_from = {position_of(node): None if parent is None else position_of(parent) for node, parent in came_from.items()}
+        cost_so_far = {position_of(node): cost for node, cost in cost_so_far.items()}
     return came_from, cost_so_far
 
+
+def ara_star_search(grid, start, end, seconds=None, max_expansions=None, inflation=3.0, step=0.5, heuristic=greedy_dist, stats=None, observer=None):
+    # Anytime A* (ARA*, Likhachev et al.): the first search weights the heuristic by inflation, which finds a path quickly that
+    # costs at most inflation times the min. Then the weight is lowered by step and the search carries on from where it stopped
+    # (Its queue and costs are kept, only nodes whose cost went down since they were expanded are looked at again)
+    # until the weight reaches 1 (The path is then the cheapest) or the budget runs out: seconds of wall time, or max_expansions
+    # Returns (came_from, cost_so_far, bound) like a_star_search plus the bound proven for the path to end: its cost is at most
+    # bound times the min. The bound is cost / (lowest cost + heuristic over the nodes still queued or waiting to be), which
+    # holds at any point, so a search cut short mid weight still reports what it got to (inf = no path found in time, or none at all)
+    # heuristic(end, node) must never overestimate, like for a_star_search
+    # If a stats dict is passed in, stats['expanded'] is set to the nodes expanded over all the weights and stats['solutions']
+    # to (seconds since the start, inflation, cost, bound) for every weight the search got through
+    # An observer (Search_observer) is told about every push and expansion, over all the weights (Requeueing for the next weight counts as pushes)
+    if unreachable(grid, start, end):
+        if stats is not None:
+            stats.update(expanded=0, solutions=[])
+        return {start: None}, {start: 0}, math.inf
+    if isinstance(grid, Compact_grid):  # Searches on cell indices, the result is keyed by (x, y) again at the end
+        node_of, position_of = grid.index, grid.position
+    else:
+        node_of = position_of = lambda pos: pos
+    end_pos = end
+    start, end = node_of(start), node_of(end)
+    began = time.perf_counter()
+
+    estimates = {}  # Heuristic of every node reached (Each weight reuses them)
+    def estimate(node):
+        if node not in estimates:
+            estimates[node] = heuristic(end_pos, position_of(node))
+        return estimates[node]
+
+    cost_so_far = {start: 0}
+    came_from = {start: None}
+    priority_queue = Indexed_priority_queue()
+    priority_queue.push(start, inflation * estimate(start))
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, inflation * estimate(start), 1)
+    closed = set()  # Expanded at the current weight
+    inconsistent = set()  # Expanded at the current weight, then found cheaper (Queued again at the next weight)
+    expanded = 0
+    solutions = []
+    out_of_budget = False
+
+    def proven_bound():
+        if end not in cost_so_far:
+            return math.inf
+        waiting = [cost_so_far[node] + estimate(node) for node in priority_queue.position]
+        waiting += [cost_so_far[node] + estimate(node) for node in inconsistent]
+        lowest = min(waiting, default=cost_so_far[end])  # Nothing left anywhere: every path has been looked at
+        return cost_so_far[end] / lowest if lowest > 0 else 1.0
+
+    while True:
+        # One weighted A* search. It stops once nothing queued can beat the path to end at this weight
+        while not priority_queue.empty():
+            if end in cost_so_far and cost_so_far[end] + inflation * estimate(end) <= priority_queue.min_weight():
+                break
+            if (max_expansions is not None and expanded >= max_expansions) or \
+                    (seconds is not None and expanded % 64 == 0 and time.perf_counter() - began >= seconds):
+                out_of_budget = True
+                break
+            cur = priority_queue.get_min()
+            closed.add(cur)
+            expanded += 1
+            if observer is not None:
+                observer.expanded(cur)
+            for neighbor in grid.return_neighbors(cur):
+                new_cost = cost_so_far[cur] + grid.cur_to_next(neighbor)
+                if new_cost < cost_so_far.get(neighbor, 10 ** 10):
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = cur
+                    if neighbor in closed:  # Not expanded twice at the same weight, it waits for the next one
+                        inconsistent.add(neighbor)
+                    else:
+                        priority = new_cost + inflation * estimate(neighbor)
+                        priority_queue.push(neighbor, priority)
+                        if observer is not None:
+                            observer.pushed(neighbor, priority, len(priority_queue))
+
+        bound = proven_bound()
+        if out_of_budget or bound == math.inf:  # Out of time, or end can't be reached at all
+            break
+        bound = min(inflation, bound)
+        solutions.append((time.perf_counter() - began, inflation, cost_so_far[end], bound))
+        if bound <= 1:
+            break
+
+        # Lower the weight, and queue everything again with it (Including the nodes that got cheaper after being expanded)
+        inflation = max(1.0, inflation - step)
+        waiting = list(priority_queue.position) + list(inconsistent)
+        priority_queue = Indexed_priority_queue()
+        for node in waiting:
+            priority = cost_so_far[node] + inflation * estimate(node)
+            priority_queue.push(node, priority)
+            if observer is not None:
+                observer.pushed(node, priority, len(priority_queue))
+        closed = set()
+        inconsistent = set()
+
+    if observer is not None:
+        observer.finished()
+    if out_of_budget and solutions:  # The bound from partway through the next weight can only be as good or better
+        bound = min(bound, solutions[-1][3])
+    if stats is not None:
+        stats['expanded'] = expanded
+        stats['solutions'] = solutions
+    if isinstance(grid, Compact_grid):
+        came_from = {position_of(node): None if parent is None else position_of(parent) for node, parent in came_from.items()}
+        cost_so_far = {position_of(node): cost for node, cost in cost_so_far.items()}
+    return came_from, cost_so_far, bound
+
+
+def octile_dist(a, b):  # greedy_dist for grids that also allow diagonal steps (Each costing sqrt 2)
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+
+def jump_point_search(grid, start, end, diagonal=False, stats=None, observer=None):
+    # A* that only queues jump points: cells where an optimal path may have to turn
+    # On a grid where every step costs the same, the cells between two jump points never need to be looked at one by one,
+    # so long open stretches are skipped in a single jump instead of pushing every cell onto the heap
+    # diagonal=True allows diagonal steps (Costing sqrt 2, and never cutting the corner of a wall)
+    # Falls back to a_star_search when any cell has a weight other than 1, since the jumps rely on uniform costs
+    # Returns (came_from, cost_so_far) for just the cells of the path, filled in cell by cell so reconstruct_path works as usual
+    # If a stats dict is passed in, stats['expanded'] is set to the number of jump points expanded
+    # An observer (Search_observer) is told about every jump point pushed and expanded (The cells jumped over are not events)
+    if unreachable(grid, start, end):
+        if stats is not None:
+            stats['expanded'] = 0
+        return {start: None}, {start: 0}
+    if isinstance(grid, Compact_grid):
+        uniform = grid.min_weight == grid.max_weight == 1
+    else:
+        uniform = all(weight == 1 for weight in getattr(grid, 'weights', {}).values())
+    if not uniform and not diagonal:
+        return a_star_search(grid, start, end, stats, observer=observer)
+    if not uniform:
+        raise ValueError("Diagonal jump point search needs uniform weights")
+
+    def walkable(x, y):
+        return grid.in_bounds((x, y)) and grid.passable((x, y))
+
+    straight_jumps = {}  # (x, y, dx, dy) -> where a straight jump from (x, y) ends, so overlapping scans are only walked once
+
+    def jump(x, y, dx, dy):  # Step from (x, y) in direction (dx, dy) until hitting a jump point (Returned) or a dead end (None)
+        if dx and dy:
+            while True:
+                x, y = x + dx, y + dy
+                if not walkable(x, y):
+                    return None
+                if (x, y) == end:
+                    return x, y
+                # Moving diagonally, any jump point found by the straight scans makes this cell a jump point
+                if jump(x, y, dx, 0) or jump(x, y, 0, dy):
+                    return x, y
+                if not (walkable(x + dx, y) and walkable(x, y + dy)):  # Don't cut corners
+                    return None
+
+        scanned = []
+        while True:
+            if (x, y, dx, dy) in straight_jumps:
+                jump_point = straight_jumps[(x, y, dx, dy)]
+                break
+            scanned.append((x, y, dx, dy))
+            x, y = x + dx, y + dy
+            if not walkable(x, y):
+                jump_point = None
+                break
+            if (x, y) == end:
+                jump_point = x, y
+                break
+            if dx:
+                # Forced neighbor: a wall next to the previous cell means the cell beside this one can't be reached any cheaper another way
+                if (walkable(x, y - 1) and not walkable(x - dx, y - 1)) or (walkable(x, y + 1) and not walkable(x - dx, y + 1)):
+                    jump_point = x, y
+                    break
+            else:
+                if (walkable(x - 1, y) and not walkable(x - 1, y - dy)) or (walkable(x + 1, y) and not walkable(x + 1, y - dy)):
+                    jump_point = x, y
+                    break
+                if not diagonal and (jump(x, y, 1, 0) or jump(x, y, -1, 0)):  # Without diagonals, vertical moves scan sideways at every cell
+                    jump_point = x, y
+                    break
+        for key in scanned:  # Every cell walked past ends up at the same place
+            straight_jumps[key] = jump_point
+        return jump_point
+
+    def directions(pos, parent):  # Directions worth jumping in from pos, pruned by the direction it was reached from
+        x, y = pos
+        if parent is None:
+            steps = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+            if diagonal:
+                steps += [(dx, dy) for dx in (1, -1) for dy in (1, -1) if walkable(x + dx, y) and walkable(x, y + dy)]
+            return steps
+        dx, dy = (x > parent[0]) - (x < parent[0]), (y > parent[1]) - (y < parent[1])
+        if not diagonal:
+            return [(dx, 0), (0, 1), (0, -1)] if dx else [(0, dy), (1, 0), (-1, 0)]
+        steps = []
+        if dx and dy:
+            if walkable(x, y + dy):
+                steps.append((0, dy))
+            if walkable(x + dx, y):
+                steps.append((dx, 0))
+            if walkable(x, y + dy) and walkable(x + dx, y):
+                steps.append((dx, dy))
+        elif dx:
+            if walkable(x + dx, y):
+                steps += [(dx, 0)] + [(dx, side) for side in (1, -1) if walkable(x, y + side)]
+            steps += [(0, side) for side in (1, -1) if walkable(x, y + side)]
+        else:
+            if walkable(x, y + dy):
+                steps += [(0, dy)] + [(side, dy) for side in (1, -1) if walkable(x + side, y)]
+            steps += [(side, 0) for side in (1, -1) if walkable(x + side, y)]
+        return steps
+
+    heuristic = octile_dist if diagonal else greedy_dist
+    priority_queue = Indexed_priority_queue()
+    cost_so_far = {start: 0}
+    came_from = {start: None}  # Jump point -> the jump point it was reached from
+    closed = set()
+    priority_queue.push(start, heuristic(end, start))
+    expanded = 0
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, heuristic(end, start), 1)
+
+    while not priority_queue.empty():
+        cur = priority_queue.get_min()
+        closed.add(cur)
+        expanded += 1
+        if observer is not None:
+            observer.expanded(cur)
+        if cur == end:
+            break
+
+        for dx, dy in directions(cur, came_from[cur]):
+            jump_point = jump(cur[0], cur[1], dx, dy)
+            if jump_point is None or jump_point in closed:
+                continue
+            new_cost = cost_so_far[cur] + heuristic(jump_point, cur)  # Jumps are straight lines, so this is their exact cost
+            if new_cost < cost_so_far.get(jump_point, 10 ** 10):
+                cost_so_far[jump_point] = new_cost
+                came_from[jump_point] = cur
+                priority = new_cost + heuristic(end, jump_point)
+                priority_queue.push(jump_point, priority)
+                if observer is not None:
+                    observer.pushed(jump_point, priority, len(priority_queue))
+
+    if observer is not None:
+        observer.finished()
+    if stats is not None:
+        stats['expanded'] = expanded
+    if end not in closed:
+        return {start: None}, {start: 0}
+
+    # Fill in the cells between consecutive jump points of the path
+    path_came_from, path_cost_so_far = {start: None}, {start: 0}
+    jump_points = [end]
+    while jump_points[-1] != start:
+        jump_points.append(came_from[jump_points[-1]])
+    for parent, jump_point in zip(reversed(jump_points), reversed(jump_points[:-1])):
+        dx = (jump_point[0] > parent[0]) - (jump_point[0] < parent[0])
+        dy = (jump_point[1] > parent[1]) - (jump_point[1] < parent[1])
+        cur = parent
+        while cur != jump_point:
+            next_cell = (cur[0] + dx, cur[1] + dy)
+            path_came_from[next_cell] = cur
+            path_cost_so_far[next_cell] = path_cost_so_far[cur] + (math.sqrt(2) if dx and dy else 1)
+            cur = next_cell
+    path_cost_so_far[end] = cost_so_far[end]  # Same total without the rounding of adding sqrt 2 up step by step
+    return path_came_from, path_cost_so_far
+
+
+class Landmarks:
+    # ALT heuristic (A*, Landmarks, Triangle inequality) for grids where greedy_dist is a poor guess (Walls, expensive terrain)
+    # A few landmark cells are picked far apart, and the exact min cost from and to every cell is stored for each of them
+    # For any landmark L the triangle inequality gives two lower bounds on the cost from node to end:
+    #   cost(L, end) - cost(L, node) and cost(node, L) - cost(end, L)
+    # heuristic takes the largest one over all landmarks, so it knows about the walls and weights greedy_dist ignores
+    # Tables are flat 'd' arrays, one cost per cell (inf = unreachable). On a Compact_grid nodes are cell indices,
+    # on Grid/Weighted_grid (x, y) is stored at x * h + y
+    def __init__(self, grid, count=8, first=None):
+        self.grid = grid
+        self.compact = isinstance(grid, Compact_grid)
+        self.size = grid.size if self.compact else grid.w * grid.h
+        if first is None:  # Any passable cell will do, it only seeds the farthest point selection
+            first = next((pos for pos in ((x, y) for x in range(grid.w) for y in range(grid.h)) if grid.passable(pos)), None)
+            if first is None:
+                raise ValueError("Landmarks need a grid with at least one passable cell")
+        if self.compact:
+            first = grid.index(first)
+        self.landmarks = []
+        self.tables = []  # (cost from landmark, cost to landmark) per landmark
+
+        # Farthest point selection: the first landmark is the cell farthest from the seed,
+        # every next one the cell whose nearest landmark so far is the farthest away
+        nearest = self.costs(first, backward=False)
+        for _ in range(count):
+            landmark = max((cell for cell in range(self.size) if nearest[cell] != math.inf), key=nearest.__getitem__, default=None)
+            if landmark is None or (self.landmarks and nearest[landmark] == 0):  # Every reachable cell is already a landmark
+                break
+            if not self.landmarks:
+                nearest = array('d', [math.inf]) * self.size
+            node = landmark if self.compact else divmod(landmark, grid.h)
+            from_landmark, to_landmark = self.costs(node, backward=False), self.costs(node, backward=True)
+            self.landmarks.append(node)
+            self.tables.append((from_landmark, to_landmark))
+            for cell in range(self.size):
+                if from_landmark[cell] < nearest[cell]:
+                    nearest[cell] = from_landmark[cell]
+
+    def cell(self, node):
+        return node if self.compact else node[0] * self.grid.h + node[1]
+
+    def costs(self, source, backward):
+        # Dijkstra from source over the whole grid. Moving into a cell costs that cell's weight,
+        # so going backward (cost from every cell to source) a step from cur to neighbor costs cur's weight
+        grid = self.grid
+        costs = array('d', [math.inf]) * self.size
+        costs[self.cell(source)] = 0
+        priority_queue = Indexed_priority_queue()
+        priority_queue.push(source, 0)
+        while not priority_queue.empty():
+            cost = priority_queue.min_weight()
+            cur = priority_queue.get_min()
+            for neighbor in grid.return_neighbors(cur):
+                new_cost = cost + grid.cur_to_next(cur if backward else neighbor)
+                cell = self.cell(neighbor)
+                if new_cost < costs[cell]:
+                    costs[cell] = new_cost
+                    priority_queue.push(neighbor, new_cost)
+        return costs
+
+    def heuristic(self, end, node):  # Same argument order as greedy_dist(end, neighbor) in a_star_search
+        end, node = self.cell(end), self.cell(node)
+        best = 0
+        for from_landmark, to_landmark in self.tables:
+            bound = from_landmark[end] - from_landmark[node]
+            if best < bound < math.inf:  # Bounds involving an unreachable cell are inf or nan and are skipped
+                best = bound
+            bound = to_landmark[node] - to_landmark[end]
+            if best < bound < math.inf:
+                best = bound
+        return best
+
+    def report(self, queries):
+        # Runs every (start, end) query with greedy_dist and with the landmarks, and totals up the nodes each one expanded
+        greedy_expanded = landmark_expanded = 0
+        for start, end in queries:
+            stats = {}
+            a_star_search(self.grid, start, end, stats)
+            greedy_expanded += stats['expanded']
+            a_star_search(self.grid, start, end, stats, heuristic=self.heuristic)
+            landmark_expanded += stats['expanded']
+        return {'greedy_expanded': greedy_expanded, 'landmark_expanded': landmark_expanded,
+                'fewer_expanded': greedy_expanded - landmark_expanded,
+                'fewer_fraction': (greedy_expanded - landmark_expanded) / greedy_expanded if greedy_expanded else 0.0}
+
+
+class Path_cache:
+    # Memoizes a_star_search + reconstruct_path for (start, end) queries asked over and over on a grid that rarely changes
+    # Holds at most max_entries paths and evicts the least recently used one past that
+    # Every entry is valid as of self.version. Before answering, the cache catches up on the grid's edits since then
+    # (grid.edits, made through set_wall/set_weight) and drops only the paths an edit can affect:
+    #   a cell got more expensive (or walled): the paths that go through it
+    #   a cell got cheaper (or opened up): the paths through it, plus any path a detour through the cell could beat
+    #   (Every step costs at least 1, so a detour through the cell costs at least greedy_dist there and on to the end)
+    # Walls or weights assigned directly (grid.walls = ...) are not seen, so the cache can't be used on grids edited that way
+    def __init__(self, grid, max_entries=1024):
+        self.grid = grid
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (start, end) -> (path, cost), least recently used first. The path is None when there is none
+        self.through = {}  # cell -> keys of the entries whose path goes through it
+        self.version = grid.version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, start, end):
+        # Returns (path, cost): the path as a tuple from end back to start like reconstruct_path (None and None if there is none)
+        self.catch_up()
+        key = (start, end)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        came_from, cost_so_far = a_star_search(self.grid, start, end)
+        if end in cost_so_far:
+            path = [end]
+            while path[-1] != start:
+                path.append(came_from[path[-1]])
+            entry = tuple(path), cost_so_far[end]
+        else:
+            entry = None, None
+        self.entries[key] = entry
+        for cell in entry[0] or ():
+            self.through.setdefault(cell, set()).add(key)
+        if len(self.entries) > self.max_entries:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+        return entry
+
+    def catch_up(self):
+        if self.version < self.grid.edits_start:  # The edits it missed were dropped from the log, so every path is suspect
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.through.clear()
+            self.version = self.grid.version
+            return
+        for pos, old_cost, new_cost in self.grid.edits[self.version - self.grid.edits_start:]:
+            stale = set(self.through.get(pos, ()))
+            if new_cost < old_cost:
+                for (start, end), (path, cost) in self.entries.items():
+                    if path is None or greedy_dist(start, pos) + greedy_dist(pos, end) < cost:
+                        stale.add((start, end))
+            for key in stale:
+                self.drop(key)
+                self.invalidations += 1
+        self.version = self.grid.version
+
+    def drop(self, key):
+        path, cost = self.entries.pop(key)
+        for cell in path or ():
+            self.through[cell].discard(key)
+            if not self.through[cell]:
+                del self.through[cell]
+
+
+class Shared_grid:
+    # A Compact_grid copied once into a multiprocessing.shared_memory block (The weights, then the open bitmap)
+    # Pool workers attach to the block by name, so the map is never pickled along with the queries sent to them
+    def __init__(self, grid):
+        self.size = grid.size
+        weight_bytes = memoryview(grid.weights).cast('B')
+        self.memory = shared_memory.SharedMemory(create=True, size=len(weight_bytes) + grid.size)
+        self.memory.buf[:len(weight_bytes)] = weight_bytes
+        self.memory.buf[len(weight_bytes):] = grid.open
+        self.spec = (self.memory.name, grid.w, grid.h, grid.weights.typecode, grid.min_weight, grid.max_weight)
+
+    @staticmethod
+    def attach(name, w, h, typecode, min_weight, max_weight):  # Takes a spec, returns the block and a Compact_grid over it
+        memory = shared_memory.SharedMemory(name=name)
+        size = (w + 2) * (h + 2)
+        weights = memory.buf[:size * array(typecode).itemsize].cast(typecode)
+        open_cells = memory.buf[len(weights) * weights.itemsize:][:size]
+        return memory, Compact_grid.from_buffers(w, h, open_cells, weights, min_weight, max_weight)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+worker_memory = None  # The shared block, grid and workspace of a batch_a_star_search worker process (Set by attach_worker)
+worker_grid = None
+worker_workspace = None
+
+
+def attach_worker(spec):
+    global worker_memory, worker_grid, worker_workspace
+    worker_memory, worker_grid = Shared_grid.attach(*spec)
+    worker_workspace = Search_workspace(worker_grid)
+
+
+def batch_query(task):
+    # Runs one query in a worker. The path comes back as an array of cell indices from start to end (Empty if there is none)
+    number, start, end = task
+    compact_a_star_search(worker_grid, start, end, workspace=worker_workspace)
+    return number, array('i', worker_workspace.path_to(worker_grid.index(end)))
+
+
+def batch_a_star_search(grid, queries, processes=None, chunksize=None):
+    # Spreads a list of (start, end) queries over a pool of worker processes, all reading the same Shared_grid
+    # Yields (query number, path) as each query finishes, so the order is completion order, not the order of queries
+    # Paths are arrays of Compact_grid cell indices (grid.position turns one back into (x, y)), 4 bytes a step
+    # Workers are forked: these scripts have no __main__ guard, so a spawned worker would rerun every demo
+    # Queries the grid's Components turn down come back first, with an empty path, without going to a worker
+    tasks = []
+    for number, (start, end) in enumerate(queries):
+        if unreachable(grid, start, end):
+            yield number, array('i')
+        else:
+            tasks.append((number, start, end))
+    if not isinstance(grid, Compact_grid):
+        grid = Compact_grid.from_grid(grid)
+    processes = processes or multiprocessing.cpu_count()
+    if chunksize is None:  # A few chunks per worker keeps them all busy without paying for a message per query
+        chunksize = max(1, len(tasks) // (processes * 4))
+    shared = Shared_grid(grid)
+    try:
+        with multiprocessing.get_context('fork').Pool(processes, attach_worker, (shared.spec,)) as pool:
+            yield from pool.imap_unordered(batch_query, tasks, chunksize)
+    finally:
+        shared.close()
+
+
 def reconstruct_path(came_from, start, end):
     current = end
     path = []
@@ -130,9 +1596,8 @@ def reconstruct_path(came_from, start, end):
     return path
 
 
-weighted_grid = Weighted_grid(10, 10, [])
+weighted_grid = Weighted_grid(10, 10, [(1, 7), (1, 8), (2, 7), (2, 8), (3, 7), (3, 8)])
 
-weighted_grid.walls = [(1, 7), (1, 8), (2, 7), (2, 8), (3, 7), (3, 8)]
 weighted_grid.weights = {loc: 5 for loc in [(3, 4), (3, 5), (4, 1), (4, 2),
                                        (4, 3), (4, 4), (4, 5), (4, 6),
                                        (4, 7), (4, 8), (5, 1), (5, 2),
@@ -148,6 +1613,32 @@ print(cost_so_far)
 path = reconstruct_path(came_from, start, end)
 weighted_grid.draw(came_from, start,  end)
 
+# Same search on the array backed grid (Should give the exact same path)
+compact_grid = Compact_grid.from_grid(weighted_grid)
+compact_came_from, compact_cost_so_far = a_star_search(compact_grid, start, end)
+print(reconstruct_path(compact_came_from, start, end) == path)
+
+# Searching from both ends at once (Same min cost, fewer nodes expanded on long queries)
+bidirectional_came_from, bidirectional_cost_so_far = bidirectional_a_star_search(weighted_grid, start, end)
+print(bidirectional_cost_so_far[end] == cost_so_far[end], len(reconstruct_path(bidirectional_came_from, start, end)) == len(path))
+
+# Jump point search needs uniform costs, so try it on the same walls without the weights
+uniform_grid = Weighted_grid(weighted_grid.w, weighted_grid.h, weighted_grid.walls)
+jps_came_from, jps_cost_so_far = jump_point_search(uniform_grid, start, end)
+uniform_came_from, uniform_cost_so_far = a_star_search(uniform_grid, start, end)
+print(jps_cost_so_far[end] == uniform_cost_so_far[end], len(reconstruct_path(jps_came_from, start, end)) == uniform_cost_so_far[end] + 1)
+
+# Repeated queries through a path cache, with an edit in between
+path_cache = Path_cache(weighted_grid)
+cached_path, cached_cost = path_cache.get(start, end)
+cached_path, cached_cost = path_cache.get(start, end)
+weighted_grid.set_weight((9, 0), 5)  # Far from the path, nothing is invalidated
+cached_path, cached_cost = path_cache.get(start, end)
+weighted_grid.set_wall(path[len(path) // 2])  # On the path, so it has to be searched again
+cached_path, cached_cost = path_cache.get(start, end)
+print("Hits", path_cache.hits, "misses", path_cache.misses, "invalidations", path_cache.invalidations, "cost now", cached_cost)
+weighted_grid.set_wall(path[len(path) // 2], False)
+
 # Draw the path
 for y in range(weighted_grid.h):
     for x in range(weighted_grid.w):
@@ -155,4 +1646,93 @@ for y in range(weighted_grid.h):
             print("@", end = ' ')
         else:
             print(".", end = ' ')
-    print()
\ No newline at end of file
+    print()
+
+# Bucket queue vs indexed heap on a bigger generated map with the same kind of terrain (Costs 1 and 5)
+random.seed(0)
+size = 300
+bench_grid = Weighted_grid(size, size, [])
+bench_grid.walls = {(x, y): True for x in range(size) for y in range(size) if random.random() < 0.2}
+bench_grid.weights = {(x, y): 5 for x in range(size) for y in range(size) if random.random() < 0.3}
+bench_start, bench_end = (0, 0), (size - 1, size - 1)
+bench_grid.walls.pop(bench_start, None)
+bench_grid.walls.pop(bench_end, None)
+for grid_name, grid in (("Weighted_grid", bench_grid), ("Compact_grid", Compact_grid.from_grid(bench_grid))):
+    for queue_name, bucket_queue in (("heap", False), ("bucket queue", True)):
+        began = time.perf_counter()
+        came_from, cost_so_far = a_star_search(grid, bench_start, bench_end, bucket_queue=bucket_queue)
+        print(grid_name, queue_name, "cost", cost_so_far.get(bench_end), "took", round(time.perf_counter() - began, 3), "s")
+
+# Landmark (ALT) heuristic vs greedy_dist on a smaller map of the same kind
+random.seed(1)
+size = 100
+landmark_grid = Weighted_grid(size, size, [])
+landmark_grid.walls = {(x, y): True for x in range(size) for y in range(size) if random.random() < 0.2}
+landmark_grid.weights = {(x, y): 5 for x in range(size) for y in range(size) if random.random() < 0.3}
+open_cells = [(x, y) for x in range(size) for y in range(size) if (x, y) not in landmark_grid.walls]
+landmarks = Landmarks(landmark_grid, 8)
+report = landmarks.report([(random.choice(open_cells), random.choice(open_cells)) for _ in range(20)])
+print("Expanded with greedy_dist", report['greedy_expanded'], "with landmarks", report['landmark_expanded'],
+      "({}% fewer)".format(round(100 * report['fewer_fraction'])))
+
+# A batch of queries on the same map, one after the other and then spread over a process pool
+batch_queries = [(random.choice(open_cells), random.choice(open_cells)) for _ in range(200)]
+compact_landmark_grid = Compact_grid.from_grid(landmark_grid)
+began = time.perf_counter()
+serial_costs = [a_star_search(compact_landmark_grid, batch_start, batch_end)[1].get(batch_end) for batch_start, batch_end in batch_queries]
+print("Serial", len(batch_queries), "queries took", round(time.perf_counter() - began, 3), "s")
+began = time.perf_counter()
+batch_paths = dict(batch_a_star_search(compact_landmark_grid, batch_queries))
+print("Batch on", multiprocessing.cpu_count(), "processes took", round(time.perf_counter() - began, 3), "s")
+print(all(sum(compact_landmark_grid.weights[cell] for cell in batch_paths[number][1:]) == serial_costs[number]
+          for number in range(len(batch_queries)) if serial_costs[number] is not None))
+
+# Component labels turn down queries with no path straight away, and follow walls being added and removed
+weighted_grid.components = Components(weighted_grid)
+for y in range(weighted_grid.h):  # Cut off the last column
+    weighted_grid.set_wall((8, y))
+print("Cut off", (9, 0) in a_star_search(weighted_grid, start, (9, 0))[1], "components", len(weighted_grid.components.sizes))
+weighted_grid.set_wall((8, 0), False)
+print("Opened again", (9, 0) in a_star_search(weighted_grid, start, (9, 0))[1], "components", len(weighted_grid.components.sizes))
+
+landmark_grid.components = Components(landmark_grid)
+labels = landmark_grid.components.labels
+pocket = next(pos for pos in open_cells if labels[landmark_grid.components.cell(pos)] != labels[landmark_grid.components.cell(open_cells[0])])
+for components in (None, landmark_grid.components):
+    landmark_grid.components = components
+    began = time.perf_counter()
+    a_star_search(landmark_grid, open_cells[0], pocket)
+    print("Unreachable query", "with" if components else "without", "components took", round(time.perf_counter() - began, 5), "s")
+
+# Watching a search through an observer (Counters, plus the time every 5000 expansions)
+observer = Search_observer(sample_every=5000)
+a_star_search(bench_grid, bench_start, bench_end, observer=observer)
+print("Expanded", observer.expansions, "pushes", observer.pushes, "max frontier", observer.max_frontier,
+      "took", round(observer.seconds, 3), "s", "samples", [(expansions, round(seconds, 3)) for expansions, seconds in observer.samples])
+
+# A MovingAI style map imported into a tiled map file. A search only reads the tiles around its path
+random.seed(2)
+size = 2048
+map_directory = tempfile.TemporaryDirectory()  # Removed with both files once the map is closed
+map_path = os.path.join(map_directory.name, "generated.map")
+with open(map_path, 'w') as file:
+    file.write("type octile\nheight {}\nwidth {}\nmap\n".format(size, size))
+    for y in range(size):
+        file.write(''.join(random.choices('.@TS', (75, 10, 5, 10), k=size)) + "\n")
+began = time.perf_counter()
+tiled_map = Tiled_map.import_movingai(map_path, os.path.join(map_directory.name, "generated.tmap"), {'.': 1, 'G': 1, 'S': 3})
+print("Imported", size, "x", size, "in", round(time.perf_counter() - began, 2), "s,", os.path.getsize(map_path), "byte .map to",
+      os.path.getsize(os.path.join(map_directory.name, "generated.tmap")), "byte tiled map")
+tiled_start = next((x, 100) for x in range(100, size) if tiled_map.passable((x, 100)))
+tiled_end = next((x, 260) for x in range(300, size) if tiled_map.passable((x, 260)))
+came_from, cost_so_far = a_star_search(tiled_map, tiled_start, tiled_end)
+print("Cost", cost_so_far.get(tiled_end), "touched", tiled_map.tiles_touched, "of", tiled_map.tile_count, "tiles")
+tiled_map.close()
+map_directory.cleanup()
+
+# Anytime search on the bucket queue map: some path within a deadline, better ones (And a tighter bound) the longer it gets
+for deadline in (0.05, 0.2, None):
+    stats = {}
+    came_from, cost_so_far, bound = ara_star_search(bench_grid, bench_start, bench_end, seconds=deadline, stats=stats)
+    print("Deadline", deadline, "cost", cost_so_far.get(bench_end), "at most", round(bound, 3), "times the min, expanded", stats['expanded'],
+          "solutions", [(round(seconds, 3), inflation, cost) for seconds, inflation, cost, solution_bound in stats['solutions']])
@@ -1,8 +1,17 @@
-import pygame
+import os
+import random
 import sys
-import heapq
 import time
 
+HEADLESS = '--headless' in sys.argv  # Runs the frame rate benchmark on SDL's dummy video driver (No window, frames only drawn in memory)
+if HEADLESS:
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+import pygame
+
+EXPANSIONS_PER_FRAME = 4  # Expansions drawn together in one frame (1 shows every single one, but slows big searches to the frame rate)
+FPS = 24  # Frame rate cap while animating (0 = as fast as it can draw)
+
 class Screen:
     def __init__(self, width, height):
         self.width = width
@@ -24,7 +33,9 @@ class Grid:
         self.walls = {}
         self.weights = {}
         self.path = []  # The path from start to end for the shortest path (Should only be present during path reconstruction)
-        self.font = pygame.font.SysFont('Comic Sans MS', 30)  # Set up font
+        self.font = pygame.font.SysFont('Comic Sans MS', block_w * 2 // 3)  # Set up font
+        self.glyphs = {}  # Weight -> its text, rendered once and blitted from then on
+        self.dirty = set()  # Cells whose look changed since the last frame (Only these get repainted)
         self.start = start
         self.end = end
 
@@ -49,60 +60,164 @@ class Grid:
 
     def draw_path(self, path):
         for x, y in path:
-            weighted_grid.path.append((x, y))
-            pygame.draw.rect(screen.screen, (0,0,0), (x * self.block_w, y * self.block_w, self.block_w, self.block_w))
-            pygame.display.update()
+            self.path.append((x, y))
+            self.mark((x, y))
+            pygame.display.update(self.draw_dirty())
             clock.tick(20)
 
-    def draw(self):
-        # Draw visited
-        for x, y in self.visited.keys():
-            pygame.draw.rect(screen.screen, (180, 100,200),
-                             (x * self.block_w, y * self.block_w, self.block_w, self.block_w))
-
-        # Draw frontier
-        for x, y in self.frontier.keys():
-            pygame.draw.rect(screen.screen, (10, 50, 255),
-                             (x * self.block_w, y * self.block_w, self.block_w, self.block_w))
-
-        # Draw start
-        x, y = self.start
-        pygame.draw.rect(screen.screen, (0, 255, 0), (x * self.block_w, y *self.block_w, self.block_w, self.block_w))
-
-        # Draw end
-        x, y = self.end
-        pygame.draw.rect(screen.screen, (0, 255, 0), (x * self.block_w, y *self.block_w, self.block_w, self.block_w))
-
-        # Draw path
-        for x, y in self.path:
-            pygame.draw.rect(screen.screen, (0, 0, 0),
-                             (x * self.block_w, y * self.block_w, self.block_w, self.block_w))
-
-        # Draw walls
-        for x, y in self.walls.keys():
-            pygame.draw.rect(screen.screen, (200, 200, 255),
-                             (x * self.block_w, y * self.block_w, self.block_w, self.block_w))
-
-        # Draw weights
-        for y in range(self.h):
-            for x in range(self.w):
-                if (x, y) not in self.walls:  # We don't draw the cost for walls since they are unpassable
-                    cost_txt = self.font.render(str(self.weights.get((x, y), 1)), False, (255, 100, 100))
-                    screen.screen.blit(cost_txt, (x * self.block_w + 16, y * self.block_w + 2))
-
-class Priority_queue:
+    def mark(self, pos):  # Call whenever pos changes (visited, frontier, path, walls, weights) so the next frame repaints it
+        self.dirty.add(pos)
+
+    def mark_all(self):
+        self.dirty.update((x, y) for x in range(self.w) for y in range(self.h))
+
+    def glyph(self, weight):
+        if weight not in self.glyphs:
+            self.glyphs[weight] = self.font.render(str(weight), False, (255, 100, 100))
+        return self.glyphs[weight]
+
+    def cell_color(self, pos):
+        # Later layers cover earlier ones: visited, frontier, start and end, path, walls
+        if pos in self.walls:
+            return (200, 200, 255)
+        if pos in self.path:
+            return (0, 0, 0)
+        if pos == self.start or pos == self.end:
+            return (0, 255, 0)
+        if pos in self.frontier:
+            return (10, 50, 255)
+        if pos in self.visited:
+            return (180, 100, 200)
+        return (255, 255, 255)
+
+    def draw_cell(self, pos):  # Paints one cell and its weight, and returns the rect that changed on screen
+        x, y = pos
+        rect = pygame.Rect(x * self.block_w, y * self.block_w, self.block_w, self.block_w)
+        pygame.draw.rect(screen.screen, self.cell_color(pos), rect)
+        if pos not in self.walls:  # We don't draw the cost for walls since they are unpassable
+            cost_txt = self.glyph(self.weights.get(pos, 1))
+            screen.screen.blit(cost_txt, cost_txt.get_rect(center=rect.center))
+        return rect
+
+    def draw_dirty(self):  # Repaints just the cells marked since the last frame. The rects go to pygame.display.update
+        rects = [self.draw_cell(pos) for pos in self.dirty if self.in_bounds(pos)]
+        self.dirty.clear()
+        return rects
+
+    def draw(self):  # Repaints every cell
+        self.mark_all()
+        self.draw_dirty()
+
+class Indexed_priority_queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
     def __init__(self):
-        # Note that the heap is a min heap and NOT max heap
         self.elements = []
+        self.position = {}  # item -> index of its pair in elements
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
 
     def empty(self):
         return len(self.elements) == 0
 
+    def __len__(self):
+        return len(self.elements)
+
     def get_min(self):
-        return heapq.heappop(self.elements)[1]
+        item = self.elements[0][1]
+        del self.position[item]
+        last = self.elements.pop()
+        if self.elements:
+            self.elements[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
 
     def push(self, item, weight):
-        heapq.heappush(self.elements, [weight, item])
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.elements[i][0]:  # Only ever lower an item's weight
+                return
+            self.elements[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.elements)
+            self.elements.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def sift_up(self, i):
+        entry = self.elements[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.elements[parent]:
+                break
+            self.elements[i] = self.elements[parent]
+            self.position[self.elements[i][1]] = i
+            i = parent
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.elements[i]
+        size = len(self.elements)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.elements[child + 1] < self.elements[child]:
+                child += 1
+            if not self.elements[child] < entry:
+                break
+            self.elements[i] = self.elements[child]
+            self.position[self.elements[i][1]] = i
+            i = child
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+
+class Search_observer:
+    # Watches a search from the outside: counters, and optionally callbacks and sampled timing
+    # Searches take observer=None. Without one, all a search pays is an 'is not None' check per event
+    #   expansions: nodes taken off the queue and expanded
+    #   pushes: pushes onto the queue (Including ones that only lowered the priority of a queued node)
+    #   max_frontier: most nodes queued at once
+    # on_expand(node) and on_push(node, priority), when given, are called for every event as it happens
+    # sample_every=n appends (expansions, seconds since the search started) to samples every n expansions
+    # Counters keep adding up over several searches until reset is called. seconds is the time spent in them
+    def __init__(self, on_expand=None, on_push=None, sample_every=0):
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.expansions = 0
+        self.pushes = 0
+        self.max_frontier = 0
+        self.samples = []
+        self.seconds = 0
+        self.began = time.perf_counter()
+
+    def started(self):
+        self.began = time.perf_counter()
+
+    def expanded(self, node):
+        self.expansions += 1
+        if self.on_expand is not None:
+            self.on_expand(node)
+        if self.sample_every and self.expansions % self.sample_every == 0:
+            self.samples.append((self.expansions, time.perf_counter() - self.began))
+
+    def pushed(self, node, priority, frontier):  # frontier is how many nodes are queued after the push
+        self.pushes += 1
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.on_push is not None:
+            self.on_push(node, priority)
+
+    def finished(self):
+        self.seconds += time.perf_counter() - self.began
 
 
 def greedy_dist(a, b):  # Returns the manhattan distance from point a to b or b to a
@@ -110,43 +225,51 @@ def greedy_dist(a, b):  # Returns the manhattan distance from point a to b or b
     x2, y2 = b
     return abs(x1 - x2) + abs(y1 - y2)
 
-def draw_everything():
-    screen.draw()
-    weighted_grid.draw()
-    pygame.display.update()
-    clock.tick(24)  # Fps (Don't know why/how it does it)
+def draw_everything():  # One frame: only the cells that changed are repainted and sent to the display
+    global frames_drawn
+    pygame.display.update(weighted_grid.draw_dirty())
+    frames_drawn += 1
+    clock.tick(FPS)  # Fps (Don't know why/how it does it)
 
-def a_star_search(grid, start, end):
+def a_star_search(grid, start, end, observer=None):
     # The most important parts of dijkstras is the priority queue and the presence of weighted graphs (Usually)
     # The priority queue is used to choose paths with the least cost (No matter how far the path may have already gone)
+    # The search knows nothing about drawing. The animation watches it through an observer (Search_observer) instead
 
-    priority_queue = Priority_queue()
+    priority_queue = Indexed_priority_queue()
+    closed = set()  # Nodes that have already been expanded (Their cost can't get any lower)
     cost_so_far = {}
     cost_so_far[start] = 0  # Lowest cost at any given node (At a given time)
     priority_queue.push(start, 0)
     came_from = {}
     came_from[start] = None
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, 0, 1)
 
     while not priority_queue.empty():
         cur = priority_queue.get_min()
-
-        weighted_grid.visited[cur] = True
-        try: del weighted_grid.frontier[cur]
-        except KeyError: pass
+        closed.add(cur)
+        if observer is not None:
+            observer.expanded(cur)
 
         if cur == end:
             break
 
         for neighbor in grid.return_neighbors(cur):
+            if neighbor in closed:  # Expanded nodes are final, they are never queued again
+                continue
             new_cost = cost_so_far[cur] + grid.cur_to_next(neighbor)
-            if new_cost < cost_so_far.get(neighbor, 10 ** 10):  # It is possible to revisit a node if a more cost effective solution is found
+            if new_cost < cost_so_far.get(neighbor, 10 ** 10):  # A queued node has its priority lowered if a more cost effective solution is found
                 cost_so_far[neighbor] = new_cost
                 priority = new_cost + greedy_dist(end, neighbor)
                 priority_queue.push(neighbor, priority)
-                weighted_grid.frontier[neighbor] = True
                 came_from[neighbor] = cur
-        draw_everything()
+                if observer is not None:
+                    observer.pushed(neighbor, priority, len(priority_queue))
 
+    if observer is not None:
+        observer.finished()
     return came_from, cost_so_far
 
 
@@ -196,6 +319,80 @@ screen = Screen(1000, 900)
 clock = pygame.time.Clock()
 
 
+frames_drawn = 0
+expansions_undrawn = 0  # Expansions since the last frame
+
+
+def watch_expansion(node):  # Search_observer callbacks that draw the search as it runs
+    global expansions_undrawn
+    weighted_grid.visited[node] = True
+    weighted_grid.frontier.pop(node, None)
+    weighted_grid.mark(node)
+    expansions_undrawn += 1
+    if expansions_undrawn >= EXPANSIONS_PER_FRAME:
+        expansions_undrawn = 0
+        draw_everything()
+
+
+def watch_push(node, priority):
+    weighted_grid.frontier[node] = True
+    weighted_grid.mark(node)
+
+
+def benchmark_frames(seconds=3):
+    # Headless frame rate benchmark on a bigger random map. The search is run once to record its pushes and expansions,
+    # which are then played back through each way of drawing for up to the given seconds:
+    #   the old way: the whole screen repainted and every weight rendered again, one frame per expansion
+    #   dirty cells with cached glyphs, one expansion a frame and several a frame
+    global weighted_grid, EXPANSIONS_PER_FRAME, FPS, frames_drawn
+    random.seed(0)
+    weighted_grid = Grid(100, 90, 10, (0, 0), (99, 89))
+    weighted_grid.walls = {(x, y): True for x in range(100) for y in range(90) if random.random() < 0.25}
+    weighted_grid.walls.pop(weighted_grid.start, None)
+    weighted_grid.walls.pop(weighted_grid.end, None)
+    weighted_grid.weights = {(x, y): random.choice((2, 5, 9)) for x in range(100) for y in range(90) if random.random() < 0.3}
+    FPS = 0
+    events = []  # (expanded?, node) in the order the search did them
+    a_star_search(weighted_grid, weighted_grid.start, weighted_grid.end,
+                  Search_observer(on_expand=lambda node: events.append((True, node)),
+                                  on_push=lambda node, priority: events.append((False, node))))
+
+    def full_redraw(node):
+        global frames_drawn
+        weighted_grid.visited[node] = True
+        weighted_grid.frontier.pop(node, None)
+        screen.draw()
+        for x, y in ((x, y) for x in range(weighted_grid.w) for y in range(weighted_grid.h)):
+            pygame.draw.rect(screen.screen, weighted_grid.cell_color((x, y)),
+                             (x * weighted_grid.block_w, y * weighted_grid.block_w, weighted_grid.block_w, weighted_grid.block_w))
+            if (x, y) not in weighted_grid.walls:
+                cost_txt = weighted_grid.font.render(str(weighted_grid.weights.get((x, y), 1)), False, (255, 100, 100))
+                screen.screen.blit(cost_txt, (x * weighted_grid.block_w, y * weighted_grid.block_w))
+        pygame.display.update()
+        frames_drawn += 1
+
+    for name, on_expand, per_frame in (("Full redraw", full_redraw, 1), ("Dirty cells", watch_expansion, 1),
+                                       ("Dirty cells, 16 per frame", watch_expansion, 16)):
+        EXPANSIONS_PER_FRAME = per_frame
+        weighted_grid.visited, weighted_grid.frontier, weighted_grid.path = {}, {}, []
+        screen.draw()
+        weighted_grid.draw()
+        pygame.display.update()
+        frames_drawn = expansions = 0
+        began = time.perf_counter()
+        for expanded, node in events:
+            if expanded:
+                on_expand(node)
+                expansions += 1
+            else:
+                watch_push(node, None)
+            if time.perf_counter() - began > seconds:
+                break
+        took = time.perf_counter() - began
+        print("{}: {} of {} expansions, {} frames in {:.2f} s ({:.0f} fps, {:.0f} expansions/s)".format(
+            name, expansions, sum(expanded for expanded, node in events), frames_drawn, took, frames_drawn / took, expansions / took))
+
+
 # Begin the animation and traversal
 def draw_traverse_animate():
     global weighted_grid
@@ -203,7 +400,13 @@ def draw_traverse_animate():
     weighted_grid.frontier = {}
     weighted_grid.path = []
     weighted_grid.frontier[start] = True
-    came_from, cost_so_far = a_star_search(weighted_grid, weighted_grid.start, weighted_grid.end)  # Do animation and traversal up to the endpoint
+    screen.draw()
+    weighted_grid.draw()
+    pygame.display.update()
+    observer = Search_observer(on_expand=watch_expansion, on_push=watch_push)
+    came_from, cost_so_far = a_star_search(weighted_grid, weighted_grid.start, weighted_grid.end, observer)  # Do animation and traversal up to the endpoint
+    draw_everything()  # The last few expansions that didn't fill a frame
+    print("Expanded", observer.expansions, "pushes", observer.pushes, "max frontier", observer.max_frontier)
     path = reconstruct_path(came_from, weighted_grid.start, weighted_grid.end)  # Reconstruct the path from the end to start
     if path == "No Path Solution":
         time.sleep(10 ** 4)
@@ -213,8 +416,6 @@ def draw_traverse_animate():
     print("Min Cost =", cost_so_far[end])
     weighted_grid.draw_path(path)
     while True:
-        screen.draw()
-        weighted_grid.draw()
         # Check inputs
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -228,12 +429,16 @@ def draw_traverse_animate():
                     del weighted_grid.walls[(x, y)]
                 else:
                     weighted_grid.walls[(x, y)] = True
+                weighted_grid.mark((x, y))
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_e:
                     draw_traverse_animate()
 
-        pygame.display.update()
+        pygame.display.update(weighted_grid.draw_dirty())
         clock.tick(70)  # Fps (Don't know why/how it does it)
 
-draw_traverse_animate()
+if HEADLESS:
+    benchmark_frames()
+else:
+    draw_traverse_animate()
 
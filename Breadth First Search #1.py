@@ -1,4 +1,10 @@
-from collections import deque
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+from array import array
 
 class Graph:
     def __init__(self, adj_list):
@@ -7,18 +13,123 @@ class Graph:
     def return_neighbors(self, cur):
         return self.adj_list[cur]
 
-def bfs(graph, start):
-    visited = {}
-    q = deque([start])
-    visited[start] = True
+class Edge_file:
+    # Unweighted compressed sparse row graph in a file, for graphs bigger than memory
+    # Nodes are ints 0 .. node_count - 1. The edges leaving node n are targets[offsets[n]:offsets[n + 1]]
+    # Both arrays are memoryviews over the mmapped file, so the OS pages edges in (And out) as the search touches them
+    header = struct.Struct('=4s4xqq')  # Magic, node count, edge count (24 bytes keeps the offsets 8 byte aligned)
+    magic = b'EDG1'
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, node_count, edge_count = self.header.unpack_from(self.file)
+        if magic != self.magic:
+            self.file.close()
+            raise ValueError("{} is not an edge file".format(path))
+        self.view = memoryview(self.file)
+        start = self.header.size
+        self.offsets = self.view[start:start + 8 * (node_count + 1)].cast('q')
+        start += 8 * (node_count + 1)
+        self.targets = self.view[start:start + 4 * edge_count].cast('I')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def neighbors(self, node):
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def close(self):
+        # The views have to go before the map can be closed
+        for view in (self.targets, self.offsets, self.view):
+            view.release()
+        self.file.close()
+
+    @classmethod
+    def write(cls, path, node_count, neighbors):
+        # Streams neighbors(0), neighbors(1), ... into a file in native byte order: header, offsets, then targets
+        # Only one node's edges are held at a time, so the graph can be generated (Or converted) bigger than memory
+        # The offsets and the targets are written through two handles on the same file, each at its own position
+        targets_start = cls.header.size + 8 * (node_count + 1)
+        with open(path, 'wb') as file:
+            file.write(cls.header.pack(cls.magic, node_count, 0))
+            file.truncate(targets_start)
+        edge_count = 0
+        with open(path, 'r+b') as offsets_file, open(path, 'r+b') as targets_file:
+            offsets_file.seek(cls.header.size)
+            targets_file.seek(targets_start)
+            offsets = array('q')
+            for node in range(node_count):
+                offsets.append(edge_count)
+                targets = array('I', neighbors(node))
+                targets_file.write(targets)
+                edge_count += len(targets)
+                if len(offsets) == 65536:
+                    offsets_file.write(offsets)
+                    del offsets[:]
+            offsets.append(edge_count)
+            offsets_file.write(offsets)
+            offsets_file.seek(0)
+            offsets_file.write(cls.header.pack(cls.magic, node_count, edge_count))
+
+class Bitmap:
+    # Visited set for integer nodes 0 .. size - 1, one bit per node (A set costs around 60 bytes per node)
+    def __init__(self, size):
+        self.bits = bytearray((size + 7) // 8)
+
+    def __contains__(self, node):
+        return self.bits[node >> 3] & (1 << (node & 7)) != 0
+
+    def add(self, node):
+        self.bits[node >> 3] |= 1 << (node & 7)
 
-    while q:
-        cur = q.popleft()
+class Disk_bitmap(Bitmap):
+    # Same bitmap in an mmapped file, so it takes no memory of its own: the OS writes dirty pages back to the file
+    # and drops them under memory pressure. The file starts sparse (All zero), and is deleted by close unless keep=True
+    def __init__(self, size, path=None, keep=False):
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix=".bits")
+            os.close(handle)
+        self.path = path
+        self.keep = keep
+        with open(path, 'w+b') as file:
+            file.truncate(max(1, (size + 7) // 8))
+            self.bits = mmap.mmap(file.fileno(), 0)
+
+    def close(self):
+        self.bits.close()
+        if not self.keep:
+            os.remove(self.path)
+
+def bfs_stream(neighbors, start, visited=None, max_depth=None):
+    # Yields (node, depth) in breadth first order, one at a time, so the caller can stop whenever it likes
+    # neighbors(node) gives the nodes next to node: graph.return_neighbors, Edge_file.neighbors or any function
+    # visited is anything with `in` and add: a set (The default), a Bitmap or a Disk_bitmap for integer nodes
+    # The queue is one list per level. With a bitmap the nodes are ints, so the levels are 4 byte 'I' arrays instead
+    if visited is None:
+        visited = set()
+    new_level = (lambda: array('I')) if isinstance(visited, Bitmap) else list
+    level = new_level()
+    level.append(start)
+    visited.add(start)
+    depth = 0
+
+    while level:
+        next_level = new_level()
+        for cur in level:
+            yield cur, depth
+            if depth == max_depth:
+                continue
+            for neighbor in neighbors(cur):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    next_level.append(neighbor)
+        level = next_level
+        depth += 1
+
+def bfs(graph, start):
+    for cur, depth in bfs_stream(graph.return_neighbors, start):
         print(cur)
-        for neighbor in graph.return_neighbors(cur):
-            if neighbor not in visited:
-                visited[neighbor] = True
-                q.append(neighbor)
 
 adj_list = {
     'A': ['B'],
@@ -28,4 +139,30 @@ adj_list = {
     'E': ['B']
 }
 graph = Graph(adj_list)
-bfs(graph, "A")
\ No newline at end of file
+bfs(graph, "A")
+print(list(bfs_stream(graph.return_neighbors, "A")))
+
+# Streaming a bigger graph from an edge file: random one way edges, 3 per node, generated straight into the file
+node_count = 200000
+random.seed(0)
+edge_directory = tempfile.TemporaryDirectory()  # Removed with the edge file once the graph is closed
+path = os.path.join(edge_directory.name, "graph.edges")
+Edge_file.write(path, node_count, lambda node: [random.randrange(node_count) for _ in range(3)])
+edges = Edge_file(path)
+print(len(edges), "nodes,", len(edges.targets), "edges,", os.path.getsize(path), "bytes on disk")
+
+for visited in (set(), Bitmap(node_count), Disk_bitmap(node_count)):
+    start_time = time.perf_counter()
+    reached = deepest = 0
+    for node, depth in bfs_stream(edges.neighbors, 0, visited):
+        reached += 1
+        deepest = depth
+    print("{:<11} reached {} nodes, {} levels deep, in {:.2f} s".format(
+        type(visited).__name__, reached, deepest, time.perf_counter() - start_time))
+    if isinstance(visited, Disk_bitmap):
+        visited.close()
+
+# Stopping early: the first 5 nodes 2 steps from node 0
+print([node for node, depth in bfs_stream(edges.neighbors, 0, Bitmap(node_count), max_depth=2) if depth == 2][:5])
+edges.close()
+edge_directory.cleanup()
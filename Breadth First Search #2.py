@@ -1,4 +1,12 @@
+import math
+import time
+from array import array
 from collections import deque
+from collections.abc import Mapping
+import numpy as np
+
+MAX_EDITS = 4096  # Most edits a grid keeps in its log (Past that the older half is dropped, see Grid.record_edit)
+
 
 class Grid:
     def __init__(self, w, h, walls):
@@ -7,6 +15,29 @@ class Grid:
         self.walls = {}  # Hash table
         for x, y in walls:
             self.walls[(x, y)] = True
+        self.edits = []  # (pos, old cost, new cost) of every edit made through set_wall, oldest first
+        self.version = 0  # Number of edits so far (Anything computed at an older version may be out of date)
+        self.edits_start = 0  # Version the grid was at before edits[0] (The edits before that were dropped)
+        self.components = None  # Components kept for this grid, if any (Searches ask it first whether end can be reached at all)
+
+    def step_cost(self, pos):  # Cost of moving into pos (Infinite for walls)
+        return math.inf if pos in self.walls else 1
+
+    def set_wall(self, pos, wall=True):  # Adds or removes a wall, and records the edit so Components can tell what changed
+        old_cost = self.step_cost(pos)
+        if wall:
+            self.walls[pos] = True
+        else:
+            self.walls.pop(pos, None)
+        self.record_edit(pos, old_cost)
+
+    def record_edit(self, pos, old_cost):
+        self.edits.append((pos, old_cost, self.step_cost(pos)))
+        self.version += 1
+        if len(self.edits) > MAX_EDITS:  # Keeps the log bounded. A cache further behind than what is left starts over
+            dropped = len(self.edits) // 2
+            del self.edits[:dropped]
+            self.edits_start += dropped
 
     def in_bounds(self, pos):  # Check to see if the position is within the outer-most boundaries of the Grid
         x, y = pos
@@ -46,15 +77,490 @@ class Grid:
                     print(".", end = ' ')
             print()
 
-def bfs(grid, start, end):
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))  # Same order as Grid.return_neighbors (Opposites are next to each other)
+
+
+class Components:
+    # Connected component label of every cell, so a query between two components is turned down straight away
+    # instead of the search flooding everything reachable from start before giving up
+    # labels is a flat 'i' array with (x, y) at x * h + y, and -1 for walls. Set grid.components to one to have the searches use it
+    # It catches up on grid.edits (set_wall) before answering, and only walks the regions an edit touched:
+    #   a wall removed: the components around the cell are joined, relabelling all but the biggest one
+    #   a wall added: floods from the cell's open neighbors one step each in turn. Floods that run into each other are the same piece,
+    #   and a flood that runs out without meeting another one was cut off and gets a new label (So only the smaller pieces get walked)
+    # The labels are the passability it goes by, so edits are replayed in order even when later ones touched the same cells
+    def __init__(self, grid):
+        self.grid = grid
+        self.label_all()
+
+    def label_all(self):  # Labels the whole grid from scratch
+        grid = self.grid
+        self.labels = array('i', [-1]) * (grid.w * grid.h)
+        self.sizes = {}  # label -> number of cells with it
+        self.next_label = 0
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if grid.passable((x, y)):
+                    self.labels[self.cell((x, y))] = -2  # Open but not labelled yet
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if self.labels[self.cell((x, y))] == -2:
+                    self.fill((x, y), self.new_label())
+        self.version = grid.version
+
+    def cell(self, pos):
+        return pos[0] * self.grid.h + pos[1]
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label - 1
+
+    def open_neighbors(self, pos):
+        x, y = pos
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                if self.grid.in_bounds(neighbor) and self.labels[self.cell(neighbor)] != -1]
+
+    def fill(self, pos, label):  # Gives pos and every cell connected to it the label
+        old_label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = label
+        stack = [pos]
+        count = 0
+        while stack:
+            cur = stack.pop()
+            count += 1
+            for neighbor in self.open_neighbors(cur):
+                if self.labels[self.cell(neighbor)] != label:
+                    self.labels[self.cell(neighbor)] = label
+                    stack.append(neighbor)
+        self.move(old_label, label, count)
+
+    def move(self, old_label, label, count):  # Keeps sizes up to date when count cells go from old_label to label
+        if old_label >= 0:
+            self.sizes[old_label] -= count
+            if not self.sizes[old_label]:
+                del self.sizes[old_label]
+        if label >= 0:
+            self.sizes[label] = self.sizes.get(label, 0) + count
+
+    def catch_up(self):
+        if self.version < self.grid.edits_start:  # The edits it missed were dropped from the log, so it starts over
+            self.label_all()
+            return
+        for pos, old_cost, new_cost in self.grid.edits[self.version - self.grid.edits_start:]:
+            if not self.grid.in_bounds(pos):
+                continue
+            is_wall = self.labels[self.cell(pos)] == -1
+            if new_cost == math.inf and not is_wall:
+                self.add_wall(pos)
+            elif new_cost != math.inf and is_wall:
+                self.remove_wall(pos)
+        self.version = self.grid.version
+
+    def remove_wall(self, pos):
+        labels = {self.labels[self.cell(neighbor)]: neighbor for neighbor in self.open_neighbors(pos)}
+        if not labels:
+            label = self.new_label()
+        else:
+            label = max(labels, key=self.sizes.get)
+            for other_label, neighbor in labels.items():
+                if other_label != label:
+                    self.fill(neighbor, label)
+        self.labels[self.cell(pos)] = label
+        self.move(-1, label, 1)
+
+    def add_wall(self, pos):
+        label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = -1
+        self.move(label, -1, 1)
+        starts = self.open_neighbors(pos)
+        owner = {start: flood for flood, start in enumerate(starts)}  # cell -> the flood that reached it first
+        group = list(range(len(starts)))  # Floods that ran into each other point at the same one
+        frontiers = [[start] for start in starts]
+        reached = [[start] for start in starts]
+        split_off = set()
+
+        def find(flood):
+            while group[flood] != flood:
+                flood = group[flood]
+            return flood
+
+        while True:
+            groups = {}
+            for flood in range(len(starts)):
+                if find(flood) not in split_off:
+                    groups.setdefault(find(flood), []).append(flood)
+            if len(groups) <= 1:
+                break
+            running = [root for root, floods in groups.items() if any(frontiers[flood] for flood in floods)]
+            finished = [root for root in groups if root not in running]
+            if not running:  # Every piece was walked in full, one of them keeps the old label
+                finished = finished[1:]
+            for root in finished:  # Ran out without meeting anyone else, so it is cut off from the rest
+                new_label = self.new_label()
+                for flood in groups[root]:
+                    for cell in reached[flood]:
+                        self.labels[self.cell(cell)] = new_label
+                    self.move(label, new_label, len(reached[flood]))
+                split_off.add(root)
+            if len(running) <= 1:
+                break
+            for root in running:
+                for flood in groups[root]:
+                    if not frontiers[flood]:
+                        continue
+                    cur = frontiers[flood].pop()
+                    for neighbor in self.open_neighbors(cur):
+                        if neighbor not in owner:
+                            owner[neighbor] = flood
+                            frontiers[flood].append(neighbor)
+                            reached[flood].append(neighbor)
+                        elif find(owner[neighbor]) != find(flood):
+                            group[find(owner[neighbor])] = find(flood)
+
+    def connected(self, start, end):
+        self.catch_up()
+        if start == end:
+            return True
+        if not (self.grid.in_bounds(start) and self.grid.in_bounds(end)):
+            return False
+        label = self.labels[self.cell(start)]
+        return label != -1 and label == self.labels[self.cell(end)]
+
+
+def unreachable(grid, start, end):  # True when the grid keeps Components and they show there is no path
+    components = getattr(grid, 'components', None)
+    return components is not None and not components.connected(start, end)
+
+
+class Search_observer:
+    # Watches a search from the outside: counters, and optionally callbacks and sampled timing
+    # Searches take observer=None. Without one, all a search pays is an 'is not None' check per event
+    #   expansions: nodes taken off the queue and expanded
+    #   pushes: pushes onto the queue (Including ones that only lowered the priority of a queued node)
+    #   max_frontier: most nodes queued at once
+    # on_expand(node) and on_push(node, priority), when given, are called for every event as it happens
+    # sample_every=n appends (expansions, seconds since the search started) to samples every n expansions
+    # Counters keep adding up over several searches until reset is called. seconds is the time spent in them
+    def __init__(self, on_expand=None, on_push=None, sample_every=0):
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.expansions = 0
+        self.pushes = 0
+        self.max_frontier = 0
+        self.samples = []
+        self.seconds = 0
+        self.began = time.perf_counter()
+
+    def started(self):
+        self.began = time.perf_counter()
+
+    def expanded(self, node):
+        self.expansions += 1
+        if self.on_expand is not None:
+            self.on_expand(node)
+        if self.sample_every and self.expansions % self.sample_every == 0:
+            self.samples.append((self.expansions, time.perf_counter() - self.began))
+
+    def pushed(self, node, priority, frontier):  # frontier is how many nodes are queued after the push
+        self.pushes += 1
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.on_push is not None:
+            self.on_push(node, priority)
+
+    def expanded_level(self, expanded, pushed):
+        # Bulk counts for frontier_bfs, which expands a whole level at once (No callbacks or samples per node there)
+        self.expansions += expanded
+        self.pushes += pushed
+        if pushed > self.max_frontier:
+            self.max_frontier = pushed
+
+    def finished(self):
+        self.seconds += time.perf_counter() - self.began
+
+
+class Search_workspace:
+    # frontier_bfs's arrays for one Grid, allocated once and reused by every query instead of fresh arrays each time
+    # Cells are flat indices into a (w + 2, h + 2) array padded with a border of walls, like in frontier_bfs
+    #   distance and parent_direction: what frontier_bfs works out for each cell
+    #   stamp: the generation (Query) that last reached each cell. Values stamped by an earlier query are left in place and
+    #   just don't count, so reset is O(1) instead of refilling the arrays (They are only cleared when the 32 bit stamps run out)
+    # The passability bitmap is built once here, so make the workspace after the walls are final
+    def __init__(self, grid):
+        self.grid = grid
+        self.stride = grid.h + 2
+        passable = np.zeros((grid.w + 2, self.stride), dtype=bool)
+        passable[1:-1, 1:-1] = True
+        for x, y in grid.walls:
+            passable[x + 1, y + 1] = False
+        self.passable = passable.ravel()
+        self.offsets = [dx * self.stride + dy for dx, dy in DIRECTIONS]
+        self.distance = np.full(self.passable.size, -1, dtype=np.int32)
+        self.parent_direction = np.full(self.passable.size, -1, dtype=np.int8)
+        self.stamp = np.zeros(self.passable.size, dtype=np.uint32)
+        self.generation = 0
+        self.path = np.empty(self.passable.size, dtype=np.int32)  # path_to fills it from the back
+
+    def reset(self):  # Starts a new query
+        self.generation += 1
+        if self.generation > 0xFFFFFFFF:
+            self.stamp.fill(0)
+            self.generation = 1
+
+    def index(self, pos):  # (x, y) -> cell index
+        x, y = pos
+        return (x + 1) * self.stride + y + 1
+
+    def position(self, cell):  # Cell index -> (x, y)
+        x, y = divmod(int(cell), self.stride)
+        return x - 1, y - 1
+
+    def reached(self, cell):
+        return self.stamp[cell] == self.generation
+
+    def fill(self, start, end=None, observer=None):
+        # Runs frontier_bfs's walk into this workspace's arrays (Stopping once end is reached), for callers that read
+        # the workspace itself. Only the cells stamped in the new generation belong to this query
+        self.reset()
+        passable = self.passable
+        distance = self.distance
+        parent_direction = self.parent_direction
+        stamp = self.stamp
+        generation = self.generation
+        offsets = self.offsets
+
+        cut_off = end is not None and unreachable(self.grid, start, end)  # Different components: only start is reached
+        frontier = np.array([self.index(start)])
+        end = None if end is None else self.index(end)
+        distance[frontier] = 0
+        parent_direction[frontier] = -1
+        stamp[frontier] = generation
+        if cut_off:
+            frontier = frontier[:0]
+        level = 0
+        if observer is not None:
+            observer.started()
+            observer.pushed(start, 0, 1)
+        while frontier.size and (end is None or stamp[end] != generation):
+            level += 1
+            reached = []
+            for code, offset in enumerate(offsets):
+                # Every frontier cell steps in the same direction at once
+                # A cell reached by an earlier direction this level already has this query's stamp, so nothing is claimed twice
+                neighbors = frontier + offset
+                neighbors = neighbors[passable[neighbors] & (stamp[neighbors] != generation)]
+                stamp[neighbors] = generation
+                distance[neighbors] = level
+                parent_direction[neighbors] = code ^ 1  # The step back to the parent is the opposite direction
+                reached.append(neighbors)
+            expanded = frontier.size
+            frontier = np.concatenate(reached)
+            if observer is not None:
+                observer.expanded_level(expanded, frontier.size)
+        if observer is not None:
+            observer.finished()
+
+    def path_to(self, end):
+        # Cell indices from the start to end (Empty if end wasn't reached), as a view of the reused path buffer (No copy)
+        if not self.reached(end):
+            return self.path[:0]
+        i = self.path.size
+        cell = end
+        while True:
+            i -= 1
+            self.path[i] = cell
+            code = self.parent_direction[cell]
+            if code == -1:
+                return self.path[i:]
+            cell += self.offsets[code]
+
+
+def frontier_bfs(grid, start, end=None, observer=None, workspace=None):
+    # Same level by level walk as bfs, but a whole frontier is expanded per step with numpy array operations
+    # instead of popping and hashing cells one at a time
+    # Cells are flat indices into a (w + 2, h + 2) array padded with a border of walls, so no bounds checks are needed
+    # Returns two (w, h) arrays indexed [x, y]:
+    #   distance: number of steps from start (-1 = not reached)
+    #   parent_direction: index into DIRECTIONS of the step from a cell to its parent (-1 = no parent)
+    # An observer only gets counts per level (Search_observer.expanded_level)
+    # The walk runs in a Search_workspace (A new one is made when none is given). A reused workspace still holds values
+    # from earlier queries, so then the arrays returned are copies with the cells this query didn't reach set to -1
+    fresh = workspace is None
+    if fresh:
+        workspace = Search_workspace(grid)
+    workspace.fill(start, end, observer)
+
+    shape = (grid.w + 2, workspace.stride)
+    distance, parent_direction = workspace.distance, workspace.parent_direction
+    if not fresh:
+        reached = workspace.stamp == workspace.generation
+        distance = np.where(reached, distance, -1).astype(np.int32)
+        parent_direction = np.where(reached, parent_direction, -1).astype(np.int8)
+    return distance.reshape(shape)[1:-1, 1:-1], parent_direction.reshape(shape)[1:-1, 1:-1]
+
+
+class Direction_map(Mapping):
+    # Read-only came_from view over a Search_workspace after frontier_bfs, keyed by (x, y) like the came_from dict bfs returns
+    # Only good until the workspace's next query
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.generation = workspace.generation
+
+    def __getitem__(self, pos):
+        workspace = self.workspace
+        if workspace.generation != self.generation:
+            raise RuntimeError("The search workspace has been reset for another query since")
+        x, y = pos
+        if not (0 <= x < workspace.grid.w and 0 <= y < workspace.grid.h) or not workspace.reached(workspace.index(pos)):
+            raise KeyError(pos)
+        code = workspace.parent_direction[workspace.index(pos)]
+        if code == -1:  # The start has no parent
+            return None
+        dx, dy = DIRECTIONS[code]
+        return x + dx, y + dy
+
+    def __iter__(self):
+        reached = (self.workspace.stamp == self.generation).reshape(self.workspace.grid.w + 2, self.workspace.stride)
+        for x, y in np.argwhere(reached):
+            yield int(x) - 1, int(y) - 1
+
+    def __len__(self):
+        return int(np.count_nonzero(self.workspace.stamp == self.generation))
+
+
+class Bitboard_grid:
+    # The whole grid packed into one Python int, a bit per cell, so a BFS step moves every frontier cell at once
+    # Cell (x, y) is bit y * stride + x. Rows are w + 1 bits apart: the extra bit at the end of each row is never open,
+    # so a shift that carries a cell off the end of its row lands there and gets masked off instead of wrapping to the next row
+    # A layer is frontier shifted 1 and stride both ways, ORed together and ANDed with the cells not reached yet: 4 shifts,
+    # 3 ORs and an AND, each one pass over (w + 1) * h / 64 machine words. A flood fill is that many steps per layer
+    # The passability mask is built once here, so make the board after the walls are final
+    def __init__(self, grid):
+        self.w = grid.w
+        self.h = grid.h
+        self.stride = grid.w + 1
+        self.bits = self.stride * grid.h
+        passable = np.zeros((grid.h, self.stride), dtype=bool)  # Indexed [y, x] here, to match the bit order
+        passable[:, :grid.w] = True
+        for x, y in grid.walls:
+            passable[y, x] = False
+        self.open = self.to_int(passable.ravel())
+
+    def to_int(self, cells):  # Flat bool array in bit order -> int
+        return int.from_bytes(np.packbits(cells, bitorder='little').tobytes(), 'little')
+
+    def to_array(self, mask):  # int -> (w, h) bool array indexed [x, y], like frontier_bfs's arrays
+        cells = np.unpackbits(np.frombuffer(mask.to_bytes(-(-self.bits // 8), 'little'), dtype=np.uint8), bitorder='little')
+        return cells[:self.bits].reshape(self.h, self.stride)[:, :self.w].T.astype(bool)
+
+    def bit(self, pos):
+        x, y = pos
+        return y * self.stride + x
+
+    def position(self, bit):
+        y, x = divmod(bit, self.stride)
+        return x, y
+
+    def layers(self, start, end=None):
+        # Masks of the cells 0, 1, 2, ... steps from start, up to the layer with end in it (All of them if end is None)
+        # No layer is empty, so len(layers) - 1 is the distance to end when end was reached
+        frontier = (1 << self.bit(start)) & self.open
+        if not frontier:  # A start in a wall reaches nothing
+            return []
+        stride = self.stride
+        unreached = self.open ^ frontier
+        end_mask = 0 if end is None else 1 << self.bit(end)
+        layers = [frontier]
+        while frontier and not frontier & end_mask:
+            frontier = ((frontier << 1) | (frontier >> 1) | (frontier << stride) | (frontier >> stride)) & unreached
+            if not frontier:
+                break
+            unreached ^= frontier
+            layers.append(frontier)
+        return layers
+
+    def reachable(self, start):  # Mask of every cell start can reach (Its whole connected area)
+        reached = 0
+        for layer in self.layers(start):
+            reached |= layer
+        return reached
+
+    def distance(self, layers, pos):  # Steps from the start to pos (-1 = not reached)
+        mask = 1 << self.bit(pos)
+        return next((steps for steps, layer in enumerate(layers) if layer & mask), -1)
+
+    def distances(self, layers):
+        # (w, h) array of steps from the start indexed [x, y] (-1 = not reached), like frontier_bfs's
+        # The steps are counted in binary with one mask per bit (Bit j of a cell's steps is its bit in planes[j]),
+        # so only a handful of masks get unpacked into arrays instead of every layer
+        planes = [0] * max(1, (len(layers) - 1).bit_length())
+        reached = 0
+        for steps, layer in enumerate(layers):
+            reached |= layer
+            for j in range(steps.bit_length()):
+                if steps >> j & 1:
+                    planes[j] |= layer
+        distance = np.zeros((self.w, self.h), dtype=np.int32)
+        for j, plane in enumerate(planes):
+            distance |= self.to_array(plane).astype(np.int32) << j
+        distance[~self.to_array(reached)] = -1
+        return distance
+
+    def path(self, layers, end):
+        # A shortest path from the start to end as a list of (x, y), walking back one layer at a time
+        # Each step back is to any cell of the layer before that is next to the current one (None if end wasn't reached)
+        steps = self.distance(layers, end)
+        if steps == -1:
+            return None
+        stride = self.stride
+        bit = self.bit(end)
+        path = [end]
+        for layer in reversed(layers[:steps]):
+            around = (1 << (bit + 1)) | (1 << (bit + stride))
+            if bit >= 1:
+                around |= 1 << (bit - 1)
+            if bit >= stride:
+                around |= 1 << (bit - stride)
+            before = layer & around
+            bit = (before & -before).bit_length() - 1  # Lowest one
+            path.append(self.position(bit))
+        path.reverse()
+        return path
+
+
+def bfs(grid, start, end, vectorized=False, observer=None, workspace=None):
+    # An observer (Search_observer) is told about every push and expansion as they happen
+    # Passing a workspace (Search_workspace) reuses its arrays instead of allocating them per query, and implies vectorized
+    if vectorized or workspace is not None:  # Same (came_from, distance) result, from frontier_bfs's walk
+        if workspace is None:
+            workspace = Search_workspace(grid)
+        workspace.fill(start, end, observer)
+        end = workspace.index(end)
+        if not workspace.reached(end):  # Like the loop below, there is no result when end can't be reached
+            return None
+        return Direction_map(workspace), int(workspace.distance[end])
+
+    if unreachable(grid, start, end):  # Different components, there is nothing to search
+        return None
     distance = 0
     came_from = {}
     came_from[start] = None
     q = deque([start])
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, 0, 1)
     while q:
         for i in range(len(q)):
             cur = q.popleft()
+            if observer is not None:
+                observer.expanded(cur)
             if cur == end:
+                if observer is not None:
+                    observer.finished()
                 return came_from, distance
             else:
                 neighbors = grid.return_neighbors(cur)
@@ -62,7 +568,11 @@ def bfs(grid, start, end):
                     if neighbor not in came_from:
                         came_from[neighbor] = cur
                         q.append(neighbor)
+                        if observer is not None:
+                            observer.pushed(neighbor, distance + 1, len(q))
         distance += 1
+    if observer is not None:
+        observer.finished()
 
 grid = Grid(15, 15, [[2,3],
                      [2,2],
@@ -76,3 +586,38 @@ end = (3, 3)
 came_from, distance = bfs(grid, start, end)
 print(distance)
 grid.draw(came_from, start, end)
+
+# Same query with the whole frontier expanded at once
+came_from, distance = bfs(grid, start, end, vectorized=True)
+print(distance)
+grid.draw(came_from, start, end)
+
+# Same query on a bitboard: one layer mask per step, then the distance and a path read back out of them
+board = Bitboard_grid(grid)
+layers = board.layers(start, end)
+print(len(layers) - 1, board.path(layers, end))
+
+# Flood fill of a bigger random map (Every cell's distance from the corner) with each engine
+rng = np.random.default_rng(0)
+size = 300
+big_grid = Grid(size, size, [(int(x), int(y)) for x, y in np.argwhere(rng.random((size, size)) < 0.2) if (x, y) != (0, 0)])
+began = time.perf_counter()
+bfs(big_grid, (0, 0), (-1, -1))
+print("Deque bfs took", round(time.perf_counter() - began, 3), "s")
+began = time.perf_counter()
+frontier_distance, parent_direction = frontier_bfs(big_grid, (0, 0))
+print("frontier_bfs took", round(time.perf_counter() - began, 3), "s")
+big_board = Bitboard_grid(big_grid)
+began = time.perf_counter()
+big_layers = big_board.layers((0, 0))
+bitboard_distance = big_board.distances(big_layers)
+print("Bitboard took", round(time.perf_counter() - began, 3), "s for", len(big_layers), "layers, same distances:",
+      bool((bitboard_distance == frontier_distance).all()))
+
+# Components: walling off the corner turns a query to it down without a search, and opening it again is picked up
+grid.components = Components(grid)
+grid.set_wall((1, 0))
+grid.set_wall((0, 1))
+print("Walled off", bfs(grid, start, (0, 0)), "components", len(grid.components.sizes))
+grid.set_wall((1, 0), False)
+print("Opened again", bfs(grid, start, (0, 0))[1], "components", len(grid.components.sizes))
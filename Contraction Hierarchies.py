@@ -0,0 +1,363 @@
+import os
+import random
+import struct
+import tempfile
+import time
+from array import array
+
+class Indexed_Priority_Queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_Queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
+    def __init__(self):
+        self.items = []
+        self.position = {}  # item -> index of its pair in items
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
+
+    def get(self):
+        item = self.items[0][1]
+        del self.position[item]
+        last = self.items.pop()
+        if self.items:
+            self.items[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
+
+    def push(self, item, weight):
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.items[i][0]:  # Only ever lower an item's weight
+                return
+            self.items[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.items)
+            self.items.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def sift_up(self, i):
+        entry = self.items[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.items[parent]:
+                break
+            self.items[i] = self.items[parent]
+            self.position[self.items[i][1]] = i
+            i = parent
+        self.items[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.items[i]
+        size = len(self.items)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.items[child + 1] < self.items[child]:
+                child += 1
+            if not self.items[child] < entry:
+                break
+            self.items[i] = self.items[child]
+            self.position[self.items[i][1]] = i
+            i = child
+        self.items[i] = entry
+        self.position[entry[1]] = i
+
+
+def dijkstras(weighted_adj_list, start, end, stats=None):
+    # If a stats dict is passed in, it is filled with how much work the indexed queue and the closed set saved:
+    #   duplicate_pushes_avoided: improved costs that lowered a queued entry instead of pushing a second copy
+    #   re_expansions_avoided: cheaper costs found for already expanded nodes, which would have been queued and expanded again
+    priority_queue = Indexed_Priority_Queue()
+    min_cost_at = {}
+    came_from = {}
+    closed = set()  # Nodes that have already been expanded (Their cost can't get any lower)
+    re_expansions_avoided = 0
+
+    priority_queue.push(start, 0)
+    came_from[start] = None
+    min_cost_at[start] = 0
+
+    while priority_queue.items:
+        cur = priority_queue.get()
+        closed.add(cur)
+        if cur == end:
+            break
+        else:
+            for neighbor, travel_cost in weighted_adj_list[cur]:
+                new_cost = travel_cost + min_cost_at[cur]
+                if neighbor in closed:  # Expanded nodes are final, they are never queued again
+                    if new_cost < min_cost_at[neighbor]:
+                        re_expansions_avoided += 1
+                    continue
+                if new_cost < min_cost_at.get(neighbor, 10 ** 12):
+                    min_cost_at[neighbor] = new_cost
+                    came_from[neighbor] = cur
+                    priority_queue.push(neighbor, new_cost)
+
+    if stats is not None:
+        stats['duplicate_pushes_avoided'] = priority_queue.decreased
+        stats['re_expansions_avoided'] = re_expansions_avoided
+    return came_from, min_cost_at
+
+
+def witness_costs(out_edges, contracted, source, skip, max_cost, max_settled=60):
+    # Small Dijkstra from source that never goes through skip or through contracted nodes, used to find witness paths
+    # (A witness is a path that makes a shortcut unnecessary). Gives up past max_cost or after max_settled nodes,
+    # which at worst adds a shortcut that wasn't needed
+    priority_queue = Indexed_Priority_Queue()
+    min_cost_at = {source: 0}
+    closed = set()
+    priority_queue.push(source, 0)
+    while priority_queue.items and len(closed) < max_settled:
+        cur = priority_queue.get()
+        closed.add(cur)
+        if min_cost_at[cur] > max_cost:
+            break
+        for neighbor, (travel_cost, middle) in out_edges[cur].items():
+            if neighbor == skip or neighbor in contracted or neighbor in closed:
+                continue
+            new_cost = min_cost_at[cur] + travel_cost
+            if new_cost < min_cost_at.get(neighbor, 10 ** 12):
+                min_cost_at[neighbor] = new_cost
+                priority_queue.push(neighbor, new_cost)
+    return min_cost_at
+
+
+def shortcuts_for(out_edges, in_edges, contracted, node):
+    # The shortcuts contracting node would need: u -> w for every u -> node -> w with no witness at least as cheap
+    shortcuts = []
+    outgoing = [(w, cost) for w, (cost, middle) in out_edges[node].items() if w not in contracted]
+    if not outgoing:
+        return shortcuts
+    max_out = max(cost for w, cost in outgoing)
+    for u, (in_cost, middle) in in_edges[node].items():
+        if u in contracted:
+            continue
+        costs = witness_costs(out_edges, contracted, u, node, in_cost + max_out)
+        for w, out_cost in outgoing:
+            if w != u and costs.get(w, 10 ** 12) > in_cost + out_cost:
+                shortcuts.append((u, w, in_cost + out_cost))
+    return shortcuts
+
+
+class Contraction_hierarchy:
+    # Preprocessed form of a weighted_adj_list for fast point to point queries
+    # Nodes are contracted one at a time, least important first: a contracted node is taken out of the graph and shortcut
+    # edges are added between its neighbors wherever it was on the only cheapest path between them. Its rank is its order
+    # A query then only ever walks up the ranks, forward from start and backward from end, and the two searches meet at
+    # the highest node of the cheapest path, which touches a tiny part of the graph
+    # Nodes are stored by index (self.nodes[i] is the original name), every edge as a CSR row of (target, cost, middle)
+    # where middle is the index of the node a shortcut skips over (-1 for an original edge)
+    magic = b'CH01'
+    header = struct.Struct('=4sc3xqqq')  # Magic, cost typecode, node count, up edge count, down edge count
+
+    def __init__(self, nodes, rank, up, down):
+        self.nodes = nodes  # array('q') of original node names
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.rank = rank  # array('i'), contraction order of each node
+        self.up = up  # (offsets, targets, costs, middles): edges i -> j with rank[j] > rank[i], stored at i
+        self.down = down  # Same layout: edges j -> i with rank[j] > rank[i], stored at i (So the backward search also goes up)
+
+    @classmethod
+    def build(cls, weighted_adj_list):
+        names = set(weighted_adj_list)
+        for edges in weighted_adj_list.values():
+            names.update(neighbor for neighbor, travel_cost in edges)
+        nodes = array('q', sorted(names))
+        index = {node: i for i, node in enumerate(nodes)}
+        out_edges = [{} for _ in nodes]  # i -> {j: (cost, middle)}, the cheapest edge only
+        in_edges = [{} for _ in nodes]
+        for node, edges in weighted_adj_list.items():
+            for neighbor, travel_cost in edges:
+                i, j = index[node], index[neighbor]
+                if i != j and travel_cost < out_edges[i].get(j, (10 ** 12,))[0]:
+                    out_edges[i][j] = in_edges[j][i] = (travel_cost, -1)
+        all_edges = [dict(edges) for edges in out_edges]  # Every edge ever added, kept for the final up/down graphs
+
+        contracted = set()
+        contracted_neighbors = [0] * len(nodes)
+
+        def importance(i):  # Edge difference plus how many neighbors are already gone (Spreads contraction out evenly)
+            live = sum(1 for j in out_edges[i] if j not in contracted) + sum(1 for j in in_edges[i] if j not in contracted)
+            return len(shortcuts_for(out_edges, in_edges, contracted, i)) - live + contracted_neighbors[i]
+
+        priority_queue = Indexed_Priority_Queue()
+        for i in range(len(nodes)):
+            priority_queue.push(i, importance(i))
+        rank = array('i', [0]) * len(nodes)
+        order = 0
+        while priority_queue.items:
+            i = priority_queue.get()
+            current = importance(i)  # Lazy update: importances go stale as neighbors are contracted
+            if priority_queue.items and current > priority_queue.items[0][0]:
+                priority_queue.push(i, current)
+                continue
+
+            for u, w, cost in shortcuts_for(out_edges, in_edges, contracted, i):
+                if cost < out_edges[u].get(w, (10 ** 12,))[0]:
+                    out_edges[u][w] = in_edges[w][u] = all_edges[u][w] = (cost, i)
+            contracted.add(i)
+            rank[i] = order
+            order += 1
+            for j in list(out_edges[i]) + list(in_edges[i]):
+                if j not in contracted:
+                    contracted_neighbors[j] += 1
+
+        typecode = 'q' if all(float(cost).is_integer() for edges in all_edges for cost, middle in edges.values()) else 'd'
+        up = [[] for _ in nodes]
+        down = [[] for _ in nodes]
+        for i, edges in enumerate(all_edges):
+            for j, (cost, middle) in edges.items():
+                if rank[j] > rank[i]:
+                    up[i].append((j, cost, middle))
+                else:
+                    down[j].append((i, cost, middle))
+        return cls(nodes, rank, pack_rows(up, typecode), pack_rows(down, typecode))
+
+    def query(self, start, end):
+        # Returns (came_from, min_cost_at) for the nodes of the cheapest path, shortcuts unpacked back into original edges,
+        # so the path can be read off came_from exactly like dijkstras' result ({start: None}, {start: 0} if there is none)
+        start_index, end_index = self.index[start], self.index[end]
+        costs = [{start_index: 0}, {end_index: 0}]  # Forward side, backward side
+        parents = [{start_index: None}, {end_index: None}]
+        queues = [Indexed_Priority_Queue(), Indexed_Priority_Queue()]
+        queues[0].push(start_index, 0)
+        queues[1].push(end_index, 0)
+        best_cost, meet = 10 ** 12, None
+        while queues[0].items or queues[1].items:
+            for side, rows in ((0, self.up), (1, self.down)):
+                queue = queues[side]
+                if not queue.items:
+                    continue
+                if queue.items[0][0] >= best_cost:  # Nothing left on this side can lead to anything cheaper
+                    queue.items, queue.position = [], {}
+                    continue
+                cur = queue.get()
+                if cur in costs[1 - side] and costs[side][cur] + costs[1 - side][cur] < best_cost:
+                    best_cost, meet = costs[side][cur] + costs[1 - side][cur], cur
+                offsets, targets, travel_costs, middles = rows
+                for k in range(offsets[cur], offsets[cur + 1]):
+                    neighbor = targets[k]
+                    new_cost = costs[side][cur] + travel_costs[k]
+                    if new_cost < costs[side].get(neighbor, 10 ** 12):
+                        costs[side][neighbor] = new_cost
+                        parents[side][neighbor] = cur
+                        queue.push(neighbor, new_cost)
+
+        came_from, min_cost_at = {start: None}, {start: 0}
+        if meet is None:
+            return came_from, min_cost_at
+        hops = []  # (from, to) edges of the path, possibly shortcuts
+        node = meet
+        while parents[0][node] is not None:
+            hops.append((parents[0][node], node))
+            node = parents[0][node]
+        hops.reverse()
+        node = meet
+        while parents[1][node] is not None:
+            hops.append((node, parents[1][node]))
+            node = parents[1][node]
+
+        for a, b in hops:
+            for u, v, travel_cost in self.unpack(a, b):
+                came_from[self.nodes[v]] = self.nodes[u]
+                min_cost_at[self.nodes[v]] = min_cost_at[self.nodes[u]] + travel_cost
+        return came_from, min_cost_at
+
+    def edge(self, a, b):  # (cost, middle) of the stored edge a -> b
+        if self.rank[b] > self.rank[a]:
+            (offsets, targets, travel_costs, middles), row, other = self.up, a, b
+        else:
+            (offsets, targets, travel_costs, middles), row, other = self.down, b, a
+        for k in range(offsets[row], offsets[row + 1]):
+            if targets[k] == other:
+                return travel_costs[k], middles[k]
+        raise KeyError((a, b))
+
+    def unpack(self, a, b):  # Original (from, to, cost) edges that the edge a -> b stands for, in path order
+        stack, edges = [(a, b)], []
+        while stack:
+            a, b = stack.pop()
+            travel_cost, middle = self.edge(a, b)
+            if middle == -1:
+                edges.append((a, b, travel_cost))
+            else:
+                stack += [(middle, b), (a, middle)]  # Popped a -> middle first
+        return edges
+
+    def save(self, path):
+        typecode = self.up[2].typecode
+        with open(path, 'wb') as file:
+            file.write(self.header.pack(self.magic, typecode.encode(), len(self.nodes), len(self.up[1]), len(self.down[1])))
+            for values in (self.nodes, self.rank) + tuple(self.up) + tuple(self.down):
+                values.tofile(file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            magic, typecode, node_count, up_count, down_count = cls.header.unpack(file.read(cls.header.size))
+            if magic != cls.magic:
+                raise ValueError("{} is not a contraction hierarchy file".format(path))
+
+            def read(code, count):
+                values = array(code)
+                values.fromfile(file, count)
+                return values
+
+            nodes, rank = read('q', node_count), read('i', node_count)
+            up = read('q', node_count + 1), read('i', up_count), read(typecode.decode(), up_count), read('i', up_count)
+            down = read('q', node_count + 1), read('i', down_count), read(typecode.decode(), down_count), read('i', down_count)
+        return cls(nodes, rank, up, down)
+
+
+def pack_rows(rows, typecode):  # Lists of (target, cost, middle) per node -> CSR arrays (offsets, targets, costs, middles)
+    offsets, targets, travel_costs, middles = array('q', [0]), array('i'), array(typecode), array('i')
+    convert = int if typecode == 'q' else float  # Whole costs can come as floats (5.0), which a 'q' array won't take
+    for row in rows:
+        for target, travel_cost, middle in row:
+            targets.append(target)
+            travel_costs.append(convert(travel_cost))
+            middles.append(middle)
+        offsets.append(len(targets))
+    return offsets, targets, travel_costs, middles
+
+
+# Road network style test graph: a side x side lattice of two way streets with random travel times
+random.seed(0)
+side = 40
+weighted_adj_list = {node: [] for node in range(side * side)}
+for x in range(side):
+    for y in range(side):
+        node = x * side + y
+        for neighbor in ([node + side] if x + 1 < side else []) + ([node + 1] if y + 1 < side else []):
+            travel_cost = random.randint(1, 20)
+            weighted_adj_list[node].append([neighbor, travel_cost])
+            weighted_adj_list[neighbor].append([node, travel_cost])
+
+began = time.perf_counter()
+hierarchy = Contraction_hierarchy.build(weighted_adj_list)
+print("Preprocessing took", round(time.perf_counter() - began, 2), "s,", len(hierarchy.up[1]) + len(hierarchy.down[1]), "edges with shortcuts")
+
+# Round trip through the serialized form
+with tempfile.TemporaryDirectory() as directory:  # load reads the whole file, so it can go straight after
+    path = os.path.join(directory, "graph.ch")
+    hierarchy.save(path)
+    hierarchy = Contraction_hierarchy.load(path)
+
+queries = [(random.randrange(side * side), random.randrange(side * side)) for _ in range(100)]
+began = time.perf_counter()
+dijkstras_costs = [dijkstras(weighted_adj_list, start, end)[1].get(end) for start, end in queries]
+dijkstras_time = time.perf_counter() - began
+began = time.perf_counter()
+hierarchy_costs = [hierarchy.query(start, end)[1].get(end) for start, end in queries]
+hierarchy_time = time.perf_counter() - began
+print("Same costs:", dijkstras_costs == hierarchy_costs)
+print("Per query: dijkstras", round(dijkstras_time * 10, 3), "ms, contraction hierarchy", round(hierarchy_time * 10, 3), "ms")
+
+start, end = queries[0]
+came_from, min_cost_at = hierarchy.query(start, end)
+print(came_from, min_cost_at, sep = '\n')
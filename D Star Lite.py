@@ -0,0 +1,527 @@
+import math
+import random
+from array import array
+
+INFINITY = float('inf')
+MAX_EDITS = 4096  # Most edits a grid keeps in its log (Past that the older half is dropped, see Grid.record_edit)
+
+
+class Grid:
+    def __init__(self, w, h, walls):
+        self.w = w
+        self.h = h
+        self.walls = {}  # Hash table
+        for x, y in walls:
+            self.walls[(x, y)] = True
+        self.edits = []  # (pos, old cost, new cost) of every edit made through set_wall/set_weight, oldest first
+        self.version = 0  # Number of edits so far (Anything computed at an older version may be out of date)
+        self.edits_start = 0  # Version the grid was at before edits[0] (The edits before that were dropped)
+        self.components = None  # Components kept for this grid, if any (Searches ask it first whether end can be reached at all)
+
+    def step_cost(self, pos):  # Cost of moving into pos (Infinite for walls)
+        return math.inf if pos in self.walls else 1
+
+    def set_wall(self, pos, wall=True):  # Adds or removes a wall, and records the edit so Components can tell what changed
+        old_cost = self.step_cost(pos)
+        if wall:
+            self.walls[pos] = True
+        else:
+            self.walls.pop(pos, None)
+        self.record_edit(pos, old_cost)
+
+    def record_edit(self, pos, old_cost):
+        self.edits.append((pos, old_cost, self.step_cost(pos)))
+        self.version += 1
+        if len(self.edits) > MAX_EDITS:  # Keeps the log bounded. A cache further behind than what is left starts over
+            dropped = len(self.edits) // 2
+            del self.edits[:dropped]
+            self.edits_start += dropped
+
+    def in_bounds(self, pos):  # Check to see if the position is within the outer-most boundaries of the Grid
+        x, y = pos
+        return 0 <= x <= self.w - 1 and 0 <= y <= self.h - 1
+
+    def passable(self, pos):  # Check to see if there is a wall at the given location
+        return pos not in self.walls
+
+    def return_neighbors(self, pos):  # Return the unfiltered neighbors
+        x, y = pos
+        neighbors = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+        neighbors = filter(self.passable, neighbors)
+        neighbors = filter(self.in_bounds, neighbors)
+        return neighbors
+
+    def draw(self, came_from, start, end):
+        for y in range(self.h):
+            for x in range(self.w):
+                if (x, y) == end:
+                    print("E", end = ' ')
+                elif (x, y) == start:
+                    print("S", end=' ')
+                elif (x, y) in came_from:
+                    new_x, new_y = came_from[(x, y)]
+                    dx, dy = new_x - x, new_y - y
+                    if [dx, dy] == [1,0]:
+                        print(">", end = ' ')
+                    elif [dx, dy] == [-1, 0]:
+                        print("<", end = ' ')
+                    elif [dx, dy] == [0, 1]:
+                        print("v", end = ' ')
+                    elif [dx, dy] == [0, -1]:
+                        print("^", end = ' ')
+                elif (x, y) in self.walls:
+                    print("#", end = ' ')
+                else:
+                    print(".", end = ' ')
+            print()
+
+
+class Weighted_grid(Grid):
+    def __init__(self, w, h, walls):
+        super().__init__(w, h, walls)
+        self.weights = {}
+
+    def cur_to_next(self, to_node):
+        # Finds the cost to move into a given node (If there is no specified weight, we default to 1)
+        # The default to 1 is very useful when
+        return self.weights.get(to_node, 1)
+
+    def step_cost(self, pos):
+        return math.inf if pos in self.walls else self.cur_to_next(pos)
+
+    def set_weight(self, pos, weight):
+        old_cost = self.step_cost(pos)
+        self.weights[pos] = weight
+        self.record_edit(pos, old_cost)
+
+
+class Indexed_priority_queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
+    def __init__(self):
+        self.elements = []
+        self.position = {}  # item -> index of its pair in elements
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
+
+    def empty(self):
+        return len(self.elements) == 0
+
+    def min_weight(self):  # Weight of the item get_min would return, without removing it
+        return self.elements[0][0]
+
+    def get_min(self):
+        item = self.elements[0][1]
+        del self.position[item]
+        last = self.elements.pop()
+        if self.elements:
+            self.elements[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
+
+    def push(self, item, weight):
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.elements[i][0]:  # Only ever lower an item's weight
+                return
+            self.elements[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.elements)
+            self.elements.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def update(self, item, weight):  # Sets an item's weight whether it goes up or down (Queues it if it isn't yet)
+        if item not in self.position:
+            self.push(item, weight)
+            return
+        i = self.position[item]
+        self.elements[i][0] = weight
+        self.sift_up(i)
+        self.sift_down(self.position[item])
+
+    def remove(self, item):
+        i = self.position.pop(item)
+        last = self.elements.pop()
+        if i < len(self.elements):
+            self.elements[i] = last
+            self.position[last[1]] = i
+            self.sift_up(i)
+            self.sift_down(self.position[last[1]])
+
+    def sift_up(self, i):
+        entry = self.elements[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.elements[parent]:
+                break
+            self.elements[i] = self.elements[parent]
+            self.position[self.elements[i][1]] = i
+            i = parent
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.elements[i]
+        size = len(self.elements)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.elements[child + 1] < self.elements[child]:
+                child += 1
+            if not self.elements[child] < entry:
+                break
+            self.elements[i] = self.elements[child]
+            self.position[self.elements[i][1]] = i
+            i = child
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+
+def greedy_dist(a, b):  # Returns the manhattan distance from point a to b or b to a
+    x1, y1 = a
+    x2, y2 = b
+    return abs(x1 - x2) + abs(y1 - y2)
+
+
+class Components:
+    # Connected component label of every cell, so a query between two components is turned down straight away
+    # instead of the search flooding everything reachable from start before giving up
+    # labels is a flat 'i' array with (x, y) at x * h + y, and -1 for walls. Set grid.components to one to have the searches use it
+    # It catches up on grid.edits (set_wall) before answering, and only walks the regions an edit touched:
+    #   a wall removed: the components around the cell are joined, relabelling all but the biggest one
+    #   a wall added: floods from the cell's open neighbors one step each in turn. Floods that run into each other are the same piece,
+    #   and a flood that runs out without meeting another one was cut off and gets a new label (So only the smaller pieces get walked)
+    # The labels are the passability it goes by, so edits are replayed in order even when later ones touched the same cells
+    def __init__(self, grid):
+        self.grid = grid
+        self.label_all()
+
+    def label_all(self):  # Labels the whole grid from scratch
+        grid = self.grid
+        self.labels = array('i', [-1]) * (grid.w * grid.h)
+        self.sizes = {}  # label -> number of cells with it
+        self.next_label = 0
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if grid.passable((x, y)):
+                    self.labels[self.cell((x, y))] = -2  # Open but not labelled yet
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if self.labels[self.cell((x, y))] == -2:
+                    self.fill((x, y), self.new_label())
+        self.version = grid.version
+
+    def cell(self, pos):
+        return pos[0] * self.grid.h + pos[1]
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label - 1
+
+    def open_neighbors(self, pos):
+        x, y = pos
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                if self.grid.in_bounds(neighbor) and self.labels[self.cell(neighbor)] != -1]
+
+    def fill(self, pos, label):  # Gives pos and every cell connected to it the label
+        old_label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = label
+        stack = [pos]
+        count = 0
+        while stack:
+            cur = stack.pop()
+            count += 1
+            for neighbor in self.open_neighbors(cur):
+                if self.labels[self.cell(neighbor)] != label:
+                    self.labels[self.cell(neighbor)] = label
+                    stack.append(neighbor)
+        self.move(old_label, label, count)
+
+    def move(self, old_label, label, count):  # Keeps sizes up to date when count cells go from old_label to label
+        if old_label >= 0:
+            self.sizes[old_label] -= count
+            if not self.sizes[old_label]:
+                del self.sizes[old_label]
+        if label >= 0:
+            self.sizes[label] = self.sizes.get(label, 0) + count
+
+    def catch_up(self):
+        if self.version < self.grid.edits_start:  # The edits it missed were dropped from the log, so it starts over
+            self.label_all()
+            return
+        for pos, old_cost, new_cost in self.grid.edits[self.version - self.grid.edits_start:]:
+            if not self.grid.in_bounds(pos):
+                continue
+            is_wall = self.labels[self.cell(pos)] == -1
+            if new_cost == math.inf and not is_wall:
+                self.add_wall(pos)
+            elif new_cost != math.inf and is_wall:
+                self.remove_wall(pos)
+        self.version = self.grid.version
+
+    def remove_wall(self, pos):
+        labels = {self.labels[self.cell(neighbor)]: neighbor for neighbor in self.open_neighbors(pos)}
+        if not labels:
+            label = self.new_label()
+        else:
+            label = max(labels, key=self.sizes.get)
+            for other_label, neighbor in labels.items():
+                if other_label != label:
+                    self.fill(neighbor, label)
+        self.labels[self.cell(pos)] = label
+        self.move(-1, label, 1)
+
+    def add_wall(self, pos):
+        label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = -1
+        self.move(label, -1, 1)
+        starts = self.open_neighbors(pos)
+        owner = {start: flood for flood, start in enumerate(starts)}  # cell -> the flood that reached it first
+        group = list(range(len(starts)))  # Floods that ran into each other point at the same one
+        frontiers = [[start] for start in starts]
+        reached = [[start] for start in starts]
+        split_off = set()
+
+        def find(flood):
+            while group[flood] != flood:
+                flood = group[flood]
+            return flood
+
+        while True:
+            groups = {}
+            for flood in range(len(starts)):
+                if find(flood) not in split_off:
+                    groups.setdefault(find(flood), []).append(flood)
+            if len(groups) <= 1:
+                break
+            running = [root for root, floods in groups.items() if any(frontiers[flood] for flood in floods)]
+            finished = [root for root in groups if root not in running]
+            if not running:  # Every piece was walked in full, one of them keeps the old label
+                finished = finished[1:]
+            for root in finished:  # Ran out without meeting anyone else, so it is cut off from the rest
+                new_label = self.new_label()
+                for flood in groups[root]:
+                    for cell in reached[flood]:
+                        self.labels[self.cell(cell)] = new_label
+                    self.move(label, new_label, len(reached[flood]))
+                split_off.add(root)
+            if len(running) <= 1:
+                break
+            for root in running:
+                for flood in groups[root]:
+                    if not frontiers[flood]:
+                        continue
+                    cur = frontiers[flood].pop()
+                    for neighbor in self.open_neighbors(cur):
+                        if neighbor not in owner:
+                            owner[neighbor] = flood
+                            frontiers[flood].append(neighbor)
+                            reached[flood].append(neighbor)
+                        elif find(owner[neighbor]) != find(flood):
+                            group[find(owner[neighbor])] = find(flood)
+
+    def connected(self, start, end):
+        self.catch_up()
+        if start == end:
+            return True
+        if not (self.grid.in_bounds(start) and self.grid.in_bounds(end)):
+            return False
+        label = self.labels[self.cell(start)]
+        return label != -1 and label == self.labels[self.cell(end)]
+
+
+def unreachable(grid, start, end):  # True when the grid keeps Components and they show there is no path
+    components = getattr(grid, 'components', None)
+    return components is not None and not components.connected(start, end)
+
+
+class D_star_lite:
+    # Incremental planner (D* Lite): searches backward from end and keeps its search state between calls
+    # Wall and weight edits come in as deltas through set_wall/set_weight, and the next search only repairs the nodes
+    # whose cost to the end actually changed, instead of starting over. The start can also move (move_start) as an agent walks
+    #   g: cost from a node to the end as of the last search
+    #   rhs: one step lookahead of g (min over neighbors of step cost + neighbor's g). Nodes where the two differ are queued
+    def __init__(self, grid, start, end):
+        self.grid = grid
+        self.start = start
+        self.end = end
+        self.g = {}
+        self.rhs = {end: 0}
+        self.km = 0  # How far the start has moved in total (Keeps old queue keys valid without re-keying everything)
+        self.priority_queue = Indexed_priority_queue()
+        self.priority_queue.push(end, self.calculate_key(end))
+        self.expanded = 0  # Nodes expanded by the most recent search
+
+    def cost(self, a, b):  # Cost of stepping from a into b (Walls can't be stepped into or out of)
+        if not (self.grid.passable(a) and self.grid.passable(b)):
+            return INFINITY
+        return self.grid.cur_to_next(b)
+
+    def neighbors(self, pos):  # In bounds neighbors, walls included (Their cost is what blocks them)
+        x, y = pos
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)] if self.grid.in_bounds(neighbor)]
+
+    def calculate_key(self, pos):
+        best = min(self.g.get(pos, INFINITY), self.rhs.get(pos, INFINITY))
+        return [best + greedy_dist(self.start, pos) + self.km, best]
+
+    def lookahead(self, pos):  # rhs from scratch: the cheapest step into a neighbor plus that neighbor's g
+        return min([self.cost(pos, neighbor) + self.g.get(neighbor, INFINITY) for neighbor in self.neighbors(pos)] + [INFINITY])
+
+    def update_vertex(self, pos):
+        if self.g.get(pos, INFINITY) != self.rhs.get(pos, INFINITY):
+            self.priority_queue.update(pos, self.calculate_key(pos))
+        elif pos in self.priority_queue.position:
+            self.priority_queue.remove(pos)
+
+    def compute_shortest_path(self):
+        self.expanded = 0
+        while not self.priority_queue.empty() and (
+                self.priority_queue.min_weight() < self.calculate_key(self.start) or
+                self.rhs.get(self.start, INFINITY) != self.g.get(self.start, INFINITY)):
+            old_key = self.priority_queue.min_weight()
+            cur = self.priority_queue.get_min()
+            new_key = self.calculate_key(cur)
+            self.expanded += 1
+            if old_key < new_key:  # Its key went stale as the start moved, queue it again with the right one
+                self.priority_queue.push(cur, new_key)
+            elif self.g.get(cur, INFINITY) > self.rhs[cur]:  # Got cheaper: settle it and tell its neighbors
+                self.g[cur] = self.rhs[cur]
+                for neighbor in self.neighbors(cur):
+                    if neighbor != self.end:
+                        self.rhs[neighbor] = min(self.rhs.get(neighbor, INFINITY), self.cost(neighbor, cur) + self.g[cur])
+                    self.update_vertex(neighbor)
+            else:  # Got more expensive: forget its g and let it and its neighbors work their cost out again
+                old_g = self.g.pop(cur)
+                for neighbor in self.neighbors(cur) + [cur]:
+                    if neighbor != self.end and (neighbor == cur or self.rhs.get(neighbor, INFINITY) == self.cost(neighbor, cur) + old_g):
+                        self.rhs[neighbor] = self.lookahead(neighbor)
+                    self.update_vertex(neighbor)
+
+    def edit(self, pos, change):
+        # Applies change() to the grid, then fixes rhs for every step into or out of pos whose cost changed
+        steps = [(neighbor, pos) for neighbor in self.neighbors(pos)] + [(pos, neighbor) for neighbor in self.neighbors(pos)]
+        old_costs = [self.cost(a, b) for a, b in steps]
+        change()
+        for (a, b), old_cost in zip(steps, old_costs):
+            new_cost = self.cost(a, b)
+            if new_cost == old_cost or a == self.end:
+                continue
+            if new_cost < old_cost:
+                self.rhs[a] = min(self.rhs.get(a, INFINITY), new_cost + self.g.get(b, INFINITY))
+            elif self.rhs.get(a, INFINITY) == old_cost + self.g.get(b, INFINITY):
+                self.rhs[a] = self.lookahead(a)
+            self.update_vertex(a)
+
+    def set_wall(self, pos, wall=True):
+        self.edit(pos, lambda: self.grid.set_wall(pos, wall))
+
+    def set_weight(self, pos, weight):
+        self.edit(pos, lambda: self.grid.set_weight(pos, weight))
+
+    def move_start(self, pos):
+        self.km += greedy_dist(self.start, pos)
+        self.start = pos
+
+    def search(self):
+        # Brings the plan up to date and returns (came_from, cost_so_far) for the cells of the path, like the other searches
+        # (Just {start: None}, {start: 0} when the end can't be reached)
+        if unreachable(self.grid, self.start, self.end):  # Different components. The repairs still queued wait for a later search
+            self.expanded = 0
+            return {self.start: None}, {self.start: 0}
+        self.compute_shortest_path()
+        came_from, cost_so_far = {self.start: None}, {self.start: 0}
+        if self.g.get(self.start, INFINITY) == INFINITY:
+            return came_from, cost_so_far
+        cur = self.start
+        while cur != self.end:
+            # The next cell is the one with the cheapest step plus remaining cost
+            next_cell = min(self.neighbors(cur), key=lambda neighbor: self.cost(cur, neighbor) + self.g.get(neighbor, INFINITY))
+            came_from[next_cell] = cur
+            cost_so_far[next_cell] = cost_so_far[cur] + self.cost(cur, next_cell)
+            cur = next_cell
+        return came_from, cost_so_far
+
+
+def a_star_search(grid, start, end, stats=None):  # Full search from scratch, to compare replanning against
+    if unreachable(grid, start, end):  # Different components, there is nothing to search
+        if stats is not None:
+            stats['expanded'] = 0
+        return {start: None}, {start: 0}
+    priority_queue = Indexed_priority_queue()
+    cost_so_far = {start: 0}
+    came_from = {start: None}
+    closed = set()
+    priority_queue.push(start, greedy_dist(end, start))
+
+    while not priority_queue.empty():
+        cur = priority_queue.get_min()
+        closed.add(cur)
+        if cur == end:
+            break
+
+        for neighbor in grid.return_neighbors(cur):
+            new_cost = cost_so_far[cur] + grid.cur_to_next(neighbor)
+            if neighbor not in closed and new_cost < cost_so_far.get(neighbor, 10 ** 10):
+                cost_so_far[neighbor] = new_cost
+                came_from[neighbor] = cur
+                priority_queue.push(neighbor, new_cost + greedy_dist(end, neighbor))
+
+    if stats is not None:
+        stats['expanded'] = len(closed)
+    return came_from, cost_so_far
+
+
+def reconstruct_path(came_from, start, end):
+    current = end
+    path = []
+    while current != start:
+        path.append(current)
+        current = came_from[current]
+
+    path.append(start)
+    return path
+
+
+random.seed(3)
+size = 80
+weighted_grid = Weighted_grid(size, size, [(x, y) for x in range(size) for y in range(size) if random.random() < 0.2])
+weighted_grid.weights = {(x, y): 5 for x in range(size) for y in range(size) if random.random() < 0.2}
+start, end = (0, 0), (size - 1, size - 1)
+weighted_grid.walls.pop(start, None)
+weighted_grid.walls.pop(end, None)
+
+planner = D_star_lite(weighted_grid, start, end)
+came_from, cost_so_far = planner.search()
+print("First plan: cost", cost_so_far.get(end), "expanded", planner.expanded)
+
+# Block a cell in the middle of the path, like clicking a wall in the animation
+path = reconstruct_path(came_from, start, end)
+planner.set_wall(path[len(path) // 2])
+came_from, cost_so_far = planner.search()
+print("Replan after one wall: cost", cost_so_far.get(end), "expanded", planner.expanded)
+
+stats = {}
+a_star_came_from, a_star_cost_so_far = a_star_search(weighted_grid, start, end, stats)
+print("Full A* from scratch: cost", a_star_cost_so_far.get(end), "expanded", stats['expanded'])
+
+# The agent takes a few steps along the new path, then terrain changes ahead of it
+path = reconstruct_path(came_from, start, end)[::-1]
+planner.move_start(path[5])
+planner.set_weight(path[20], 5 if weighted_grid.cur_to_next(path[20]) == 1 else 1)
+came_from, cost_so_far = planner.search()
+print("Replan after moving and a weight change: cost", cost_so_far.get(end), "expanded", planner.expanded)
+
+# Components: walling the end in turns the next search down without repairing anything, and opening it again is picked up
+weighted_grid.components = Components(weighted_grid)
+planner.set_wall((size - 2, size - 1))
+planner.set_wall((size - 1, size - 2))
+came_from, cost_so_far = planner.search()
+print("End walled in: cost", cost_so_far.get(end), "expanded", planner.expanded)
+planner.set_wall((size - 2, size - 1), False)
+came_from, cost_so_far = planner.search()
+print("Opened again: cost", cost_so_far.get(end), "expanded", planner.expanded)
@@ -1,4 +1,11 @@
-import heapq
+import math
+import random
+import time
+from array import array
+from collections.abc import Mapping
+
+MAX_EDITS = 4096  # Most edits a grid keeps in its log (Past that the older half is dropped, see Grid.record_edit)
+
 
 class Grid:
     def __init__(self, w, h, walls):
@@ -7,6 +14,29 @@ class Grid:
         self.walls = {}  # Hash table
         for x, y in walls:
             self.walls[(x, y)] = True
+        self.edits = []  # (pos, old cost, new cost) of every edit made through set_wall/set_weight, oldest first
+        self.version = 0  # Number of edits so far (Anything computed at an older version may be out of date)
+        self.edits_start = 0  # Version the grid was at before edits[0] (The edits before that were dropped)
+        self.components = None  # Components kept for this grid, if any (Searches ask it first whether end can be reached at all)
+
+    def step_cost(self, pos):  # Cost of moving into pos (Infinite for walls)
+        return math.inf if pos in self.walls else 1
+
+    def set_wall(self, pos, wall=True):  # Adds or removes a wall, and records the edit so Components can tell what changed
+        old_cost = self.step_cost(pos)
+        if wall:
+            self.walls[pos] = True
+        else:
+            self.walls.pop(pos, None)
+        self.record_edit(pos, old_cost)
+
+    def record_edit(self, pos, old_cost):
+        self.edits.append((pos, old_cost, self.step_cost(pos)))
+        self.version += 1
+        if len(self.edits) > MAX_EDITS:  # Keeps the log bounded. A cache further behind than what is left starts over
+            dropped = len(self.edits) // 2
+            del self.edits[:dropped]
+            self.edits_start += dropped
 
     def in_bounds(self, pos):  # Check to see if the position is within the outer-most boundaries of the Grid
         x, y = pos
@@ -51,58 +81,809 @@ class Weighted_grid(Grid):
     def __init__(self, w, h, walls):
         super().__init__(w, h, walls)
         self.weights = {}
+        self.weight_range = None  # (weights dict, min, max, integral) as of the last weight_stats, kept up to date by set_weight
 
     def cur_to_next(self, to_node):
         # Finds the cost to move into a given node (If there is no specified weight, we default to 1)
         # The default to 1 is very useful when
         return self.weights.get(to_node, 1)
 
+    def step_cost(self, pos):
+        return math.inf if pos in self.walls else self.cur_to_next(pos)
+
+    def set_weight(self, pos, weight):
+        old_cost = self.step_cost(pos)
+        old_weight = self.weights.get(pos)
+        self.weights[pos] = weight
+        if self.weight_range is not None and self.weight_range[0] is self.weights:
+            weights, low, high, integral = self.weight_range
+            if old_weight is not None and old_weight != 1 and (old_weight in (low, high) or not float(old_weight).is_integer()):
+                self.weight_range = None  # The old weight may have been the only one at a bound, weight_stats scans again
+            else:  # (Cells without a weight keep 1 in the range whatever happens to this one)
+                self.weight_range = (weights, min(low, weight), max(high, weight), integral and float(weight).is_integer())
+        self.record_edit(pos, old_cost)
+
+    def weight_stats(self):
+        # (min, max, integral) of the step costs (Cells without a weight cost 1), for choose_queue
+        # Scanned once per weights dict, then kept up to date by set_weight. Assigning a new dict (grid.weights = ...) is
+        # noticed, but weights changed in place (grid.weights[pos] = ...) aren't, so edit through set_weight
+        if self.weight_range is None or self.weight_range[0] is not self.weights:
+            weights = list(self.weights.values()) + [1]
+            self.weight_range = (self.weights, min(weights), max(weights), all(float(weight).is_integer() for weight in weights))
+        return self.weight_range[1:]
+
+
+class Compact_grid:
+    # Same map as Weighted_grid, but stored in flat typed arrays instead of hash tables keyed by (x, y) tuples
+    # Every cell is a plain int index. The map is padded with a 1 cell border of walls so neighbors never need a bounds check
+    # Cells are numbered column by column so comparing two indices gives the same order as comparing their (x, y) tuples
+    # (This keeps ties in the priority queue breaking the same way they do on Grid, so both grids give the same paths)
+    def __init__(self, w, h, walls, weights=None):
+        self.w = w
+        self.h = h
+        self.stride = h + 2  # Distance between (x, y) and (x + 1, y)
+        self.size = (w + 2) * self.stride
+        self.open = bytearray(self.size)  # Passability bitmap (1 = passable, walls and the border are 0)
+        for x in range(w):
+            column = self.index((x, 0))
+            self.open[column:column + h] = b'\x01' * h
+        for pos in walls:
+            self.open[self.index(pos)] = 0
+
+        weights = weights or {}
+        typecode = 'i' if all(float(weight).is_integer() for weight in weights.values()) else 'd'
+        self.weights = array(typecode, [1]) * self.size
+        convert = int if typecode == 'i' else float  # Whole weights can come as floats (5.0), which an 'i' array won't take
+        for pos, weight in weights.items():
+            self.weights[self.index(pos)] = convert(weight)
+        self.min_weight = convert(min(list(weights.values()) + [1]))  # Cells without a weight cost 1
+        self.max_weight = convert(max(list(weights.values()) + [1]))
+
+        # Neighbor offsets in the same order as Grid.return_neighbors (down, up, right, left)
+        self.offsets = (1, -1, self.stride, -self.stride)
+        self.edits = []  # Never edited, but searches and caches look at these like on Grid
+        self.version = 0
+        self.edits_start = 0
+        self.components = None  # Components(compact_grid), if kept (Asked with (x, y) positions, like on Grid)
+
+    @classmethod
+    def from_grid(cls, grid):  # Build from an existing Grid/Weighted_grid
+        return cls(grid.w, grid.h, grid.walls, getattr(grid, 'weights', None))
+
+    def index(self, pos):  # (x, y) -> cell index
+        x, y = pos
+        return (x + 1) * self.stride + y + 1
+
+    def position(self, cell):  # Cell index -> (x, y)
+        x, y = divmod(cell, self.stride)
+        return x - 1, y - 1
+
+    def in_bounds(self, pos):
+        x, y = pos
+        return 0 <= x <= self.w - 1 and 0 <= y <= self.h - 1
+
+    def passable(self, pos):
+        return self.in_bounds(pos) and self.open[self.index(pos)] == 1
+
+    def return_neighbors(self, cell):  # Takes and returns cell indices, not (x, y) tuples
+        return [cell + offset for offset in self.offsets if self.open[cell + offset]]
+
+    def cur_to_next(self, to_cell):
+        return self.weights[to_cell]
+
+    def draw(self, came_from, start, end):
+        for y in range(self.h):
+            for x in range(self.w):
+                if (x, y) == end:
+                    print("E", end = ' ')
+                elif (x, y) == start:
+                    print("S", end=' ')
+                elif (x, y) in came_from:
+                    new_x, new_y = came_from[(x, y)]
+                    dx, dy = new_x - x, new_y - y
+                    if [dx, dy] == [1,0]:
+                        print(">", end = ' ')
+                    elif [dx, dy] == [-1, 0]:
+                        print("<", end = ' ')
+                    elif [dx, dy] == [0, 1]:
+                        print("v", end = ' ')
+                    elif [dx, dy] == [0, -1]:
+                        print("^", end = ' ')
+                elif not self.passable((x, y)):
+                    print("#", end = ' ')
+                else:
+                    print(".", end = ' ')
+            print()
+
+
+START = 4  # Search_workspace direction code of the start cell (Codes 0 to 3 are steps along grid.offsets)
+
+
+class Search_workspace:
+    # Bookkeeping for searches on one Compact_grid, allocated once and reused by every query instead of fresh arrays each time
+    #   cost: min cost found so far at each cell
+    #   direction: index into grid.offsets of the step that reached each cell (Its parent is cell - grid.offsets[code]), START for the start
+    #   stamp: the generation a cell was last touched in. A query gets two stamps of its own: generation (Reached) and generation + 1 (Expanded)
+    # Anything stamped before the current generation is left over from an earlier query and counts as untouched,
+    # so reset is O(1) instead of clearing the arrays (They are only cleared when the 32 bit stamps run out)
+    # Results (Cell_map views, path_to's path) read straight out of the workspace, so they are only good until the next reset
+    def __init__(self, grid):
+        self.grid = grid
+        self.cost = array('q' if grid.weights.typecode == 'i' else 'd', [0]) * grid.size
+        self.direction = bytearray(grid.size)
+        self.stamp = array('I', [0]) * grid.size
+        self.generation = 0
+        self.path = None  # path_to's buffer, made on first use (Filled from the back, a path can't visit more cells than there are)
+
+    def reset(self):  # Starts a new query
+        self.generation += 2
+        if self.generation + 1 > 0xFFFFFFFF:
+            self.stamp = array('I', [0]) * self.grid.size
+            self.generation = 2
+
+    def reached(self, cell):
+        return self.stamp[cell] >= self.generation
+
+    def parent(self, cell):  # None for the start
+        code = self.direction[cell]
+        return None if code == START else cell - self.grid.offsets[code]
+
+    def path_to(self, end):
+        # Cell indices from the start to end (Empty if end wasn't reached), as a memoryview over the reused path buffer
+        if self.path is None:
+            self.path = array('i', [0]) * self.grid.size
+        if not self.reached(end):
+            return memoryview(self.path)[:0]
+        direction, offsets, path = self.direction, self.grid.offsets, self.path
+        i = len(path)
+        cell = end
+        while True:
+            i -= 1
+            path[i] = cell
+            code = direction[cell]
+            if code == START:
+                return memoryview(path)[i:]
+            cell -= offsets[code]
+
 
-class Priority_queue:
+class Cell_map(Mapping):
+    # Read-only dict-like view over a Search_workspace, keyed by (x, y) like the dicts the searches return
+    # A cell only counts as present once the search has reached it (Stamped in the workspace's current generation)
+    # values=None makes it the came_from view: parents come from the direction codes, and the start shows up as None
+    def __init__(self, workspace, values=None):
+        self.workspace = workspace
+        self.values = values
+        self.generation = workspace.generation
+
+    def __getitem__(self, pos):
+        workspace = self.workspace
+        if workspace.generation != self.generation:
+            raise RuntimeError("The search workspace has been reset for another query since")
+        if not workspace.grid.in_bounds(pos):
+            raise KeyError(pos)
+        cell = workspace.grid.index(pos)
+        if not workspace.reached(cell):
+            raise KeyError(pos)
+        if self.values is None:
+            parent = workspace.parent(cell)
+            return None if parent is None else workspace.grid.position(parent)
+        return self.values[cell]
+
+    def __iter__(self):
+        for cell, stamp in enumerate(self.workspace.stamp):
+            if stamp >= self.generation:
+                yield self.workspace.grid.position(cell)
+
+    def __len__(self):
+        return sum(1 for stamp in self.workspace.stamp if stamp >= self.generation)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Indexed_priority_queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
     def __init__(self):
-        # Note that the heap is a min heap and NOT max heap
         self.elements = []
+        self.position = {}  # item -> index of its pair in elements
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
 
     def empty(self):
         return len(self.elements) == 0
 
+    def __len__(self):
+        return len(self.elements)
+
+    def min_weight(self):  # Weight of the item get_min would return, without removing it
+        return self.elements[0][0]
+
+    def get_min(self):
+        item = self.elements[0][1]
+        del self.position[item]
+        last = self.elements.pop()
+        if self.elements:
+            self.elements[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
+
+    def push(self, item, weight):
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.elements[i][0]:  # Only ever lower an item's weight
+                return
+            self.elements[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.elements)
+            self.elements.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def sift_up(self, i):
+        entry = self.elements[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.elements[parent]:
+                break
+            self.elements[i] = self.elements[parent]
+            self.position[self.elements[i][1]] = i
+            i = parent
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.elements[i]
+        size = len(self.elements)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.elements[child + 1] < self.elements[child]:
+                child += 1
+            if not self.elements[child] < entry:
+                break
+            self.elements[i] = self.elements[child]
+            self.position[self.elements[i][1]] = i
+            i = child
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+
+class Bucket_queue:
+    # Dial's algorithm: one bucket per integer priority instead of a heap, so push and get_min are O(1) amortized
+    # Only works when every queued priority lies within span of the lowest one still queued, which holds when
+    # step costs are small integers (span = highest step cost, plus any change in the heuristic per step)
+    # The buckets are reused as a ring of span + 1 slots. Each bucket is a dict so decrease-key can remove items in O(1)
+    def __init__(self, span):
+        self.buckets = [{} for _ in range(span + 1)]
+        self.priority = {}  # item -> its priority while it is queued
+        self.current = 0  # No queued priority is lower than this
+        self.decreased = 0  # Pushes turned into decrease-keys (Same counter as Indexed_priority_queue)
+
+    def empty(self):
+        return len(self.priority) == 0
+
+    def __len__(self):
+        return len(self.priority)
+
     def get_min(self):
-        return heapq.heappop(self.elements)[1]
+        while not self.buckets[self.current % len(self.buckets)]:
+            self.current += 1
+        bucket = self.buckets[self.current % len(self.buckets)]
+        item = next(iter(bucket))  # Oldest item first
+        del bucket[item]
+        del self.priority[item]
+        return item
 
     def push(self, item, weight):
-        heapq.heappush(self.elements, [weight, item])
+        weight = int(weight)
+        if item in self.priority:
+            old_weight = self.priority[item]
+            if weight >= old_weight:  # Only ever lower an item's weight
+                return
+            del self.buckets[old_weight % len(self.buckets)][item]
+            self.decreased += 1
+        if not self.priority or weight < self.current:  # The queue can run empty while a node's neighbors are still being pushed
+            self.current = weight
+        self.priority[item] = weight
+        self.buckets[weight % len(self.buckets)][item] = True
+
+
+BUCKET_QUEUE_MAX_WEIGHT = 64  # Highest step cost that still gets a bucket queue (More would mean a long ring of mostly empty buckets)
+
+
+def choose_queue(grid, slack, bucket_queue=None):
+    # Picks Dial's bucket queue when every step cost is a small integer, otherwise the indexed heap
+    # slack is how much a priority can move on top of the step cost (1 for A*, since greedy_dist changes by 1 per step)
+    # Passing bucket_queue=True/False forces one or the other, but the bucket queue can't be forced on non-integer weights
+    if isinstance(grid, Compact_grid):
+        low, high, integral = grid.min_weight, grid.max_weight, grid.weights.typecode == 'i'
+    else:
+        low, high, integral = grid.weight_stats()
+    if bucket_queue is None:
+        # A priority can't drop below the one just popped as long as every step costs at least the slack
+        bucket_queue = integral and low >= slack and high <= BUCKET_QUEUE_MAX_WEIGHT
+    elif bucket_queue and not integral:  # Its buckets are whole numbers, fractional priorities would come out in the wrong order
+        raise ValueError("The bucket queue needs integer weights")
+    if bucket_queue:
+        return Bucket_queue(int(high) + slack)
+    return Indexed_priority_queue()
+
+
+class Components:
+    # Connected component label of every cell, so a query between two components is turned down straight away
+    # instead of the search flooding everything reachable from start before giving up
+    # labels is a flat 'i' array with (x, y) at x * h + y, and -1 for walls. Set grid.components to one to have the searches use it
+    # It catches up on grid.edits (set_wall) before answering, and only walks the regions an edit touched:
+    #   a wall removed: the components around the cell are joined, relabelling all but the biggest one
+    #   a wall added: floods from the cell's open neighbors one step each in turn. Floods that run into each other are the same piece,
+    #   and a flood that runs out without meeting another one was cut off and gets a new label (So only the smaller pieces get walked)
+    # The labels are the passability it goes by, so edits are replayed in order even when later ones touched the same cells
+    def __init__(self, grid):
+        self.grid = grid
+        self.label_all()
+
+    def label_all(self):  # Labels the whole grid from scratch
+        grid = self.grid
+        self.labels = array('i', [-1]) * (grid.w * grid.h)
+        self.sizes = {}  # label -> number of cells with it
+        self.next_label = 0
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if grid.passable((x, y)):
+                    self.labels[self.cell((x, y))] = -2  # Open but not labelled yet
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if self.labels[self.cell((x, y))] == -2:
+                    self.fill((x, y), self.new_label())
+        self.version = grid.version
+
+    def cell(self, pos):
+        return pos[0] * self.grid.h + pos[1]
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label - 1
+
+    def open_neighbors(self, pos):
+        x, y = pos
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                if self.grid.in_bounds(neighbor) and self.labels[self.cell(neighbor)] != -1]
+
+    def fill(self, pos, label):  # Gives pos and every cell connected to it the label
+        old_label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = label
+        stack = [pos]
+        count = 0
+        while stack:
+            cur = stack.pop()
+            count += 1
+            for neighbor in self.open_neighbors(cur):
+                if self.labels[self.cell(neighbor)] != label:
+                    self.labels[self.cell(neighbor)] = label
+                    stack.append(neighbor)
+        self.move(old_label, label, count)
+
+    def move(self, old_label, label, count):  # Keeps sizes up to date when count cells go from old_label to label
+        if old_label >= 0:
+            self.sizes[old_label] -= count
+            if not self.sizes[old_label]:
+                del self.sizes[old_label]
+        if label >= 0:
+            self.sizes[label] = self.sizes.get(label, 0) + count
+
+    def catch_up(self):
+        if self.version < self.grid.edits_start:  # The edits it missed were dropped from the log, so it starts over
+            self.label_all()
+            return
+        for pos, old_cost, new_cost in self.grid.edits[self.version - self.grid.edits_start:]:
+            if not self.grid.in_bounds(pos):
+                continue
+            is_wall = self.labels[self.cell(pos)] == -1
+            if new_cost == math.inf and not is_wall:
+                self.add_wall(pos)
+            elif new_cost != math.inf and is_wall:
+                self.remove_wall(pos)
+        self.version = self.grid.version
+
+    def remove_wall(self, pos):
+        labels = {self.labels[self.cell(neighbor)]: neighbor for neighbor in self.open_neighbors(pos)}
+        if not labels:
+            label = self.new_label()
+        else:
+            label = max(labels, key=self.sizes.get)
+            for other_label, neighbor in labels.items():
+                if other_label != label:
+                    self.fill(neighbor, label)
+        self.labels[self.cell(pos)] = label
+        self.move(-1, label, 1)
+
+    def add_wall(self, pos):
+        label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = -1
+        self.move(label, -1, 1)
+        starts = self.open_neighbors(pos)
+        owner = {start: flood for flood, start in enumerate(starts)}  # cell -> the flood that reached it first
+        group = list(range(len(starts)))  # Floods that ran into each other point at the same one
+        frontiers = [[start] for start in starts]
+        reached = [[start] for start in starts]
+        split_off = set()
 
+        def find(flood):
+            while group[flood] != flood:
+                flood = group[flood]
+            return flood
 
-def dijkstra_search(grid, start, end):
+        while True:
+            groups = {}
+            for flood in range(len(starts)):
+                if find(flood) not in split_off:
+                    groups.setdefault(find(flood), []).append(flood)
+            if len(groups) <= 1:
+                break
+            running = [root for root, floods in groups.items() if any(frontiers[flood] for flood in floods)]
+            finished = [root for root in groups if root not in running]
+            if not running:  # Every piece was walked in full, one of them keeps the old label
+                finished = finished[1:]
+            for root in finished:  # Ran out without meeting anyone else, so it is cut off from the rest
+                new_label = self.new_label()
+                for flood in groups[root]:
+                    for cell in reached[flood]:
+                        self.labels[self.cell(cell)] = new_label
+                    self.move(label, new_label, len(reached[flood]))
+                split_off.add(root)
+            if len(running) <= 1:
+                break
+            for root in running:
+                for flood in groups[root]:
+                    if not frontiers[flood]:
+                        continue
+                    cur = frontiers[flood].pop()
+                    for neighbor in self.open_neighbors(cur):
+                        if neighbor not in owner:
+                            owner[neighbor] = flood
+                            frontiers[flood].append(neighbor)
+                            reached[flood].append(neighbor)
+                        elif find(owner[neighbor]) != find(flood):
+                            group[find(owner[neighbor])] = find(flood)
+
+    def connected(self, start, end):
+        self.catch_up()
+        if start == end:
+            return True
+        if not (self.grid.in_bounds(start) and self.grid.in_bounds(end)):
+            return False
+        label = self.labels[self.cell(start)]
+        return label != -1 and label == self.labels[self.cell(end)]
+
+
+def unreachable(grid, start, end):  # True when the grid keeps Components and they show there is no path
+    components = getattr(grid, 'components', None)
+    return components is not None and not components.connected(start, end)
+
+
+class Search_observer:
+    # Watches a search from the outside: counters, and optionally callbacks and sampled timing
+    # Searches take observer=None. Without one, all a search pays is an 'is not None' check per event
+    #   expansions: nodes taken off the queue and expanded
+    #   pushes: pushes onto the queue (Including ones that only lowered the priority of a queued node)
+    #   max_frontier: most nodes queued at once
+    # on_expand(node) and on_push(node, priority), when given, are called for every event as it happens
+    # sample_every=n appends (expansions, seconds since the search started) to samples every n expansions
+    # Counters keep adding up over several searches until reset is called. seconds is the time spent in them
+    def __init__(self, on_expand=None, on_push=None, sample_every=0):
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.expansions = 0
+        self.pushes = 0
+        self.max_frontier = 0
+        self.samples = []
+        self.seconds = 0
+        self.began = time.perf_counter()
+
+    def started(self):
+        self.began = time.perf_counter()
+
+    def expanded(self, node):
+        self.expansions += 1
+        if self.on_expand is not None:
+            self.on_expand(node)
+        if self.sample_every and self.expansions % self.sample_every == 0:
+            self.samples.append((self.expansions, time.perf_counter() - self.began))
+
+    def pushed(self, node, priority, frontier):  # frontier is how many nodes are queued after the push
+        self.pushes += 1
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.on_push is not None:
+            self.on_push(node, priority)
+
+    def finished(self):
+        self.seconds += time.perf_counter() - self.began
+
+
+def dijkstra_search(grid, start, end, stats=None, bucket_queue=None, observer=None, workspace=None):
     # The most important parts of dijkstras is the priority queue and the presence of weighted graphs (Usually)
     # The priority queue is used to choose paths with the least cost (No matter how far the path may have already gone)
+    # If a stats dict is passed in, it is filled with how much work the indexed queue and the closed set saved:
+    #   duplicate_pushes_avoided: improved costs that lowered a queued entry instead of pushing a second copy
+    #   re_expansions_avoided: cheaper costs found for already expanded nodes, which would have been queued and expanded again
+    # An observer (Search_observer) is told about every push and expansion as they happen
+    # choose_queue picks the queue (Dial's bucket queue when every weight is a small integer), bucket_queue=True/False forces it
+    # workspace (A Search_workspace, Compact_grid only) is reused for the bookkeeping, see compact_dijkstra_search
+    if isinstance(grid, Compact_grid):
+        return compact_dijkstra_search(grid, start, end, stats, bucket_queue, observer, workspace)
+    if workspace is not None:  # A Search_workspace is laid out by cell index, only a Compact_grid has those
+        raise TypeError("workspace needs a Compact_grid, not a {}".format(type(grid).__name__))
+    if unreachable(grid, start, end):  # Different components, there is nothing to search
+        if stats is not None:
+            stats.update(duplicate_pushes_avoided=0, re_expansions_avoided=0)
+        return {start: None}, {start: 0}
 
-    priority_queue = Priority_queue()
+    priority_queue = choose_queue(grid, 0, bucket_queue)
+    closed = set()  # Nodes that have already been expanded (Their cost can't get any lower)
+    re_expansions_avoided = 0
     cost_so_far = {}
     cost_so_far[start] = 0  # Lowest cost at any given node (At a given time)
     priority_queue.push(start, 0)
     came_from = {}
     came_from[start] = None
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, 0, 1)
 
     while not priority_queue.empty():
         cur = priority_queue.get_min()
+        closed.add(cur)
+        if observer is not None:
+            observer.expanded(cur)
 
         if cur == end:
             break
 
         for neighbor in grid.return_neighbors(cur):
             new_cost = cost_so_far[cur] + grid.cur_to_next(neighbor)
+            if neighbor in closed:  # Expanded nodes are final, they are never queued again
+                if new_cost < cost_so_far[neighbor]:
+                    re_expansions_avoided += 1
+                continue
             if neighbor not in cost_so_far:
                 cost_so_far[neighbor] = new_cost
                 priority_queue.push(neighbor, new_cost)
                 came_from[neighbor] = cur
-            elif new_cost < cost_so_far[neighbor]:  # It is possible to revisit a node if a more cost effective solution is found
+            elif new_cost < cost_so_far[neighbor]:  # A queued node has its priority lowered if a more cost effective solution is found
                 cost_so_far[neighbor] = new_cost
                 priority_queue.push(neighbor, new_cost)
                 came_from[neighbor] = cur
+            else:
+                continue
+            if observer is not None:
+                observer.pushed(neighbor, new_cost, len(priority_queue))
+
+    if observer is not None:
+        observer.finished()
+    if stats is not None:
+        stats['duplicate_pushes_avoided'] = priority_queue.decreased
+        stats['re_expansions_avoided'] = re_expansions_avoided
+
+    return came_from, cost_so_far
+
+
+def compact_dijkstra_search(grid, start, end, stats=None, bucket_queue=None, observer=None, workspace=None):
+    # The same search as dijkstra_search, but every node is a cell index and the bookkeeping lives in the flat arrays of a Search_workspace
+    # Passing the same workspace to every query on a grid saves allocating them per query (A new one is made when none is given)
+    # came_from and cost_so_far are handed back as Cell_map views over the workspace so reconstruct_path and draw work on them unchanged
+    # (They are only good until the workspace's next query. workspace.path_to gives the path without building any dicts or lists)
+    # The observer sees cell indices (grid.position turns them back into (x, y))
+    cut_off = unreachable(grid, start, end)  # Different components: only start is reached, nothing is searched
+    start, end = grid.index(start), grid.index(end)
+    open_cells = grid.open
+    weights = grid.weights
+    offsets = grid.offsets
+
+    if workspace is None:
+        workspace = Search_workspace(grid)
+    workspace.reset()
+    cost_so_far = workspace.cost
+    direction = workspace.direction
+    stamp = workspace.stamp
+    reached = workspace.generation  # Stamp of cells reached by this query
+    closed = reached + 1  # Stamp of cells it expanded
+    re_expansions_avoided = 0
+    priority_queue = choose_queue(grid, 0, bucket_queue)
+    cost_so_far[start] = 0
+    direction[start] = START
+    stamp[start] = reached
+    if cut_off:
+        if stats is not None:
+            stats.update(duplicate_pushes_avoided=0, re_expansions_avoided=0)
+        return Cell_map(workspace), Cell_map(workspace, cost_so_far)
+    priority_queue.push(start, 0)
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, 0, 1)
+
+    while not priority_queue.empty():
+        cur = priority_queue.get_min()
+        stamp[cur] = closed
+        if observer is not None:
+            observer.expanded(cur)
+
+        if cur == end:
+            break
+
+        cur_cost = cost_so_far[cur]
+        for code, offset in enumerate(offsets):
+            neighbor = cur + offset
+            if not open_cells[neighbor]:
+                continue
+            new_cost = cur_cost + weights[neighbor]
+            if stamp[neighbor] == closed:
+                if new_cost < cost_so_far[neighbor]:
+                    re_expansions_avoided += 1
+                continue
+            if stamp[neighbor] != reached or new_cost < cost_so_far[neighbor]:  # A stale cost from an earlier query doesn't count
+                cost_so_far[neighbor] = new_cost
+                direction[neighbor] = code
+                stamp[neighbor] = reached
+                priority_queue.push(neighbor, new_cost)
+                if observer is not None:
+                    observer.pushed(neighbor, new_cost, len(priority_queue))
+
+    if observer is not None:
+        observer.finished()
+    if stats is not None:
+        stats['duplicate_pushes_avoided'] = priority_queue.decreased
+        stats['re_expansions_avoided'] = re_expansions_avoided
+
+    return Cell_map(workspace), Cell_map(workspace, cost_so_far)
+
+def bidirectional_dijkstra_search(grid, start, end, stats=None, observer=None):
+    # Runs one search forward from start and one backward from end, and stops once they have provably met on the cheapest path
+    # Forward steps pay for the node they move into, backward steps pay for the node they move out of (The same edge, walked the other way)
+    # Stopping rule: once the lowest priorities of the two queues add up to at least the cheapest meeting cost found, nothing cheaper is left
+    # Returns (came_from, cost_so_far) like dijkstra_search: the forward tree, with the backward half of the best path reversed into it
+    # If a stats dict is passed in, stats['expanded'] is set to the number of nodes both sides expanded together
+    # An observer (Search_observer) sees both sides' pushes and expansions, and the frontier of the two queues together
+    # (On a Compact_grid it sees cell indices, like compact_a_star_search)
+    if unreachable(grid, start, end):
+        if stats is not None:
+            stats['expanded'] = 0
+        return {start: None}, {start: 0}
+    if isinstance(grid, Compact_grid):  # Searches on cell indices, the result is keyed by (x, y) again at the end
+        node_of, position_of = grid.index, grid.position
+    else:
+        node_of = position_of = lambda pos: pos
+    end_pos = end
+    start, end = node_of(start), node_of(end)
+
+    queues = [Indexed_priority_queue(), Indexed_priority_queue()]  # Index 0 is the forward side, 1 the backward side
+    costs = [{start: 0}, {end: 0}]
+    parents = [{start: None}, {end: None}]
+    closed = [set(), set()]
+    queues[0].push(start, 0)
+    if grid.passable(end_pos):  # A walled off end can't be reached, so the backward side never starts
+        queues[1].push(end, 0)
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, 0, 1)
+        if not queues[1].empty():
+            observer.pushed(end, 0, 2)
+    best_cost, meet = (0, start) if start == end else (10 ** 10, None)
+    expanded = 0
+
+    while not queues[0].empty() and not queues[1].empty():
+        if queues[0].min_weight() + queues[1].min_weight() >= best_cost:
+            break
+
+        side = 0 if len(queues[0].elements) <= len(queues[1].elements) else 1  # Grow the smaller frontier
+        other = 1 - side
+        cur = queues[side].get_min()
+        closed[side].add(cur)
+        expanded += 1
+        if observer is not None:
+            observer.expanded(cur)
+
+        for neighbor in grid.return_neighbors(cur):
+            if neighbor in closed[side]:
+                continue
+            new_cost = costs[side][cur] + grid.cur_to_next(neighbor if side == 0 else cur)
+            if new_cost < costs[side].get(neighbor, 10 ** 10):
+                costs[side][neighbor] = new_cost
+                parents[side][neighbor] = cur
+                queues[side].push(neighbor, new_cost)
+                if observer is not None:
+                    observer.pushed(neighbor, new_cost, len(queues[0]) + len(queues[1]))
+                if neighbor in costs[other] and new_cost + costs[other][neighbor] < best_cost:  # The two searches touch here
+                    best_cost, meet = new_cost + costs[other][neighbor], neighbor
 
+    if observer is not None:
+        observer.finished()
+    came_from, cost_so_far = parents[0], costs[0]
+    if meet is not None:
+        # Walk the backward tree from the meeting node to the end, pointing each node back along the path
+        cur = meet
+        while cur != end:
+            next_node = parents[1][cur]
+            came_from[next_node] = cur
+            cost_so_far[next_node] = cost_so_far[cur] + grid.cur_to_next(next_node)
+            cur = next_node
+
+    if stats is not None:
+        stats['expanded'] = expanded
+    if isinstance(grid, Compact_grid):
+        came_from = {position_of(node): None if parent is None else position_of(parent) for node, parent in came_from.items()}
+        cost_so_far = {position_of(node): cost for node, cost in cost_so_far.items()}
     return came_from, cost_so_far
 
+
+STAY = 255  # Flow_field direction of the end itself, and of cells that can't reach it
+
+
+class Flow_field(Mapping):
+    # One dijkstra run backward from end over the whole map, for many agents that all head to the same end
+    # distance[cell] is the min cost from cell to end (inf = can't get there) and direction[cell] the index into
+    # grid.offsets of the step to take next, so each agent reads its next move in O(1) instead of running its own search
+    # Cells are Compact_grid indices (A Grid/Weighted_grid is converted first). Both fields are plain typed arrays,
+    # so they can be kept around for as long as the map and end don't change, pickled small or copied into shared memory
+    # As a mapping it reads like came_from, except that flow_field[pos] is the next step toward end (None at end)
+    # So grid.draw shows it as arrows, and reconstruct_path(flow_field, end, pos) gives the path from pos to end
+    def __init__(self, grid, end, bucket_queue=None):
+        if not isinstance(grid, Compact_grid):
+            grid = Compact_grid.from_grid(grid)
+        self.grid = grid
+        self.end = end
+        self.distance = array('d', [math.inf]) * grid.size
+        self.direction = array('B', [STAY]) * grid.size
+        end = grid.index(end)
+        if not grid.open[end]:
+            return
+
+        open_cells, weights, offsets = grid.open, grid.weights, grid.offsets
+        distance, direction = self.distance, self.direction
+        closed = bytearray(grid.size)
+        priority_queue = choose_queue(grid, 0, bucket_queue)
+        distance[end] = 0
+        priority_queue.push(end, 0)
+        while not priority_queue.empty():
+            cur = priority_queue.get_min()
+            closed[cur] = 1
+            new_cost = distance[cur] + weights[cur]  # Going backward, so the step is from neighbor into cur (cur_to_next(cur))
+            for step, offset in enumerate(offsets):
+                neighbor = cur + offset
+                if open_cells[neighbor] and not closed[neighbor] and new_cost < distance[neighbor]:
+                    distance[neighbor] = new_cost
+                    direction[neighbor] = step ^ 1  # Offsets come in opposite pairs (down/up, right/left), so this points back at cur
+                    priority_queue.push(neighbor, new_cost)
+
+    def next_step(self, pos):  # Where an agent at pos moves next (None at end, or if end can't be reached from pos)
+        cell = self.grid.index(pos)
+        step = self.direction[cell]
+        if step == STAY:
+            return None
+        return self.grid.position(cell + self.grid.offsets[step])
+
+    def __getitem__(self, pos):
+        if not self.grid.in_bounds(pos) or self.distance[self.grid.index(pos)] == math.inf:
+            raise KeyError(pos)
+        return self.next_step(pos)
+
+    def __iter__(self):
+        for cell, distance in enumerate(self.distance):
+            if distance != math.inf:
+                yield self.grid.position(cell)
+
+    def __len__(self):
+        return len(self.distance) - self.distance.count(math.inf)
+
+
 def reconstruct_path(came_from, start, end):
     current = end
     path = []
@@ -133,6 +914,15 @@ print(cost_so_far)
 path = reconstruct_path(came_from, start, end)
 weighted_grid.draw(came_from, start,  end)
 
+# Same search on the array backed grid (Should give the exact same path)
+compact_grid = Compact_grid.from_grid(weighted_grid)
+compact_came_from, compact_cost_so_far = dijkstra_search(compact_grid, start, end)
+print(reconstruct_path(compact_came_from, start, end) == path)
+
+# Searching from both ends at once (Same min cost, fewer nodes expanded on long queries)
+bidirectional_came_from, bidirectional_cost_so_far = bidirectional_dijkstra_search(weighted_grid, start, end)
+print(bidirectional_cost_so_far[end] == cost_so_far[end], len(reconstruct_path(bidirectional_came_from, start, end)) == len(path))
+
 # Draw the path
 for y in range(weighted_grid.h):
     for x in range(weighted_grid.w):
@@ -140,4 +930,57 @@ for y in range(weighted_grid.h):
             print("@", end = ' ')
         else:
             print(".", end = ' ')
-    print()
\ No newline at end of file
+    print()
+
+# Bucket queue vs indexed heap on a bigger generated map with the same kind of terrain (Costs 1 and 5)
+random.seed(0)
+size = 300
+bench_grid = Weighted_grid(size, size, [])
+bench_grid.walls = {(x, y): True for x in range(size) for y in range(size) if random.random() < 0.2}
+bench_grid.weights = {(x, y): 5 for x in range(size) for y in range(size) if random.random() < 0.3}
+bench_start, bench_end = (0, 0), (size - 1, size - 1)
+bench_grid.walls.pop(bench_start, None)
+bench_grid.walls.pop(bench_end, None)
+for grid_name, grid in (("Weighted_grid", bench_grid), ("Compact_grid", Compact_grid.from_grid(bench_grid))):
+    for queue_name, bucket_queue in (("heap", False), ("bucket queue", True)):
+        began = time.perf_counter()
+        came_from, cost_so_far = dijkstra_search(grid, bench_start, bench_end, bucket_queue=bucket_queue)
+        print(grid_name, queue_name, "cost", cost_so_far.get(bench_end), "took", round(time.perf_counter() - began, 3), "s")
+
+# One flow field toward bench_end instead of a search per agent (Every agent just follows the arrows)
+began = time.perf_counter()
+flow_field = Flow_field(bench_grid, bench_end)
+print("Flow field took", round(time.perf_counter() - began, 3), "s")
+agents = [(x, y) for x, y in ((0, 0), (150, 20), (299, 0), (10, 250)) if (x, y) in flow_field]
+for agent in agents:
+    steps, pos = 0, agent
+    while pos != bench_end:
+        pos = flow_field.next_step(pos)
+        steps += 1
+    print("Agent at", agent, "cost", flow_field.distance[flow_field.grid.index(agent)], "steps", steps)
+
+small_flow_field = Flow_field(weighted_grid, end)
+weighted_grid.draw(small_flow_field, None, end)
+print(small_flow_field.distance[small_flow_field.grid.index(start)] == dijkstra_search(weighted_grid, start, end)[1][end])
+
+# Component labels turn down queries with no path straight away (The whole reachable region is searched otherwise)
+bench_grid.components = Components(bench_grid)
+labels = bench_grid.components.labels
+pocket = next((x, y) for x in range(size) for y in range(size) if bench_grid.passable((x, y))
+              and labels[bench_grid.components.cell((x, y))] != labels[bench_grid.components.cell(bench_start)])
+for components in (None, bench_grid.components):
+    bench_grid.components = components
+    began = time.perf_counter()
+    dijkstra_search(bench_grid, bench_start, pocket)
+    print("Unreachable query", "with" if components else "without", "components took", round(time.perf_counter() - began, 5), "s")
+
+# Short queries on a big map, reusing one Search_workspace vs fresh arrays per query (Allocating them costs more than the search)
+big_grid = Compact_grid(1000, 1000, [])
+workspace = Search_workspace(big_grid)
+short_queries = [((x, 500), (x + 5, 503)) for x in range(0, 990, 10)]
+for name, query_workspace in (("Fresh arrays", None), ("Reused workspace", workspace)):
+    began = time.perf_counter()
+    for query_start, query_end in short_queries:
+        compact_dijkstra_search(big_grid, query_start, query_end, workspace=query_workspace)
+    print(name, round((time.perf_counter() - began) / len(short_queries) * 10 ** 6), "us per query")
+print("Path", [big_grid.position(cell) for cell in workspace.path_to(big_grid.index(query_end))])
@@ -1,40 +1,557 @@
-import heapq
+import math
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import tempfile
+import time
+from array import array
 from sys import stdin
 
-class Priority_Queue:
+class Indexed_Priority_Queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_Queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
     def __init__(self):
         self.items = []
+        self.position = {}  # item -> index of its pair in items
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
 
-    def push(self, name, weight):
-        heapq.heappush(self.items, [weight, name])
+    def __len__(self):
+        return len(self.items)
 
     def get(self):
-        return heapq.heappop(self.items)[1]
+        item = self.items[0][1]
+        del self.position[item]
+        last = self.items.pop()
+        if self.items:
+            self.items[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
 
-def dijkstras(weighted_adj_list, start, end):
-    priority_queue = Priority_Queue()
+    def push(self, item, weight):
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.items[i][0]:  # Only ever lower an item's weight
+                return
+            self.items[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.items)
+            self.items.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def sift_up(self, i):
+        entry = self.items[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.items[parent]:
+                break
+            self.items[i] = self.items[parent]
+            self.position[self.items[i][1]] = i
+            i = parent
+        self.items[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.items[i]
+        size = len(self.items)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.items[child + 1] < self.items[child]:
+                child += 1
+            if not self.items[child] < entry:
+                break
+            self.items[i] = self.items[child]
+            self.position[self.items[i][1]] = i
+            i = child
+        self.items[i] = entry
+        self.position[entry[1]] = i
+
+
+class Csr_graph:
+    # Compressed sparse row version of weighted_adj_list for graphs too big for dicts of lists
+    # Nodes are ints 0 .. node_count - 1. The edges leaving node n are targets[offsets[n]:offsets[n + 1]]
+    # with matching costs in weights. All three live in typed arrays (or memoryviews over an mmapped file)
+    # graph[n] gives (neighbor, travel_cost) pairs, so dijkstras can walk it exactly like weighted_adj_list
+    header = struct.Struct('=4sc3xqq')  # Magic, weight typecode, node count, edge count (24 bytes keeps the arrays 8 byte aligned)
+    magic = b'CSR1'
+
+    def __init__(self, offsets, targets, weights):
+        self.offsets = offsets  # 'q', node_count + 1 entries
+        self.targets = targets  # 'i', edge_count entries
+        self.weights = weights  # 'q' or 'd', edge_count entries
+        self.file = None  # Set when the arrays are views over an mmapped file
+
+    def __getitem__(self, node):
+        a, b = self.offsets[node], self.offsets[node + 1]
+        return zip(self.targets[a:b], self.weights[a:b])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_edges(cls, sources, targets, weights, node_count=None):
+        # Bulk build from three parallel edge arrays with a counting sort on the source node
+        if node_count is None:
+            node_count = max(max(sources, default=-1), max(targets, default=-1)) + 1
+        offsets = array('q', [0]) * (node_count + 1)
+        for source in sources:
+            offsets[source + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+
+        typecode = 'q' if all(float(weight).is_integer() for weight in weights) else 'd'
+        sorted_targets = array('i', [0]) * len(sources)
+        sorted_weights = array(typecode, [0]) * len(sources)
+        convert = int if typecode == 'q' else float  # Whole weights can come as floats (5.0), which a 'q' array won't take
+        next_slot = offsets[:-1]  # Where the next edge of each source goes
+        for source, target, weight in zip(sources, targets, weights):
+            slot = next_slot[source]
+            sorted_targets[slot] = target
+            sorted_weights[slot] = convert(weight)
+            next_slot[source] = slot + 1
+        return cls(offsets, sorted_targets, sorted_weights)
+
+    @classmethod
+    def from_adj_list(cls, weighted_adj_list):  # From the {node: [[neighbor, cost], ...]} format
+        sources, targets, weights = array('i'), array('i'), []
+        for node, edges in weighted_adj_list.items():
+            for neighbor, travel_cost in edges:
+                sources.append(node)
+                targets.append(neighbor)
+                weights.append(travel_cost)
+        return cls.from_edges(sources, targets, weights, max(weighted_adj_list, default=-1) + 1)
+
+    @classmethod
+    def from_grid(cls, grid):
+        # From a Grid/Weighted_grid of the grid scripts: cell (x, y) is node x * h + y, with an edge to each passable neighbor
+        # costing that neighbor's weight (What cur_to_next charges for moving into it, 1 if it has none)
+        weights = getattr(grid, 'weights', {})
+        sources, targets, costs = array('i'), array('i'), []
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if (x, y) in grid.walls:
+                    continue
+                for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                    if 0 <= nx < grid.w and 0 <= ny < grid.h and (nx, ny) not in grid.walls:
+                        sources.append(x * grid.h + y)
+                        targets.append(nx * grid.h + ny)
+                        costs.append(weights.get((nx, ny), 1))
+        return cls.from_edges(sources, targets, costs, grid.w * grid.h)
+
+    @classmethod
+    def from_edge_file(cls, path, node_count=None):
+        # Text edge list, one "source target cost" per line (Blank lines and lines starting with # are skipped)
+        sources, targets, weights = array('i'), array('i'), []
+        with open(path) as file:
+            for line in file:
+                parts = line.split()
+                if not parts or parts[0].startswith('#'):
+                    continue
+                sources.append(int(parts[0]))
+                targets.append(int(parts[1]))
+                cost = float(parts[2])
+                weights.append(int(cost) if cost.is_integer() else cost)
+        return cls.from_edges(sources, targets, weights, node_count)
+
+    def save(self, path):
+        # Binary file in native byte order: header, then offsets, weights and targets back to back
+        with open(path, 'wb') as file:
+            typecode = memoryview(self.weights).format
+            file.write(self.header.pack(self.magic, typecode.encode(), len(self), len(self.targets)))
+            for values in (self.offsets, self.weights, self.targets):
+                file.write(memoryview(values).cast('B'))
+
+    @classmethod
+    def load(cls, path):
+        # Memory maps a file written by save. Nothing is parsed or copied, the OS pages edges in as dijkstras touches them
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, typecode, node_count, edge_count = cls.header.unpack_from(mapped)
+        if magic != cls.magic:
+            raise ValueError("{} is not a CSR graph file".format(path))
+        view = memoryview(mapped)
+        start = cls.header.size
+        offsets = view[start:start + 8 * (node_count + 1)].cast('q')
+        start += 8 * (node_count + 1)
+        weights = view[start:start + 8 * edge_count].cast(typecode.decode())
+        start += 8 * edge_count
+        targets = view[start:start + 4 * edge_count].cast('i')
+        graph = cls(offsets, targets, weights)
+        graph.file = mapped
+        return graph
+
+
+class Search_observer:
+    # Watches a search from the outside: counters, and optionally callbacks and sampled timing
+    # Searches take observer=None. Without one, all a search pays is an 'is not None' check per event
+    #   expansions: nodes taken off the queue and expanded
+    #   pushes: pushes onto the queue (Including ones that only lowered the priority of a queued node)
+    #   max_frontier: most nodes queued at once
+    # on_expand(node) and on_push(node, priority), when given, are called for every event as it happens
+    # sample_every=n appends (expansions, seconds since the search started) to samples every n expansions
+    # Counters keep adding up over several searches until reset is called. seconds is the time spent in them
+    def __init__(self, on_expand=None, on_push=None, sample_every=0):
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.expansions = 0
+        self.pushes = 0
+        self.max_frontier = 0
+        self.samples = []
+        self.seconds = 0
+        self.began = time.perf_counter()
+
+    def started(self):
+        self.began = time.perf_counter()
+
+    def expanded(self, node):
+        self.expansions += 1
+        if self.on_expand is not None:
+            self.on_expand(node)
+        if self.sample_every and self.expansions % self.sample_every == 0:
+            self.samples.append((self.expansions, time.perf_counter() - self.began))
+
+    def pushed(self, node, priority, frontier):  # frontier is how many nodes are queued after the push
+        self.pushes += 1
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.on_push is not None:
+            self.on_push(node, priority)
+
+    def finished(self):
+        self.seconds += time.perf_counter() - self.began
+
+
+class Components:
+    # Weakly connected component of every node (Edges taken as going both ways), so dijkstras can turn down
+    # a query between two components straight away instead of expanding everything reachable from start first
+    # (Edges are one way, so the same component doesn't promise a path, but different components rule one out)
+    # labels is a flat 'i' array over the same node numbering as Landmarks. Joining is union-find,
+    # so edges added to the graph later are taken in one at a time with add_edge
+    def __init__(self, weighted_adj_list):
+        if isinstance(weighted_adj_list, Csr_graph):
+            nodes = range(len(weighted_adj_list))
+            self.number = None
+        else:
+            nodes = list(weighted_adj_list)
+            self.number = {node: i for i, node in enumerate(nodes)}
+        self.labels = array('i', range(len(nodes)))  # Union-find parents, every root labels its component
+        for node in nodes:
+            for neighbor, travel_cost in weighted_adj_list[node]:
+                self.add_edge(node, neighbor)
+
+    def index(self, node):
+        return node if self.number is None else self.number[node]
+
+    def find(self, i):
+        root = i
+        while self.labels[root] != root:
+            root = self.labels[root]
+        while self.labels[i] != root:  # Point the whole chain straight at the root
+            self.labels[i], i = root, self.labels[i]
+        return root
+
+    def add_edge(self, node, neighbor):
+        a, b = self.find(self.index(node)), self.find(self.index(neighbor))
+        if a != b:
+            self.labels[max(a, b)] = min(a, b)
+
+    def connected(self, start, end):
+        return start == end or self.find(self.index(start)) == self.find(self.index(end))
+
+
+def dijkstras(weighted_adj_list, start, end, stats=None, heuristic=None, components=None, observer=None):
+    # heuristic(end, node), if given, is added to each node's priority, which turns this into A* (Landmarks.heuristic)
+    # It must never overestimate the cost left, or the min costs found are no longer the min
+    # components (Components of this graph), if given, is asked first whether end can be reached at all
+    # An observer (Search_observer) is told about every push and expansion as they happen
+    # If a stats dict is passed in, it is filled with how much work the indexed queue and the closed set saved:
+    #   duplicate_pushes_avoided: improved costs that lowered a queued entry instead of pushing a second copy
+    #   re_expansions_avoided: cheaper costs found for already expanded nodes, which would have been queued and expanded again
+    #   expanded: nodes taken off the queue and expanded
+    if components is not None and not components.connected(start, end):
+        if stats is not None:
+            stats.update(duplicate_pushes_avoided=0, re_expansions_avoided=0, expanded=0)
+        return {start: None}, {start: 0}
+
+    priority_queue = Indexed_Priority_Queue()
     min_cost_at = {}
     came_from = {}
+    closed = set()  # Nodes that have already been expanded (Their cost can't get any lower)
+    re_expansions_avoided = 0
 
     priority_queue.push(start, 0)
     came_from[start] = None
     min_cost_at[start] = 0
+    if observer is not None:
+        observer.started()
+        observer.pushed(start, 0, 1)
 
     while priority_queue.items:
         cur = priority_queue.get()
+        closed.add(cur)
+        if observer is not None:
+            observer.expanded(cur)
         if cur == end:
             break
         else:
             for neighbor, travel_cost in weighted_adj_list[cur]:
                 new_cost = travel_cost + min_cost_at[cur]
+                if neighbor in closed:  # Expanded nodes are final, they are never queued again
+                    if new_cost < min_cost_at[neighbor]:
+                        re_expansions_avoided += 1
+                    continue
                 if new_cost < min_cost_at.get(neighbor, 10 ** 12):
                     min_cost_at[neighbor] = new_cost
                     came_from[neighbor] = cur
-                    priority_queue.push(neighbor, new_cost)
+                    priority = new_cost if heuristic is None else new_cost + heuristic(end, neighbor)
+                    priority_queue.push(neighbor, priority)
+                    if observer is not None:
+                        observer.pushed(neighbor, priority, len(priority_queue))
 
+    if observer is not None:
+        observer.finished()
+    if stats is not None:
+        stats['duplicate_pushes_avoided'] = priority_queue.decreased
+        stats['re_expansions_avoided'] = re_expansions_avoided
+        stats['expanded'] = len(closed)
     return came_from, min_cost_at
 
 
+class Landmarks:
+    # ALT heuristic (A*, Landmarks, Triangle inequality) for dijkstras
+    # A few landmark nodes are picked far apart, and the exact min cost from and to every node is stored for each of them
+    # For any landmark L the triangle inequality gives two lower bounds on the cost from node to end:
+    #   cost(L, end) - cost(L, node) and cost(node, L) - cost(end, L)
+    # heuristic takes the largest one over all landmarks. Both directions are kept since edges are one way
+    # Tables are flat 'd' arrays, one cost per node (inf = unreachable). Csr_graph nodes are already 0 .. n - 1,
+    # other nodes are numbered in the order weighted_adj_list lists them (Like dijkstras, every node needs an entry)
+    def __init__(self, weighted_adj_list, count=8, first=None):
+        self.graph = weighted_adj_list
+        if isinstance(weighted_adj_list, Csr_graph):
+            self.nodes = range(len(weighted_adj_list))
+            self.number = None
+        else:
+            self.nodes = list(weighted_adj_list)
+            self.number = {node: i for i, node in enumerate(self.nodes)}
+
+        # Edges flipped around (node index -> [[neighbor, cost], ...]), for the cost from every node to a landmark
+        self.reverse = [[] for _ in self.nodes]
+        for node in self.nodes:
+            for neighbor, travel_cost in weighted_adj_list[node]:
+                self.reverse[self.index(neighbor)].append([node, travel_cost])
+
+        if first is None:
+            first = self.nodes[0]
+        self.landmarks = []
+        self.tables = []  # (cost from landmark, cost to landmark) per landmark
+
+        # Farthest point selection: the first landmark is the node farthest from the seed,
+        # every next one the node whose nearest landmark so far is the farthest away
+        nearest = self.costs(first, backward=False)
+        for _ in range(count):
+            farthest = max((i for i in range(len(self.nodes)) if nearest[i] != math.inf), key=nearest.__getitem__, default=None)
+            if farthest is None or (self.landmarks and nearest[farthest] == 0):  # Every reachable node is already a landmark
+                break
+            if not self.landmarks:
+                nearest = array('d', [math.inf]) * len(self.nodes)
+            landmark = self.nodes[farthest]
+            from_landmark, to_landmark = self.costs(landmark, backward=False), self.costs(landmark, backward=True)
+            self.landmarks.append(landmark)
+            self.tables.append((from_landmark, to_landmark))
+            for i in range(len(self.nodes)):
+                if from_landmark[i] < nearest[i]:
+                    nearest[i] = from_landmark[i]
+
+    def index(self, node):
+        return node if self.number is None else self.number[node]
+
+    def costs(self, source, backward):
+        # dijkstras from source to every node (Over the flipped edges when backward)
+        costs = array('d', [math.inf]) * len(self.nodes)
+        costs[self.index(source)] = 0
+        priority_queue = Indexed_Priority_Queue()
+        priority_queue.push(source, 0)
+        while priority_queue.items:
+            cost = priority_queue.items[0][0]
+            cur = priority_queue.get()
+            for neighbor, travel_cost in (self.reverse[self.index(cur)] if backward else self.graph[cur]):
+                new_cost = cost + travel_cost
+                i = self.index(neighbor)
+                if new_cost < costs[i]:
+                    costs[i] = new_cost
+                    priority_queue.push(neighbor, new_cost)
+        return costs
+
+    def heuristic(self, end, node):  # Called as heuristic(end, neighbor) by dijkstras
+        end, node = self.index(end), self.index(node)
+        best = 0
+        for from_landmark, to_landmark in self.tables:
+            bound = from_landmark[end] - from_landmark[node]
+            if best < bound < math.inf:  # Bounds involving an unreachable node are inf or nan and are skipped
+                best = bound
+            bound = to_landmark[node] - to_landmark[end]
+            if best < bound < math.inf:
+                best = bound
+        return best
+
+    def report(self, queries):
+        # Runs every (start, end) query without and with the landmarks, and totals up the nodes each one expanded
+        plain_expanded = landmark_expanded = 0
+        for start, end in queries:
+            stats = {}
+            dijkstras(self.graph, start, end, stats)
+            plain_expanded += stats['expanded']
+            dijkstras(self.graph, start, end, stats, self.heuristic)
+            landmark_expanded += stats['expanded']
+        return {'plain_expanded': plain_expanded, 'landmark_expanded': landmark_expanded,
+                'fewer_expanded': plain_expanded - landmark_expanded,
+                'fewer_fraction': (plain_expanded - landmark_expanded) / plain_expanded if plain_expanded else 0.0}
+
+
+def edge_arrays(weighted_adj_list, number):  # (sources, targets, weights) of a {node: [[neighbor, cost], ...]} graph, by node number
+    sources, targets, weights = array('i'), array('i'), []
+    for node, edges in weighted_adj_list.items():
+        for neighbor, travel_cost in edges:
+            sources.append(number[node])
+            targets.append(number[neighbor])
+            weights.append(travel_cost)
+    return sources, targets, weights
+
+
+PARALLEL_MIN_FRONTIER = 2048  # Smaller bucket phases are relaxed by delta_stepping itself, a round trip to the workers costs more
+
+
+delta_graph = None  # What delta_stepping's request generation reads: (offsets, light_end, targets, weights, distance)
+
+
+def delta_requests(task):
+    # Relaxation requests from a batch of nodes: the best new cost offered to each neighbor, over the light edges
+    # (Weight <= delta) or the heavy ones. Runs in a worker process, or in delta_stepping itself for small phases
+    # Only offers that beat the neighbor's current cost are kept, and they come back as two packed arrays
+    nodes, light = task
+    offsets, light_end, targets, weights, distance = delta_graph
+    best = {}
+    for node in array('i', nodes):
+        cost = distance[node]
+        first, last = (offsets[node], light_end[node]) if light else (light_end[node], offsets[node + 1])
+        for edge in range(first, last):
+            neighbor = targets[edge]
+            new_cost = cost + weights[edge]
+            if new_cost < distance[neighbor] and new_cost < best.get(neighbor, new_cost + 1):
+                best[neighbor] = new_cost
+    return array('i', best.keys()).tobytes(), array(distance.format, best.values()).tobytes()
+
+
+def delta_stepping(weighted_adj_list, start, delta=None, processes=None):
+    # Single source min costs to every node (Meyer and Sanders' delta-stepping). Nodes wait in buckets delta wide by cost,
+    # and the lowest bucket is emptied in phases: all its nodes relax their light edges (Weight <= delta) together, which can
+    # only refill this bucket or later ones, until it stays empty. Then the heavy edges of everything it held are relaxed once
+    # Within a phase the nodes are independent, so their relaxation requests are worked out by a pool of worker processes
+    # (One batch each), reading the graph and the costs from arrays they share with this process. The requests are applied here
+    # Returns the same min_cost_at as dijkstras(weighted_adj_list, start, None), with exactly the same costs (Every cost is still
+    # a min over the same sums, only the order they're found in changes)
+    # Takes the {node: [[neighbor, cost], ...]} format, a Csr_graph, or a grid from the grid scripts (Keyed by (x, y) then)
+    # delta defaults to the mean edge weight. processes defaults to one per core, 1 runs everything in this process
+    # Workers are forked, like batch_a_star_search's: these scripts have no __main__ guard
+    global delta_graph
+    nodes = None  # Node of each number, when they aren't numbered 0 .. n - 1 already
+    grid = hasattr(weighted_adj_list, 'walls')
+    if isinstance(weighted_adj_list, Csr_graph):
+        graph = weighted_adj_list
+    elif grid:
+        graph = Csr_graph.from_grid(weighted_adj_list)
+        start = start[0] * weighted_adj_list.h + start[1]
+    else:
+        nodes = list(weighted_adj_list)
+        number = {node: i for i, node in enumerate(nodes)}
+        graph = Csr_graph.from_edges(*edge_arrays(weighted_adj_list, number), len(nodes))
+        start = number[start]
+    node_count = len(graph)
+    typecode = memoryview(graph.weights).format
+    if delta is None:
+        delta = (sum(graph.weights) / len(graph.weights) if len(graph.weights) else 0) or 1
+    processes = processes or multiprocessing.cpu_count()
+
+    # Each node's light edges first, so both kinds are a plain range of edges (light_end is where the heavy ones begin)
+    targets = array('i', [0]) * len(graph.targets)
+    weights = array(typecode, [0]) * len(graph.weights)
+    light_end = array('q', [0]) * node_count
+    for node in range(node_count):
+        first, last = graph.offsets[node], graph.offsets[node + 1]
+        edges = sorted(range(first, last), key=lambda edge: graph.weights[edge] > delta)
+        for slot, edge in enumerate(edges, first):
+            targets[slot] = graph.targets[edge]
+            weights[slot] = graph.weights[edge]
+        light_end[node] = first + sum(1 for edge in edges if graph.weights[edge] <= delta)
+
+    unreached = math.inf if typecode == 'd' else 2 ** 62
+    shared_distance = multiprocessing.RawArray(typecode, node_count)
+    distance = memoryview(shared_distance).cast('B').cast(typecode)
+    for node in range(node_count):
+        distance[node] = unreached
+    delta_graph = (graph.offsets, light_end, targets, weights, distance)
+
+    buckets = {}  # Bucket number -> set of nodes in it
+
+    def relax(node, cost):
+        old_cost = distance[node]
+        if cost < old_cost:
+            if old_cost != unreached:  # (Its bucket may be the one being emptied, popped already)
+                buckets.get(int(old_cost // delta), set()).discard(node)
+            distance[node] = cost
+            buckets.setdefault(int(cost // delta), set()).add(node)
+
+    def relax_all(frontier, light):
+        frontier = array('i', frontier)
+        if pool is None or len(frontier) < PARALLEL_MIN_FRONTIER:
+            batches = [delta_requests((frontier.tobytes(), light))]
+        else:
+            size = -(-len(frontier) // processes)
+            batches = pool.map(delta_requests, [(frontier[i:i + size].tobytes(), light) for i in range(0, len(frontier), size)])
+        for neighbors, costs in batches:
+            for neighbor, cost in zip(array('i', neighbors), array(typecode, costs)):
+                relax(neighbor, cost)
+
+    pool = multiprocessing.get_context('fork').Pool(processes) if processes > 1 else None
+    try:
+        relax(start, 0)
+        while buckets:
+            current = min(buckets)
+            settled = set()
+            while buckets.get(current):
+                frontier = buckets.pop(current)
+                settled |= frontier
+                relax_all(frontier, light=True)
+            buckets.pop(current, None)
+            relax_all(settled, light=False)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        delta_graph = None
+
+    min_cost_at = {}
+    for node in range(node_count):
+        cost = distance[node]
+        if cost != unreached:
+            if nodes is not None:
+                node = nodes[node]
+            elif grid:
+                node = divmod(node, weighted_adj_list.h)
+            min_cost_at[node] = cost
+    return min_cost_at
+
+
 weighted_adj_list = {0:[[1,4],
                         [2,3]],
                      1:[[2,1],
@@ -46,3 +563,43 @@ weighted_adj_list = {0:[[1,4],
 
 came_from, min_cost_at = dijkstras(weighted_adj_list, 1, 5)
 print(came_from, min_cost_at, sep = '\n')
+
+# Same query on the compressed graph, after a round trip through a memory mapped file
+with tempfile.TemporaryDirectory() as directory:  # The file is removed once the query is done with it
+    path = os.path.join(directory, "graph.csr")
+    Csr_graph.from_adj_list(weighted_adj_list).save(path)
+    csr_graph = Csr_graph.load(path)
+    came_from, min_cost_at = dijkstras(csr_graph, 1, 5)
+    print(came_from, min_cost_at, sep = '\n')
+
+# Landmarks (ALT) on a one way grid shaped graph with random costs, compared with plain dijkstras
+random.seed(0)
+side = 30
+lattice = {}
+for node in range(side * side):
+    x, y = divmod(node, side)
+    lattice[node] = [[(x + dx) * side + y + dy, random.randint(1, 9)] for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                     if 0 <= x + dx < side and 0 <= y + dy < side]
+landmarks = Landmarks(lattice, 8)
+report = landmarks.report([(random.randrange(side * side), random.randrange(side * side)) for _ in range(20)])
+print("Expanded without landmarks", report['plain_expanded'], "with landmarks", report['landmark_expanded'],
+      "({}% fewer)".format(round(100 * report['fewer_fraction'])))
+
+# Components: node 6 has no edges to or from the rest, so the query is turned down without expanding anything
+weighted_adj_list[6] = []
+stats = {}
+print(dijkstras(weighted_adj_list, 0, 6, stats, components=Components(weighted_adj_list)), stats['expanded'])
+
+# Delta-stepping from one node to every node of a random one way graph, on 1, 2 and every core, against plain dijkstras
+random.seed(3)
+node_count = 50000
+big_graph = {node: [[random.randrange(node_count), random.randint(1, 9)] for _ in range(random.randint(2, 6))]
+             for node in range(node_count)}
+began = time.perf_counter()
+sequential_min_cost_at = dijkstras(big_graph, 0, None)[1]
+print("dijkstras to every node took", round(time.perf_counter() - began, 3), "s")
+for processes in sorted({1, 2, multiprocessing.cpu_count()}):
+    began = time.perf_counter()
+    parallel_min_cost_at = delta_stepping(big_graph, 0, processes=processes)
+    print("delta_stepping on", processes, "processes took", round(time.perf_counter() - began, 3), "s, same costs:",
+          parallel_min_cost_at == sequential_min_cost_at)
@@ -0,0 +1,601 @@
+import math
+import random
+import time
+from array import array
+
+MAX_EDITS = 4096  # Most edits a grid keeps in its log (Past that the older half is dropped, see Grid.record_edit)
+
+
+class Grid:
+    def __init__(self, w, h, walls):
+        self.w = w
+        self.h = h
+        self.walls = {}  # Hash table
+        for x, y in walls:
+            self.walls[(x, y)] = True
+        self.edits = []  # (pos, old cost, new cost) of every edit made through set_wall/set_weight, oldest first
+        self.version = 0  # Number of edits so far (Anything computed at an older version may be out of date)
+        self.edits_start = 0  # Version the grid was at before edits[0] (The edits before that were dropped)
+        self.components = None  # Components kept for this grid, if any (Searches ask it first whether end can be reached at all)
+
+    def step_cost(self, pos):  # Cost of moving into pos (Infinite for walls)
+        return math.inf if pos in self.walls else 1
+
+    def set_wall(self, pos, wall=True):  # Adds or removes a wall, and records the edit so Components can tell what changed
+        old_cost = self.step_cost(pos)
+        if wall:
+            self.walls[pos] = True
+        else:
+            self.walls.pop(pos, None)
+        self.record_edit(pos, old_cost)
+
+    def record_edit(self, pos, old_cost):
+        self.edits.append((pos, old_cost, self.step_cost(pos)))
+        self.version += 1
+        if len(self.edits) > MAX_EDITS:  # Keeps the log bounded. A cache further behind than what is left starts over
+            dropped = len(self.edits) // 2
+            del self.edits[:dropped]
+            self.edits_start += dropped
+
+    def in_bounds(self, pos):  # Check to see if the position is within the outer-most boundaries of the Grid
+        x, y = pos
+        return 0 <= x <= self.w - 1 and 0 <= y <= self.h - 1
+
+    def passable(self, pos):  # Check to see if there is a wall at the given location
+        return pos not in self.walls
+
+    def return_neighbors(self, pos):  # Return the unfiltered neighbors
+        x, y = pos
+        neighbors = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+        neighbors = filter(self.passable, neighbors)
+        neighbors = filter(self.in_bounds, neighbors)
+        return neighbors
+
+    def draw(self, came_from, start, end):
+        for y in range(self.h):
+            for x in range(self.w):
+                if (x, y) == end:
+                    print("E", end = ' ')
+                elif (x, y) == start:
+                    print("S", end=' ')
+                elif (x, y) in came_from:
+                    new_x, new_y = came_from[(x, y)]
+                    dx, dy = new_x - x, new_y - y
+                    if [dx, dy] == [1,0]:
+                        print(">", end = ' ')
+                    elif [dx, dy] == [-1, 0]:
+                        print("<", end = ' ')
+                    elif [dx, dy] == [0, 1]:
+                        print("v", end = ' ')
+                    elif [dx, dy] == [0, -1]:
+                        print("^", end = ' ')
+                elif (x, y) in self.walls:
+                    print("#", end = ' ')
+                else:
+                    print(".", end = ' ')
+            print()
+
+
+class Weighted_grid(Grid):
+    def __init__(self, w, h, walls):
+        super().__init__(w, h, walls)
+        self.weights = {}
+
+    def cur_to_next(self, to_node):
+        # Finds the cost to move into a given node (If there is no specified weight, we default to 1)
+        # The default to 1 is very useful when
+        return self.weights.get(to_node, 1)
+
+    def step_cost(self, pos):
+        return math.inf if pos in self.walls else self.cur_to_next(pos)
+
+    def set_weight(self, pos, weight):
+        old_cost = self.step_cost(pos)
+        self.weights[pos] = weight
+        self.record_edit(pos, old_cost)
+
+
+class Indexed_priority_queue:
+    # Min heap of [weight, item] pairs (like the old heapq based Priority_queue) that also tracks where each item sits in it
+    # Pushing an item that is already queued lowers its weight in place (decrease-key) instead of adding a second copy,
+    # so an item is never in the heap twice and nothing stale ever gets popped
+    def __init__(self):
+        self.elements = []
+        self.position = {}  # item -> index of its pair in elements
+        self.decreased = 0  # Pushes turned into decrease-keys (Duplicate entries the old queue would have added)
+
+    def empty(self):
+        return len(self.elements) == 0
+
+    def min_weight(self):  # Weight of the item get_min would return, without removing it
+        return self.elements[0][0]
+
+    def get_min(self):
+        item = self.elements[0][1]
+        del self.position[item]
+        last = self.elements.pop()
+        if self.elements:
+            self.elements[0] = last
+            self.position[last[1]] = 0
+            self.sift_down(0)
+        return item
+
+    def push(self, item, weight):
+        if item in self.position:
+            i = self.position[item]
+            if weight >= self.elements[i][0]:  # Only ever lower an item's weight
+                return
+            self.elements[i][0] = weight
+            self.decreased += 1
+        else:
+            i = len(self.elements)
+            self.elements.append([weight, item])
+            self.position[item] = i
+        self.sift_up(i)
+
+    def sift_up(self, i):
+        entry = self.elements[i]
+        while i > 0:
+            parent = (i - 1) // 2
+            if not entry < self.elements[parent]:
+                break
+            self.elements[i] = self.elements[parent]
+            self.position[self.elements[i][1]] = i
+            i = parent
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+    def sift_down(self, i):
+        entry = self.elements[i]
+        size = len(self.elements)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.elements[child + 1] < self.elements[child]:
+                child += 1
+            if not self.elements[child] < entry:
+                break
+            self.elements[i] = self.elements[child]
+            self.position[self.elements[i][1]] = i
+            i = child
+        self.elements[i] = entry
+        self.position[entry[1]] = i
+
+
+def greedy_dist(a, b):  # Returns the manhattan distance from point a to b or b to a
+    x1, y1 = a
+    x2, y2 = b
+    return abs(x1 - x2) + abs(y1 - y2)
+
+
+class Components:
+    # Connected component label of every cell, so a query between two components is turned down straight away
+    # instead of the search flooding everything reachable from start before giving up
+    # labels is a flat 'i' array with (x, y) at x * h + y, and -1 for walls. Set grid.components to one to have the searches use it
+    # It catches up on grid.edits (set_wall) before answering, and only walks the regions an edit touched:
+    #   a wall removed: the components around the cell are joined, relabelling all but the biggest one
+    #   a wall added: floods from the cell's open neighbors one step each in turn. Floods that run into each other are the same piece,
+    #   and a flood that runs out without meeting another one was cut off and gets a new label (So only the smaller pieces get walked)
+    # The labels are the passability it goes by, so edits are replayed in order even when later ones touched the same cells
+    def __init__(self, grid):
+        self.grid = grid
+        self.label_all()
+
+    def label_all(self):  # Labels the whole grid from scratch
+        grid = self.grid
+        self.labels = array('i', [-1]) * (grid.w * grid.h)
+        self.sizes = {}  # label -> number of cells with it
+        self.next_label = 0
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if grid.passable((x, y)):
+                    self.labels[self.cell((x, y))] = -2  # Open but not labelled yet
+        for x in range(grid.w):
+            for y in range(grid.h):
+                if self.labels[self.cell((x, y))] == -2:
+                    self.fill((x, y), self.new_label())
+        self.version = grid.version
+
+    def cell(self, pos):
+        return pos[0] * self.grid.h + pos[1]
+
+    def new_label(self):
+        self.next_label += 1
+        return self.next_label - 1
+
+    def open_neighbors(self, pos):
+        x, y = pos
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                if self.grid.in_bounds(neighbor) and self.labels[self.cell(neighbor)] != -1]
+
+    def fill(self, pos, label):  # Gives pos and every cell connected to it the label
+        old_label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = label
+        stack = [pos]
+        count = 0
+        while stack:
+            cur = stack.pop()
+            count += 1
+            for neighbor in self.open_neighbors(cur):
+                if self.labels[self.cell(neighbor)] != label:
+                    self.labels[self.cell(neighbor)] = label
+                    stack.append(neighbor)
+        self.move(old_label, label, count)
+
+    def move(self, old_label, label, count):  # Keeps sizes up to date when count cells go from old_label to label
+        if old_label >= 0:
+            self.sizes[old_label] -= count
+            if not self.sizes[old_label]:
+                del self.sizes[old_label]
+        if label >= 0:
+            self.sizes[label] = self.sizes.get(label, 0) + count
+
+    def catch_up(self):
+        if self.version < self.grid.edits_start:  # The edits it missed were dropped from the log, so it starts over
+            self.label_all()
+            return
+        for pos, old_cost, new_cost in self.grid.edits[self.version - self.grid.edits_start:]:
+            if not self.grid.in_bounds(pos):
+                continue
+            is_wall = self.labels[self.cell(pos)] == -1
+            if new_cost == math.inf and not is_wall:
+                self.add_wall(pos)
+            elif new_cost != math.inf and is_wall:
+                self.remove_wall(pos)
+        self.version = self.grid.version
+
+    def remove_wall(self, pos):
+        labels = {self.labels[self.cell(neighbor)]: neighbor for neighbor in self.open_neighbors(pos)}
+        if not labels:
+            label = self.new_label()
+        else:
+            label = max(labels, key=self.sizes.get)
+            for other_label, neighbor in labels.items():
+                if other_label != label:
+                    self.fill(neighbor, label)
+        self.labels[self.cell(pos)] = label
+        self.move(-1, label, 1)
+
+    def add_wall(self, pos):
+        label = self.labels[self.cell(pos)]
+        self.labels[self.cell(pos)] = -1
+        self.move(label, -1, 1)
+        starts = self.open_neighbors(pos)
+        owner = {start: flood for flood, start in enumerate(starts)}  # cell -> the flood that reached it first
+        group = list(range(len(starts)))  # Floods that ran into each other point at the same one
+        frontiers = [[start] for start in starts]
+        reached = [[start] for start in starts]
+        split_off = set()
+
+        def find(flood):
+            while group[flood] != flood:
+                flood = group[flood]
+            return flood
+
+        while True:
+            groups = {}
+            for flood in range(len(starts)):
+                if find(flood) not in split_off:
+                    groups.setdefault(find(flood), []).append(flood)
+            if len(groups) <= 1:
+                break
+            running = [root for root, floods in groups.items() if any(frontiers[flood] for flood in floods)]
+            finished = [root for root in groups if root not in running]
+            if not running:  # Every piece was walked in full, one of them keeps the old label
+                finished = finished[1:]
+            for root in finished:  # Ran out without meeting anyone else, so it is cut off from the rest
+                new_label = self.new_label()
+                for flood in groups[root]:
+                    for cell in reached[flood]:
+                        self.labels[self.cell(cell)] = new_label
+                    self.move(label, new_label, len(reached[flood]))
+                split_off.add(root)
+            if len(running) <= 1:
+                break
+            for root in running:
+                for flood in groups[root]:
+                    if not frontiers[flood]:
+                        continue
+                    cur = frontiers[flood].pop()
+                    for neighbor in self.open_neighbors(cur):
+                        if neighbor not in owner:
+                            owner[neighbor] = flood
+                            frontiers[flood].append(neighbor)
+                            reached[flood].append(neighbor)
+                        elif find(owner[neighbor]) != find(flood):
+                            group[find(owner[neighbor])] = find(flood)
+
+    def connected(self, start, end):
+        self.catch_up()
+        if start == end:
+            return True
+        if not (self.grid.in_bounds(start) and self.grid.in_bounds(end)):
+            return False
+        label = self.labels[self.cell(start)]
+        return label != -1 and label == self.labels[self.cell(end)]
+
+
+def unreachable(grid, start, end):  # True when the grid keeps Components and they show there is no path
+    components = getattr(grid, 'components', None)
+    return components is not None and not components.connected(start, end)
+
+
+def cluster_search(grid, source, bounds, target=None, backward=False):
+    # Search that never leaves the rectangle bounds = (x0, y0, x1, y1) (x1 and y1 themselves are outside)
+    # With a target it is an A* that stops there, without one it is a Dijkstra that costs out the whole rectangle
+    # backward=True gives the cost of getting from every cell to source instead (Moving into a cell costs that cell's weight,
+    # so walking an edge the other way round charges the cell being left)
+    x0, y0, x1, y1 = bounds
+    priority_queue = Indexed_priority_queue()
+    cost_so_far = {source: 0}
+    came_from = {source: None}
+    closed = set()
+    priority_queue.push(source, 0)
+
+    while not priority_queue.empty():
+        cur = priority_queue.get_min()
+        closed.add(cur)
+        if cur == target:
+            break
+
+        for neighbor in grid.return_neighbors(cur):
+            x, y = neighbor
+            if neighbor in closed or not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            new_cost = cost_so_far[cur] + grid.cur_to_next(cur if backward else neighbor)
+            if new_cost < cost_so_far.get(neighbor, 10 ** 10):
+                cost_so_far[neighbor] = new_cost
+                came_from[neighbor] = cur
+                priority_queue.push(neighbor, new_cost + (greedy_dist(target, neighbor) if target else 0))
+
+    return came_from, cost_so_far
+
+
+def walk_tree(came_from, node):  # Follows came_from links from node back to the root of the tree (node first)
+    path = []
+    while node is not None:
+        path.append(node)
+        node = came_from[node]
+    return path
+
+
+class Hierarchical_grid:
+    # HPA*: the map is cut into cluster_size x cluster_size clusters, and the open cells on each side of a cluster border
+    # become entrances. The abstract graph links entrances across borders (one step) and entrances of the same cluster
+    # (the cheapest path inside the cluster), so a query only searches a few entrances per cluster instead of every cell,
+    # then fills in the cells of just the segments on the path it found
+    # The grid has to be edited through set_wall/set_weight so the clusters touching the change get rebuilt
+    def __init__(self, grid, cluster_size=10):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.border_pairs = {}  # (cluster, cluster right of or below it) -> [(cell, cell across the border), ...]
+        self.entrances = {}  # cluster -> set of its entrance cells
+        self.edges = {}  # Abstract graph: entrance -> {entrance: min cost to get there}
+        self.segments = {}  # (entrance, entrance) -> cells between them, refined the first time a query needs them
+        self.rebuilt = 0  # Number of clusters built so far
+
+        clusters_w = -(-grid.w // cluster_size)
+        clusters_h = -(-grid.h // cluster_size)
+        clusters = [(cx, cy) for cx in range(clusters_w) for cy in range(clusters_h)]
+        for cx, cy in clusters:
+            if cx + 1 < clusters_w:
+                self.build_border((cx, cy), (cx + 1, cy))
+            if cy + 1 < clusters_h:
+                self.build_border((cx, cy), (cx, cy + 1))
+        for cluster in clusters:
+            self.build_cluster(cluster)
+
+    def cluster_of(self, pos):
+        return pos[0] // self.cluster_size, pos[1] // self.cluster_size
+
+    def bounds(self, cluster):  # (x0, y0, x1, y1) with x1 and y1 just outside the cluster
+        x0, y0 = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.grid.w), min(y0 + self.cluster_size, self.grid.h)
+
+    def open_cell(self, pos):
+        return self.grid.in_bounds(pos) and self.grid.passable(pos)
+
+    def build_border(self, cluster, other):
+        # Every run of open cell pairs across the border gets an entrance in its middle, or one at each end if the run is long
+        for a, b in self.border_pairs.get((cluster, other), []):
+            del self.edges[a][b]
+            del self.edges[b][a]
+
+        x0, y0, x1, y1 = self.bounds(cluster)
+        if other[0] > cluster[0]:
+            candidates = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+        else:
+            candidates = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+        runs, run = [], []
+        for a, b in candidates:
+            if self.open_cell(a) and self.open_cell(b):
+                run.append((a, b))
+            elif run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+
+        pairs = []
+        for run in runs:
+            pairs += [run[len(run) // 2]] if len(run) < 6 else [run[0], run[-1]]
+        self.border_pairs[(cluster, other)] = pairs
+        for a, b in pairs:
+            self.edges.setdefault(a, {})[b] = self.grid.cur_to_next(b)
+            self.edges.setdefault(b, {})[a] = self.grid.cur_to_next(a)
+
+    def build_cluster(self, cluster):
+        # Entrances are this cluster's side of the pairs on its four borders, linked to each other by their in-cluster costs
+        cx, cy = cluster
+        entrances = set()
+        for key, side in (((cluster, (cx + 1, cy)), 0), ((cluster, (cx, cy + 1)), 0),
+                          (((cx - 1, cy), cluster), 1), (((cx, cy - 1), cluster), 1)):
+            entrances.update(pair[side] for pair in self.border_pairs.get(key, []))
+
+        for node in self.entrances.get(cluster, set()):
+            for neighbor in [neighbor for neighbor in self.edges.get(node, {}) if self.cluster_of(neighbor) == cluster]:
+                del self.edges[node][neighbor]
+            if node not in entrances and not self.edges.get(node):
+                self.edges.pop(node, None)
+
+        bounds = self.bounds(cluster)
+        for node in entrances:
+            costs = cluster_search(self.grid, node, bounds)[1]
+            for other in entrances:
+                if other != node and other in costs:
+                    self.edges.setdefault(node, {})[other] = costs[other]
+        self.entrances[cluster] = entrances
+        self.segments = {key: cells for key, cells in self.segments.items() if self.cluster_of(key[0]) != cluster}
+        self.rebuilt += 1
+
+    def set_wall(self, pos, wall=True):
+        self.grid.set_wall(pos, wall)
+        self.rebuild_around(pos)
+
+    def set_weight(self, pos, weight):
+        self.grid.set_weight(pos, weight)
+        self.rebuild_around(pos)
+
+    def rebuild_around(self, pos):
+        # Only the cell's own cluster, plus the cluster across any border the cell lies on, can see the change
+        x, y = pos
+        cluster = self.cluster_of(pos)
+        cx, cy = cluster
+        x0, y0, x1, y1 = self.bounds(cluster)
+        borders = []
+        if x == x0 and cx > 0:
+            borders.append(((cx - 1, cy), cluster))
+        if x == x1 - 1 and x1 < self.grid.w:
+            borders.append((cluster, (cx + 1, cy)))
+        if y == y0 and cy > 0:
+            borders.append(((cx, cy - 1), cluster))
+        if y == y1 - 1 and y1 < self.grid.h:
+            borders.append((cluster, (cx, cy + 1)))
+
+        clusters = {cluster}
+        for a, b in borders:
+            self.build_border(a, b)
+            clusters.update((a, b))
+        for affected in clusters:
+            self.build_cluster(affected)
+
+    def search(self, start, end):
+        # Returns (came_from, cost_so_far) for just the cells of the path found (Filled in cell by cell, so reconstruct_path works)
+        # Paths are close to, but not always exactly, the cheapest, since clusters are only crossed at their entrances
+        if unreachable(self.grid, start, end):  # Different components, there is nothing to search
+            return {start: None}, {start: 0}
+        start_cluster, end_cluster = self.cluster_of(start), self.cluster_of(end)
+        start_bounds, end_bounds = self.bounds(start_cluster), self.bounds(end_cluster)
+
+        # Hook start and end into the abstract graph for this query only
+        start_tree, start_costs = cluster_search(self.grid, start, start_bounds)
+        end_tree, end_costs = cluster_search(self.grid, end, end_bounds, backward=True)
+        start_edges = {node: start_costs[node] for node in self.entrances[start_cluster] if node in start_costs}
+        if start_cluster == end_cluster and end in start_costs:
+            start_edges[end] = start_costs[end]
+        into_end = {node: end_costs[node] for node in self.entrances[end_cluster] if node in end_costs}
+
+        # A* over the abstract graph
+        priority_queue = Indexed_priority_queue()
+        cost_so_far = {start: 0}
+        came_from = {start: None}
+        closed = set()
+        priority_queue.push(start, greedy_dist(end, start))
+        while not priority_queue.empty():
+            cur = priority_queue.get_min()
+            closed.add(cur)
+            if cur == end:
+                break
+
+            neighbors = list(self.edges.get(cur, {}).items())
+            if cur == start:
+                neighbors += start_edges.items()
+            if cur in into_end:
+                neighbors.append((end, into_end[cur]))
+            for neighbor, cost in neighbors:
+                new_cost = cost_so_far[cur] + cost
+                if neighbor not in closed and new_cost < cost_so_far.get(neighbor, 10 ** 10):
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = cur
+                    priority_queue.push(neighbor, new_cost + greedy_dist(end, neighbor))
+
+        if end not in closed:
+            return {start: None}, {start: 0}
+
+        # Refine each abstract step on the path into cells
+        abstract_path = walk_tree(came_from, end)[::-1]
+        cells = [start]
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            if a == start and b in start_tree and self.cluster_of(b) == start_cluster:
+                segment = walk_tree(start_tree, b)[::-1]
+            elif b == end and a in end_tree and self.cluster_of(a) == end_cluster:
+                segment = walk_tree(end_tree, a)
+            elif self.cluster_of(a) != self.cluster_of(b):  # Step across a border
+                segment = [a, b]
+            else:
+                if (a, b) not in self.segments:
+                    tree = cluster_search(self.grid, a, self.bounds(self.cluster_of(a)), target=b)[0]
+                    self.segments[(a, b)] = walk_tree(tree, b)[::-1]
+                segment = self.segments[(a, b)]
+            cells += segment[1:]
+
+        path_came_from, path_cost_so_far = {start: None}, {start: 0}
+        for parent, cell in zip(cells, cells[1:]):
+            path_came_from[cell] = parent
+            path_cost_so_far[cell] = path_cost_so_far[parent] + self.grid.cur_to_next(cell)
+        return path_came_from, path_cost_so_far
+
+
+def a_star_search(grid, start, end):  # Plain A* over the whole grid, to compare against
+    if unreachable(grid, start, end):  # Different components, there is nothing to search
+        return {start: None}, {start: 0}
+    return cluster_search(grid, start, (0, 0, grid.w, grid.h), target=end)
+
+
+def reconstruct_path(came_from, start, end):
+    current = end
+    path = []
+    while current != start:
+        path.append(current)
+        current = came_from[current]
+
+    path.append(start)
+    return path
+
+
+random.seed(1)
+size = 120
+weighted_grid = Weighted_grid(size, size, [(x, y) for x in range(size) for y in range(size) if random.random() < 0.2])
+weighted_grid.weights = {(x, y): 5 for x in range(size) for y in range(size) if random.random() < 0.2}
+start, end = (0, 0), (size - 1, size - 1)
+weighted_grid.walls.pop(start, None)
+weighted_grid.walls.pop(end, None)
+
+began = time.perf_counter()
+hierarchical_grid = Hierarchical_grid(weighted_grid, 10)
+print("Built", hierarchical_grid.rebuilt, "clusters with", len(hierarchical_grid.edges), "entrances in", round(time.perf_counter() - began, 3), "s")
+
+began = time.perf_counter()
+came_from, cost_so_far = hierarchical_grid.search(start, end)
+print("HPA* cost", cost_so_far.get(end), "took", round(time.perf_counter() - began, 4), "s")
+began = time.perf_counter()
+a_star_came_from, a_star_cost_so_far = a_star_search(weighted_grid, start, end)
+print("A* cost", a_star_cost_so_far.get(end), "took", round(time.perf_counter() - began, 4), "s")
+path = reconstruct_path(came_from, start, end)
+print(all(weighted_grid.passable(cell) for cell in path))
+
+# Editing a wall only rebuilds the clusters that touch it
+rebuilt = hierarchical_grid.rebuilt
+hierarchical_grid.set_wall(path[len(path) // 2])
+print("Rebuilt", hierarchical_grid.rebuilt - rebuilt, "clusters")
+came_from, cost_so_far = hierarchical_grid.search(start, end)
+print("HPA* cost after the edit", cost_so_far.get(end))
+
+# Components: walling the end in turns the query down before any cluster is searched
+weighted_grid.components = Components(weighted_grid)
+hierarchical_grid.set_wall((size - 2, size - 1))
+hierarchical_grid.set_wall((size - 1, size - 2))
+began = time.perf_counter()
+came_from, cost_so_far = hierarchical_grid.search(start, end)
+print("End walled in: cost", cost_so_far.get(end), "took", round(time.perf_counter() - began, 5), "s")
@@ -0,0 +1,335 @@
+import argparse
+import ast
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Serves a_star_search over a local socket, so a game server's event loop never blocks on a search
+# Protocol: one JSON object per line each way. Responses carry the request's id, and can come back out of order
+#   {"id": 1, "start": [x, y], "end": [x, y]}  ->  {"id": 1, "cost": 42, "path": [[x, y], ...]}  (cost and path are null without a path)
+#   {"id": 2, "stats": true}                   ->  {"id": 2, "stats": {...}}  (Queue depth, counters and latency histograms)
+# Searches run in a pool of worker processes, so the event loop only parses, queues and answers
+# Identical queries that arrive while one is already queued or running share its result instead of searching again
+# At most --queue searches wait for a worker. Past that a connection's next request isn't read until there is room,
+# which pushes back on the sender through the socket instead of letting the backlog grow without end
+#
+# Usage: python "Path Query Service.py" --size 512 --port 8765
+#        python "Path Query Service.py" --map arena.map --unix /tmp/paths.sock
+#        python "Path Query Service.py" --map arena.map --tmap arena.tmap  (Keeps the converted map, see Tiled_map in A Star Search)
+#        python "Path Query Service.py" --demo  (Starts the service, sends it a burst of queries as a client would, prints the stats)
+# A --map is converted to a tiled map file first, in a temporary directory removed on exit unless --tmap says where to keep it
+
+parser = argparse.ArgumentParser(description="Serve path queries over a local socket")
+parser.add_argument('--map', help="MovingAI .map file to serve (Otherwise a random map is generated)")
+parser.add_argument('--tmap', help="Where to write the tiled map --map is converted to (Otherwise a temporary file)")
+parser.add_argument('--size', type=int, default=256, help="Side of the generated map")
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--host', default='127.0.0.1')
+parser.add_argument('--port', type=int, default=0, help="0 picks a free port")
+parser.add_argument('--unix', help="Listen on a unix socket at this path instead")
+parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help="Searches running at once")
+parser.add_argument('--queue', type=int, default=64, help="Searches waiting for a worker before requests stop being read")
+parser.add_argument('--demo', action='store_true', help="Run a burst of client queries against the service and exit")
+args = parser.parse_args()
+
+
+def load_definitions(script):
+    # The search scripts run their demos at the top level, so only their imports, classes, functions
+    # and CONSTANTS are run (Same as in Search Benchmarks)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+    with open(path) as file:
+        tree = ast.parse(file.read(), path)
+    tree.body = [node for node in tree.body
+                 if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef))
+                 or isinstance(node, ast.Assign) and all(isinstance(target, ast.Name) and target.id.isupper() for target in node.targets)]
+    namespace = {'__name__': os.path.splitext(script)[0], '__file__': path}
+    exec(compile(tree, path, 'exec'), namespace)
+    return namespace
+
+
+search = load_definitions("A Star Search.py")
+
+
+class Latency_histogram:
+    # Counts of latencies in power of 2 millisecond buckets (Up to 1 ms, 2 ms, 4 ms, ... and one for anything slower)
+    bounds = [2 ** k for k in range(14)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        i = 0
+        while i < len(self.bounds) and ms > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, fraction):  # Upper bound of the bucket the given fraction of latencies falls in
+        seen = 0
+        for bound, count in zip(self.bounds + [self.max], self.counts):
+            seen += count
+            if seen >= fraction * self.count:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {'count': self.count, 'mean_ms': self.total / self.count if self.count else 0, 'max_ms': self.max,
+                'p50_ms': self.percentile(0.5), 'p99_ms': self.percentile(0.99),
+                'buckets': [["<={}".format(bound), count] for bound, count in zip(self.bounds, self.counts)] + [[">{}".format(self.bounds[-1]), self.counts[-1]]]}
+
+
+worker_grid = None  # The grid and Search_workspace of a worker process (Set by attach_worker)
+worker_workspace = None
+
+
+def attach_worker(grid):
+    # Workers are forked, so the grid is already in their memory (Nothing is pickled)
+    global worker_grid, worker_workspace
+    worker_grid = grid
+    worker_workspace = search['Search_workspace'](grid) if isinstance(grid, search['Compact_grid']) else None
+
+
+def run_query(start, end):  # Runs in a worker. Returns (cost, path), (None, None) when there is no path
+    if worker_workspace is not None:
+        came_from, cost_so_far = search['a_star_search'](worker_grid, start, end, workspace=worker_workspace)
+        if end not in cost_so_far:
+            return None, None
+        return cost_so_far[end], [worker_grid.position(cell) for cell in worker_workspace.path_to(worker_grid.index(end))]
+    came_from, cost_so_far = search['a_star_search'](worker_grid, start, end)
+    if end not in cost_so_far:
+        return None, None
+    path = [end]
+    while path[-1] != start:
+        path.append(came_from[path[-1]])
+    path.reverse()
+    return cost_so_far[end], path
+
+
+class Path_service:
+    # Queues queries for a fixed number of dispatchers, each of which hands one at a time to the worker processes
+    # in_flight maps (start, end) to the future of the search already queued or running for it, for coalescing
+    def __init__(self, grid, processes, max_queued):
+        self.grid = grid
+        self.processes = processes
+        self.executor = ProcessPoolExecutor(processes, multiprocessing.get_context('fork'), attach_worker, (grid,))
+        self.queue = asyncio.Queue(max_queued)
+        self.in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.searches = 0
+        self.rejected = 0
+        self.latency = Latency_histogram()  # From a request being read to its answer being ready
+        self.queue_wait = Latency_histogram()  # From a search being queued to a worker taking it
+        self.search_time = Latency_histogram()  # Time in the worker (Plus handing the query and the path over)
+        self.dispatchers = []
+        self.connections = set()  # Tasks of the open connections
+
+    def start(self):
+        # The pool forks all its workers on the first submit. That has to happen before any connection is accepted,
+        # or the workers inherit the sockets and a client closing its end never reaches the server as end of file
+        self.executor.submit(os.getpid).result()
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.processes)]
+
+    async def close(self):
+        # Open connections get a moment to finish what they were sent before being cut off
+        if self.connections:
+            done, pending = await asyncio.wait(self.connections, timeout=1)
+            for connection in pending:
+                connection.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)  # Each one still waits for its pending answers
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.executor.shutdown()
+
+    async def submit(self, start, end):
+        # Returns the future of the search for (start, end), once it's queued (Waits here while the queue is full)
+        # A query already in flight isn't queued again, its future is shared
+        self.requests += 1
+        if not (self.grid.passable(start) and self.grid.passable(end)):
+            self.rejected += 1
+            raise ValueError("start and end have to be open cells on the map")
+        key = (start, end)
+        if key in self.in_flight:
+            self.coalesced += 1
+            return self.in_flight[key]
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        await self.queue.put((key, future, time.perf_counter()))
+        return future
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, future, queued_at = await self.queue.get()
+            began = time.perf_counter()
+            self.queue_wait.record(began - queued_at)
+            try:
+                result = await loop.run_in_executor(self.executor, run_query, *key)
+            except Exception as error:  # Handed to every request waiting on it
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+            self.search_time.record(time.perf_counter() - began)
+            self.searches += 1
+            del self.in_flight[key]
+            self.queue.task_done()
+
+    def stats(self):
+        return {'queue_depth': self.queue.qsize(), 'queue_limit': self.queue.maxsize, 'in_flight': len(self.in_flight),
+                'requests': self.requests, 'coalesced': self.coalesced, 'searches': self.searches, 'rejected': self.rejected,
+                'latency': self.latency.as_dict(), 'queue_wait': self.queue_wait.as_dict(), 'search': self.search_time.as_dict()}
+
+    async def answer(self, writer, request_id, future, read_at):
+        try:
+            cost, path = await asyncio.shield(future)  # Shielded: one caller going away mustn't cancel the others' search
+            response = {'id': request_id, 'cost': cost, 'path': path}
+        except Exception as error:
+            response = {'id': request_id, 'error': str(error)}
+        self.latency.record(time.perf_counter() - read_at)
+        if writer.is_closing():  # The connection is already lost, asyncio would only log a warning per write
+            return
+        try:
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:  # The client went away before its answer was ready
+            pass
+
+    async def handle(self, reader, writer):  # One connection: requests are read one by one, answered as their searches finish
+        self.connections.add(asyncio.current_task())
+        answers = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ConnectionError:  # Reset by the client, same as it closing its end
+                    break
+                if not line:
+                    break
+                read_at = time.perf_counter()
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get('id')
+                    if request.get('stats'):
+                        response = {'id': request_id, 'stats': self.stats()}
+                    else:
+                        future = await self.submit(tuple(request['start']), tuple(request['end']))
+                        answer = asyncio.create_task(self.answer(writer, request_id, future, read_at))
+                        answers.add(answer)
+                        answer.add_done_callback(answers.discard)
+                        continue
+                except (ValueError, KeyError, TypeError, AttributeError) as error:  # Bad JSON, missing fields, walls
+                    response = {'id': request_id, 'error': str(error)}
+                try:
+                    writer.write((json.dumps(response) + "\n").encode())
+                    await writer.drain()
+                except ConnectionError:
+                    break
+        finally:
+            # Answers still pending finish first (Writing nowhere if the client is gone), so none is left orphaned
+            await asyncio.gather(*answers, return_exceptions=True)
+            writer.close()
+            self.connections.discard(asyncio.current_task())
+
+
+def generate_grid(size, seed):  # Random walls and terrain, like the 'weighted' maps of Search Benchmarks
+    rng = random.Random("service {} {}".format(size, seed))
+    walls = {(x, y) for x in range(size) for y in range(size) if rng.random() < 0.1}
+    weights = {(x, y): rng.choice((2, 3, 5, 9)) for x in range(size) for y in range(size)
+               if (x, y) not in walls and rng.random() < 0.5}
+    return search['Compact_grid'](size, size, walls, weights)
+
+
+async def demo_client(service, connect, seed):
+    # A burst of queries over 8 connections: 200 queries with only 40 distinct ones among them, all sent at once
+    rng = random.Random(seed)
+    grid = service.grid
+    open_cells = []
+    while len(open_cells) < 20:
+        pos = (rng.randrange(grid.w), rng.randrange(grid.h))
+        if grid.passable(pos):
+            open_cells.append(pos)
+    distinct = [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(40)]
+    queries = [rng.choice(distinct) for _ in range(200)]
+
+    async def client(number, client_queries):
+        reader, writer = await connect()
+        for i, (start, end) in enumerate(client_queries):
+            writer.write((json.dumps({'id': i, 'start': start, 'end': end}) + "\n").encode())
+        await writer.drain()
+        answers = {}
+        while len(answers) < len(client_queries):
+            response = json.loads(await reader.readline())
+            answers[response['id']] = response
+        writer.write(b'{"id": "stats", "stats": true}\n')
+        stats = json.loads(await reader.readline())['stats']
+        writer.close()
+        await writer.wait_closed()
+        return [answers[i] for i in range(len(client_queries))], stats
+
+    began = time.perf_counter()
+    results = await asyncio.gather(*(client(number, queries[number::8]) for number in range(8)))
+    seconds = time.perf_counter() - began
+    answers = {}
+    for number, (client_answers, stats) in enumerate(results):
+        for query, answer in zip(queries[number::8], client_answers):
+            answers.setdefault(query, set()).add(answer['cost'])
+    print(len(queries), "queries answered in", round(seconds, 3), "s, every copy of a query got the same cost:",
+          all(len(costs) == 1 for costs in answers.values()))
+    stats = service.stats()
+    print("Requests", stats['requests'], "searches", stats['searches'], "coalesced", stats['coalesced'],
+          "queue depth now", stats['queue_depth'])
+    for name in ('latency', 'queue_wait', 'search'):
+        histogram = stats[name]
+        print("{:<10} p50 <= {:.1f} ms, p99 <= {:.1f} ms, max {:.1f} ms".format(name, histogram['p50_ms'], histogram['p99_ms'], histogram['max_ms']))
+
+
+async def main():
+    map_directory = None
+    if args.map:
+        tmap_path = args.tmap
+        if tmap_path is None:
+            map_directory = tempfile.TemporaryDirectory()
+            tmap_path = os.path.join(map_directory.name, "served.tmap")
+        grid = search['Tiled_map'].import_movingai(args.map, tmap_path)
+    else:
+        grid = generate_grid(args.size, args.seed)
+    service = Path_service(grid, args.processes, args.queue)
+    service.start()
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle, args.unix)
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+        print("Serving on", args.unix)
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        host, port = server.sockets[0].getsockname()[:2]
+        connect = lambda: asyncio.open_connection(host, port)
+        print("Serving on", host, port)
+    try:
+        if args.demo:
+            await demo_client(service, connect, args.seed)
+        else:
+            await server.serve_forever()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+        if args.map:
+            grid.close()
+        if map_directory is not None:
+            map_directory.cleanup()
+
+
+asyncio.run(main())
@@ -0,0 +1,192 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Benchmarks every search entry point on generated maps, and writes the results as JSON
+# Every map and query set comes from a fixed seed, so two runs (Two versions of the code) measure exactly the same work
+# Maps: random walls, mazes, open fields and weighted terrain, size x size cells
+# Graphs: random one way graphs with about 4 edges per node for the adjacency list dijkstras
+# For each search and map it records the wall time of the whole query set, the nodes expanded, the peak size of the
+# queue/frontier and the peak memory a query allocates (The last three come from a second pass, watched by each script's
+# Search_observer and tracemalloc)
+# Sizes up to 4096 work, but the dict based grids need a few GB of memory past 1024
+#
+# Usage: python "Search Benchmarks.py" --sizes 64 256 --output before.json
+#        python "Search Benchmarks.py" --sizes 64 256 --output after.json --compare before.json
+
+SCRIPTS = {'bfs': "Breadth First Search #2.py",
+           'dijkstra_search': "Dijkstras (With Weighted Grid).py",
+           'a_star_search': "A Star Search.py",
+           'dijkstras': "Dijkstras (With weighted adjacency list).py"}
+GRID_SEARCHES = ('bfs', 'dijkstra_search', 'a_star_search')
+MAP_KINDS = ('random', 'maze', 'open', 'weighted')
+
+parser = argparse.ArgumentParser(description="Benchmark the search scripts on generated maps and graphs")
+parser.add_argument('--sizes', type=int, nargs='+', default=[64, 256, 1024], help="Map sides (64 up to 4096)")
+parser.add_argument('--maps', nargs='+', default=list(MAP_KINDS), choices=MAP_KINDS)
+parser.add_argument('--searches', nargs='+', default=list(SCRIPTS), choices=list(SCRIPTS))
+parser.add_argument('--graph-sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Node counts of the random graphs")
+parser.add_argument('--queries', type=int, default=5, help="Queries per map")
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--output', default="benchmark_results.json")
+parser.add_argument('--compare', help="Earlier results to print time and expansion ratios against")
+args = parser.parse_args()
+
+
+def load_definitions(script):
+    # The search scripts run their demos at the top level, so only their imports, classes, functions
+    # and CONSTANTS are run (The demos would take longer than a small benchmark)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+    with open(path) as file:
+        tree = ast.parse(file.read(), path)
+    tree.body = [node for node in tree.body
+                 if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef))
+                 or isinstance(node, ast.Assign) and all(isinstance(target, ast.Name) and target.id.isupper() for target in node.targets)]
+    namespace = {'__name__': os.path.splitext(script)[0], '__file__': path}
+    exec(compile(tree, path, 'exec'), namespace)
+    return namespace
+
+
+def generate_map(kind, size, seed):
+    # Returns (walls, weights): a set of wall cells and a dict of the cells that cost more than 1
+    rng = random.Random("{} {} {}".format(kind, size, seed))
+    walls, weights = set(), {}
+    if kind == 'random':
+        walls = {(x, y) for x in range(size) for y in range(size) if rng.random() < 0.25}
+    elif kind == 'maze':
+        # Depth first (Recursive backtracker) maze carved out of solid walls, with passages on the even cells
+        walls = {(x, y) for x in range(size) for y in range(size)}
+        walls.discard((0, 0))
+        stack = [(0, 0)]
+        while stack:
+            x, y = stack[-1]
+            options = [(x + dx, y + dy, dx, dy) for dx, dy in ((0, 2), (0, -2), (2, 0), (-2, 0))
+                       if (x + dx, y + dy) in walls and 0 <= x + dx < size and 0 <= y + dy < size]
+            if not options:
+                stack.pop()
+                continue
+            next_x, next_y, dx, dy = rng.choice(options)
+            walls.discard((x + dx // 2, y + dy // 2))
+            walls.discard((next_x, next_y))
+            stack.append((next_x, next_y))
+    elif kind == 'weighted':
+        walls = {(x, y) for x in range(size) for y in range(size) if rng.random() < 0.1}
+        costs = (2, 3, 5, 9)
+        weights = {(x, y): rng.choice(costs) for x in range(size) for y in range(size)
+                   if (x, y) not in walls and rng.random() < 0.5}
+    return walls, weights
+
+
+def pick_queries(walls, size, count, seed):
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        start = (rng.randrange(size), rng.randrange(size))
+        end = (rng.randrange(size), rng.randrange(size))
+        if start not in walls and end not in walls:
+            queries.append((start, end))
+    return queries
+
+
+def generate_graph(node_count, seed):  # {node: [[neighbor, cost], ...]} with every node listed, like weighted_adj_list
+    rng = random.Random("graph {} {}".format(node_count, seed))
+    return {node: [[rng.randrange(node_count), rng.randint(1, 9)] for _ in range(rng.randint(2, 6))]
+            for node in range(node_count)}
+
+
+def build_grid(namespace, search, size, walls, weights):
+    if search == 'bfs':  # Only knows walls
+        return namespace['Grid'](size, size, walls)
+    grid = namespace['Weighted_grid'](size, size, walls)
+    grid.weights = weights
+    return grid
+
+
+def measure(run, observer, queries):
+    # First pass: plain wall time (No observer). Second pass: expansions and queue peak from the observer,
+    # and the memory peak of each query from tracemalloc
+    began = time.perf_counter()
+    for start, end in queries:
+        run(start, end, None)
+    seconds = time.perf_counter() - began
+
+    memory_peak = 0
+    tracemalloc.start()
+    for start, end in queries:
+        tracemalloc.reset_peak()
+        run(start, end, observer)
+        memory_peak = max(memory_peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return {'queries': len(queries), 'seconds': seconds, 'seconds_per_query': seconds / len(queries),
+            'expanded': observer.expansions, 'frontier_peak': observer.max_frontier, 'memory_peak_bytes': memory_peak}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+definitions = {search: load_definitions(SCRIPTS[search]) for search in args.searches}
+results = []
+
+
+def record(result):
+    results.append(result)
+    print("{:<16} {:<9} {:>7} {:>9.4f} s/query {:>10} expanded {:>8} peak queue {:>8.1f} KB".format(
+        result['search'], result['map'], result['size'], result['seconds_per_query'], result['expanded'],
+        result['frontier_peak'], result['memory_peak_bytes'] / 1024))
+
+
+for size in args.sizes:
+    for kind in args.maps:
+        walls, weights = generate_map(kind, size, args.seed)
+        queries = pick_queries(walls, size, args.queries, args.seed)
+        for search in GRID_SEARCHES:
+            if search not in definitions:
+                continue
+            namespace = definitions[search]
+            grid = build_grid(namespace, search, size, walls, weights)
+            function = namespace[search]
+            result = {'search': search, 'map': kind, 'size': size}
+            result.update(measure(lambda start, end, observer: function(grid, start, end, observer=observer),
+                                  namespace['Search_observer'](), queries))
+            record(result)
+
+if 'dijkstras' in definitions:
+    for node_count in args.graph_sizes:
+        graph = generate_graph(node_count, args.seed)
+        rng = random.Random(args.seed)
+        queries = [(rng.randrange(node_count), rng.randrange(node_count)) for _ in range(args.queries)]
+        namespace = definitions['dijkstras']
+        result = {'search': 'dijkstras', 'map': 'graph', 'size': node_count}
+        result.update(measure(lambda start, end, observer: namespace['dijkstras'](graph, start, end, observer=observer),
+                              namespace['Search_observer'](), queries))
+        record(result)
+
+report = {'commit': git_commit(), 'python': sys.version.split()[0], 'platform': platform.platform(),
+          'seed': args.seed, 'when': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+with open(args.output, 'w') as file:
+    json.dump(report, file, indent=1)
+print("Wrote", args.output)
+
+if args.compare:
+    # Ratios new / old for every (search, map, size) in both files (Above 1 is slower, or more nodes expanded)
+    with open(args.compare) as file:
+        old_results = {(result['search'], result['map'], result['size']): result for result in json.load(file)['results']}
+    for result in results:
+        old = old_results.get((result['search'], result['map'], result['size']))
+        if old is None:
+            continue
+        print("{:<16} {:<9} {:>7} time x{:.2f} expanded x{:.2f}".format(
+            result['search'], result['map'], result['size'], result['seconds'] / old['seconds'],
+            result['expanded'] / old['expanded'] if old['expanded'] else 1.0))